@@ -2,7 +2,7 @@
 股票扫描API服务
 提供RESTful API供前端调用
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import os
 import sys
@@ -10,28 +10,17 @@ import sys
 # 添加当前目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.data_tools import load_concept_map, load_stock_name_map
-from strategies import ma5_support, volume_breakout
-from index import process_file, DATA_DIR
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
+from utils.data_tools import format_results
+from utils.bar_store import get_bar_slice, check_slice_args
+from utils import watchlist, profiling, metrics, archive, report
+from strategies.registry import STRATEGY_MAP, describe_strategies
+from index import run_scanner, analyze_stocks, DATA_DIR
+
+SCAN_ENGINES = ('auto', 'batch', 'stock')
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域
-
-# 策略映射
-STRATEGY_MAP = {
-    'ma5': {
-        'name': 'ma5',
-        'func': ma5_support.analyze,
-        'description': 'MA5均线支撑策略'
-    },
-    'volume_breakout': {
-        'name': 'volume_breakout',
-        'func': volume_breakout.analyze,
-        'description': '放量突破策略（吸筹→启动，无整理期）'
-    }
-}
+metrics.instrument_flask(app)  # 记录每个路由的请求耗时
 
 
 @app.route('/api/strategies', methods=['GET'])
@@ -39,10 +28,7 @@ def get_strategies():
     """获取可用策略列表"""
     return jsonify({
         'success': True,
-        'data': [
-            {'id': k, 'name': v['name'], 'description': v['description']}
-            for k, v in STRATEGY_MAP.items()
-        ]
+        'data': describe_strategies()
     })
 
 
@@ -51,7 +37,9 @@ def scan_strategy(strategy_name):
     """
     执行策略扫描
     参数:
-        strategy_name: 策略名称 (ma5 或 volume_breakout)
+        strategy_name: 策略名称（见 /api/strategies）
+        engine: 可选，auto（默认，策略提供批量实现时用批量）/ batch / stock
+        profile: 可选，1 返回各阶段耗时（响应中的 profile 字段）；cprofile / pyinstrument 同时附带调用栈
     """
     strategy_config = STRATEGY_MAP.get(strategy_name)
     if not strategy_config:
@@ -60,73 +48,299 @@ def scan_strategy(strategy_name):
             'error': f'找不到策略: {strategy_name}'
         }), 404
 
-    analyze_func = strategy_config['func']
-    strategy_desc = strategy_config['description']
+    engine = request.args.get('engine', 'auto')
+    if engine not in SCAN_ENGINES:
+        return jsonify({
+            'success': False,
+            'error': f"engine 参数应为 {' / '.join(SCAN_ENGINES)}"
+        }), 400
+    if engine == 'batch' and not strategy_config['batch']:
+        return jsonify({
+            'success': False,
+            'error': f'策略 {strategy_name} 没有批量实现'
+        }), 400
 
-    # 加载概念和股票名称映射
-    concept_map = load_concept_map()
-    stock_name_map = load_stock_name_map()
+    profile = request.args.get('profile')
+    if not profile or profile == '0':
+        payload, status = _scan_strategy(strategy_name, engine)
+        return jsonify(payload), status
 
-    # 检查数据目录
-    if not os.path.exists(DATA_DIR):
+    profiler = None if profile in ('1', 'stages') else profile
+    if profiler and profiler not in profiling.PROFILERS:
         return jsonify({
             'success': False,
-            'error': f'数据目录 {DATA_DIR} 不存在'
-        }), 500
+            'error': f"profile 参数应为 1 / {' / '.join(profiling.PROFILERS)}"
+        }), 400
+    try:
+        with profiling.tracing(f"api_scan:{strategy_name}", profiler) as trace:
+            payload, status = _scan_strategy(strategy_name, engine)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    payload['profile'] = trace.to_dict()
+    return jsonify(payload), status
 
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
-
-    # 执行扫描
-    results = []
-    with ThreadPoolExecutor(max_workers=40) as executor:
-        futures = [executor.submit(process_file, f, concept_map, stock_name_map, analyze_func) for f in files]
-        for f in tqdm(as_completed(futures), total=len(futures), desc=f"执行扫描-{strategy_name}"):
-            res = f.result()
-            if res:
-                results.append(res)
+def _scan_strategy(strategy_name, engine):
+    """执行扫描（与命令行共用 index.run_scanner，不生成报告），返回 (响应数据, HTTP 状态码)"""
+    result = run_scanner(strategy_name, generate_html=False, open_browser=False, engine=engine)
+    if not result['success']:
+        return {
+            'success': False,
+            'error': result.get('error', '扫描未完成')
+        }, 500
 
     # 格式化结果
-    formatted_results = []
-    for r in sorted(results, key=lambda x: (x.get('阶段', ''), x.get('代码', ''))):
-        formatted_results.append({
-            'code': r.get('代码', ''),
-            'name': r.get('名称', ''),
-            'fullCode': r.get('完整代码', ''),
-            'price': r.get('现价', 0),
-            'change': r.get('涨跌幅', '0%'),
-            'stage': r.get('阶段', ''),
-            'concepts': r.get('概念', '未分类')
-        })
+    with profiling.stage('format_results'):
+        formatted_results = format_results(result['hits'])
 
-    return jsonify({
+    snapshot = result['snapshot']
+    return {
         'success': True,
         'data': {
             'strategyName': strategy_name,
-            'strategyDisplayName': strategy_desc,
-            'totalScanned': len(files),
+            'strategyDisplayName': result['description'],
+            'engine': result['engine'],
+            'totalScanned': result['total_scanned'],
             'totalHit': len(formatted_results),
+            'dataGeneration': snapshot['generation'],
+            'dataDate': snapshot['as_of'] or report.results_data_date(result['hits']),
+            'diff': result['diff'],
             'results': formatted_results
         }
+    }, 200
+
+
+@app.route('/api/stock/<code>/bars', methods=['GET'])
+def stock_bars(code):
+    """
+    获取K线及指标数据（列式，用于画图/迷你走势图）
+    参数:
+        code: 股票代码，多只用逗号分隔，如 600519,000001
+        start/end: 起止日期 YYYY-MM-DD（可选）
+        indicators: 指标列表，如 ma5,ma20,vol_ma20（可选）
+        limit: 只返回最后 N 根K线（可选）
+    """
+    codes = [c for c in code.split(',') if c.strip()]
+    indicators = [i.strip() for i in request.args.get('indicators', '').split(',') if i.strip()]
+    limit = request.args.get('limit')
+    try:
+        # 参数错误返回 400，股票不存在才返回 404
+        limit = int(limit) if limit is not None else None
+        check_slice_args(request.args.get('start'), request.args.get('end'), indicators, limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    data = []
+    errors = []
+    for c in codes:
+        item = get_bar_slice(
+            c,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            indicators=indicators,
+            limit=limit
+        )
+        if 'error' in item:
+            errors.append(item)
+        else:
+            data.append(item)
+
+    if not data and errors:
+        return jsonify({
+            'success': False,
+            'error': errors[0]['error'],
+            'errors': errors
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': data,
+        'errors': errors
+    })
+
+
+@app.route('/api/stocks/analyze', methods=['POST'])
+def analyze_stocks_batch():
+    """
+    批量分析多只股票
+    请求体: {"codes": ["600519", "000001"], "strategies": ["ma5", "volume_breakout"]}
+    """
+    payload = request.get_json(silent=True) or {}
+    codes = payload.get('codes') or []
+    if isinstance(codes, str):
+        codes = codes.split(',')
+    if not codes:
+        return jsonify({
+            'success': False,
+            'error': '缺少参数: codes'
+        }), 400
+
+    batch = analyze_stocks(codes, payload.get('strategies'))
+    if 'error' in batch:
+        return jsonify({
+            'success': False,
+            'error': batch['error']
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': batch
+    })
+
+
+@app.route('/api/watchlists', methods=['GET'])
+def get_watchlists():
+    """获取所有自选股列表"""
+    return jsonify({
+        'success': True,
+        'data': watchlist.list_watchlists()
+    })
+
+
+@app.route('/api/watchlists/<name>', methods=['PUT', 'POST'])
+def save_watchlist(name):
+    """
+    创建或覆盖自选股列表
+    请求体: {"codes": ["600519", "000001"], "strategies": ["ma5"]}
+    """
+    payload = request.get_json(silent=True) or {}
+    codes = payload.get('codes') or []
+    if isinstance(codes, str):
+        codes = codes.split(',')
+
+    try:
+        info, invalid = watchlist.save_watchlist(name, codes, payload.get('strategies'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'data': info,
+        'invalidCodes': invalid
+    })
+
+
+@app.route('/api/watchlists/<name>', methods=['DELETE'])
+def delete_watchlist(name):
+    """删除自选股列表"""
+    if not watchlist.delete_watchlist(name):
+        return jsonify({
+            'success': False,
+            'error': f'自选股列表不存在: {name}'
+        }), 404
+    return jsonify({'success': True})
+
+
+@app.route('/api/watchlists/<name>/refresh', methods=['POST'])
+def refresh_watchlist(name):
+    """立即重新评估指定自选股列表"""
+    if watchlist.get_watchlist(name) is None:
+        return jsonify({
+            'success': False,
+            'error': f'自选股列表不存在: {name}'
+        }), 404
+    return jsonify({
+        'success': True,
+        'data': watchlist.refresh_watchlists(names=[name])
+    })
+
+
+@app.route('/api/watchlists/transitions', methods=['GET'])
+@app.route('/api/watchlists/<name>/transitions', methods=['GET'])
+def watchlist_transitions(name=None):
+    """
+    查询自选股阶段转换记录（最新在前）
+    参数: since=YYYY-MM-DD, code, strategy, limit
+    """
+    if name is not None and watchlist.get_watchlist(name) is None:
+        return jsonify({
+            'success': False,
+            'error': f'自选股列表不存在: {name}'
+        }), 404
+    return jsonify({
+        'success': True,
+        'data': watchlist.get_transitions(
+            name=name,
+            since=request.args.get('since'),
+            code=request.args.get('code'),
+            strategy=request.args.get('strategy'),
+            limit=request.args.get('limit', 100, type=int)
+        )
+    })
+
+
+@app.route('/api/archive/<strategy_name>', methods=['GET'])
+def archive_dates(strategy_name):
+    """策略已归档的扫描日期"""
+    if strategy_name not in STRATEGY_MAP:
+        return jsonify({
+            'success': False,
+            'error': f'策略不存在: {strategy_name}'
+        }), 404
+    return jsonify({
+        'success': True,
+        'data': archive.list_dates(strategy_name)
+    })
+
+
+@app.route('/api/archive/<strategy_name>/diff', methods=['GET'])
+def archive_diff(strategy_name):
+    """
+    对比两个数据日期的扫描结果（读取归档，不重新扫描）
+    参数: from=YYYY-MM-DD, to=YYYY-MM-DD，默认最新一次与前一次
+    """
+    if strategy_name not in STRATEGY_MAP:
+        return jsonify({
+            'success': False,
+            'error': f'策略不存在: {strategy_name}'
+        }), 404
+    result = archive.diff(strategy_name, to_date=request.args.get('to'), from_date=request.args.get('from'))
+    if result is None:
+        return jsonify({
+            'success': False,
+            'error': '缺少可对比的扫描归档',
+            'dates': archive.list_dates(strategy_name)
+        }), 404
+    return jsonify({
+        'success': True,
+        'data': result
     })
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """健康检查"""
+    """健康检查（数据状态优先读取数据清单，不再每次遍历数据目录）"""
+    status = metrics.data_status()
     return jsonify({
         'success': True,
         'status': 'ok',
         'dataDir': os.path.exists(DATA_DIR),
-        'stockCount': len([f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]) if os.path.exists(DATA_DIR) else 0
+        'stockCount': status['stock_count'],
+        'latestBarDate': status['latest_bar_date'],
+        'staleCount': status['stale_count'],
+        'needsUpdate': status['needs_update'],
+        'conceptCacheDate': (status.get('concepts') or {}).get('last_update'),
+        'generations': status.get('generations'),
+        'statusSource': status['source']
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 格式的运行指标"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
     print("🚀 启动股票扫描API服务...")
     print("📍 API地址: http://localhost:5000")
     print("📚 可用接口:")
     print("   GET /api/health          - 健康检查")
+    print("   GET /metrics             - 运行指标（Prometheus 格式）")
     print("   GET /api/strategies      - 获取策略列表")
-    print("   GET /api/scan/<strategy> - 执行扫描 (ma5, volume_breakout)")
+    print(f"   GET /api/scan/<strategy> - 执行扫描 ({', '.join(STRATEGY_MAP)}；?engine=auto|batch|stock&profile=1 返回各阶段耗时)")
+    print("   POST /api/stocks/analyze - 批量分析多只股票")
+    print("   GET /api/watchlists      - 自选股列表 (PUT/DELETE /api/watchlists/<name>)")
+    print("   GET /api/watchlists/<name>/transitions - 自选股阶段变化")
+    print("   GET /api/archive/<strategy>/diff - 扫描结果日间对比 (?from=&to=)")
+    print("   GET /api/stock/<code>/bars - K线及指标 (?start=&end=&indicators=ma5,ma20,vol_ma20)")
     print("")
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -3,15 +3,109 @@ import baostock as bs
 import pandas as pd
 import os
 from datetime import datetime
+from utils import bar_store, manifest, quality, storage
 DATA_DIR = './stock_data'
-def update_stock_data():
+def update_stock_data(cancel_event=None):
+    """
+    增量更新股票日线数据
+    cancel_event: 可选的 threading.Event，置位后在下一只股票前停止
+    返回: 收到新K线的股票完整代码列表
+    """
     bs.login()
     today = datetime.now().strftime("%Y-%m-%d")
     print(f"🔄 正在更新 {today} 的增量数据...")
-    
+
+    # 增量先收集，抓取结束后一次性校验再追加写入
+    increments = {}     # 完整代码 -> 新K线
+    local = {}          # 完整代码 -> (本地最后日期, 行数)
+    try:
+        _fetch_all(today, increments, local, cancel_event)
+    finally:
+        # 中途取消或出错时已抓取的部分照常写入
+        updated_codes = _write_increments(increments, local, today)
+
+    bs.logout()
+    print(f"✅ {today} 增量数据同步完成！共 {len(updated_codes)} 只股票有新数据")
+
+    # 只对收到新K线的自选股重新评估，记录阶段变化
+    if updated_codes:
+        try:
+            from utils.watchlist import refresh_watchlists
+            refresh = refresh_watchlists(updated_codes)
+            if refresh['evaluated']:
+                print(f"👀 自选股已重新评估 {refresh['evaluated']} 只，阶段变化 {len(refresh['transitions'])} 条")
+                for t in refresh['transitions']:
+                    print(f"   {t['code']} {t['name']} [{t['strategy']}] {t['from'] or '无信号'} → {t['to'] or '无信号'}")
+        except Exception as e:
+            print(f"⚠️ 自选股评估失败: {e}")
+
+    return updated_codes
+
+def _local_state(code, file_path):
+    """
+    本地最后一条K线日期与行数：优先读数据清单，清单中没有该股票时才读取整个 CSV
+    清单只用于决定抓取起点，追加前 _write_increments 会再对照文件最后一行
+    返回: (last_date, rows)，文件不存在时为 (None, 0)
+    """
+    if not os.path.exists(file_path):
+        return None, 0
+    current = manifest.load_manifest()
+    entry = current['stocks'].get(code) if current else None
+    if entry and entry.get('last_date'):
+        return entry['last_date'], entry.get('rows')
+    try:
+        existing_df = pd.read_csv(file_path)
+        if not existing_df.empty and 'date' in existing_df.columns:
+            return existing_df.iloc[-1]['date'], len(existing_df)
+    except Exception:
+        pass
+    return None, None
+
+def _write_increments(increments, local, today):
+    """
+    校验全部增量（去重、排序、停牌标记、对照交易日历查缺失）后追加写入，并更新数据清单与质量报告
+    返回: 收到新K线的股票完整代码列表
+    """
+    if not increments:
+        return []
+    since = {code: local_date for code, (local_date, _) in local.items() if local_date}
+    calendar = quality.fetch_trade_calendar(min(since.values(), default="2025-01-01"), today)
+    clean, report = quality.validate(increments, calendar, since)
+
+    updated_codes = []
+    manifest_updates = {}
+    for code, new_df in clean.items():
+        local_date, rows = local[code]
+        file_path = f"{DATA_DIR}/{code}.csv"
+        # 清单可能落后于文件（上次追加后、写清单前中断）：以文件最后一行为准，已在文件中的日期不再追加
+        file_date = bar_store.read_last_date(file_path) if os.path.exists(file_path) else None
+        if file_date and file_date != local_date:
+            new_df = new_df[new_df['date'] > file_date]
+            rows = None
+            if new_df.empty:
+                manifest_updates[code] = {'last_date': file_date, 'rows': None}
+                continue
+        # 原子追加：并发扫描要么读到旧文件、要么读到追加后的完整文件（新股没有本地文件时带表头）
+        storage.append_csv(file_path, new_df)
+        updated_codes.append(code)
+        manifest_updates[code] = {
+            'last_date': new_df['date'].iloc[-1],
+            'rows': rows + len(new_df) if rows is not None else None
+        }
+    if manifest_updates:
+        manifest.record_stocks(manifest_updates)
+    quality.save_report(report, accumulate=True)
+    print(f"🧹 数据校验: {quality.format_summary(report)}")
+    return updated_codes
+
+def _fetch_all(today, increments, local, cancel_event=None):
+    """逐只抓取本地最后日期之后的增量，记入 increments / local"""
     # 获取最新列表（包含可能的新股）
     rs = bs.query_all_stock()
     while rs.next():
+        if cancel_event is not None and cancel_event.is_set():
+            print("⏹️ 增量更新已取消")
+            break
         code, status, name = rs.get_row_data()
         # 剔除399开头的行业指数
         pure_code = code.split('.')[1] if '.' in code else code
@@ -21,15 +115,9 @@ def update_stock_data():
         
         file_path = f"{DATA_DIR}/{code}.csv"
         
-        # 1. 获取该股票本地最后一条日期
-        last_date = "2025-01-01"
-        if os.path.exists(file_path):
-            try:
-                existing_df = pd.read_csv(file_path)
-                if not existing_df.empty and 'date' in existing_df.columns:
-                    last_date = existing_df.iloc[-1]['date']
-            except Exception:
-                pass  # 如果读取失败，使用默认日期
+        # 1. 获取该股票本地最后一条日期（读取失败或没有文件时使用默认日期）
+        local_date, rows = _local_state(code, file_path)
+        last_date = local_date or "2025-01-01"
         
         # 如果最后日期就是今天，说明已经更新过了
         if last_date >= today: continue
@@ -47,10 +135,9 @@ def update_stock_data():
             new_df = pd.DataFrame(inc_list, columns=rs_inc.fields)
             # 过滤掉已经存在的日期
             new_df = new_df[new_df['date'] > last_date]
-            # 追加写入
-            new_df.to_csv(file_path, mode='a', header=False, index=False)
-            
-    bs.logout()
-    print(f"✅ {today} 增量数据同步完成！")
+            if not new_df.empty:
+                increments[code] = new_df
+                local[code] = (local_date, rows)
+
 if __name__ == "__main__":
     update_stock_data()
\ No newline at end of file
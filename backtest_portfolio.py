@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+组合回测：在回测信号上模拟真实交易，输出资金曲线、回撤、胜率与收益分布
+同一股票持仓期间的重复信号默认跳过（backtest_strategy*.py 会重复计数）
+回测逻辑见 utils/portfolio.py
+示例：
+    python backtest_portfolio.py --strat ma5 --stop-loss 0.05 --take-profit 0.15
+    python backtest_portfolio.py --strat volume_breakout --signal "🚀 启动期（重点）" --exact --trailing 0.08 --horizon 20
+"""
+import argparse
+
+from utils.portfolio import DEFAULT_RULES, DEFAULT_SIZING, OVERLAP_MODES, run_portfolio_backtest, return_histogram
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strat', type=str, default='ma5', help='选择策略')
+    parser.add_argument('--signal', type=str, default='🚀 启动期', help='统计的信号阶段')
+    parser.add_argument('--exact', action='store_true', help='信号阶段精确匹配（默认包含匹配）')
+    parser.add_argument('--year', type=int, default=2025, help='回测年份')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_RULES['horizon'], help='最长持有K线数')
+    parser.add_argument('--take-profit', type=float, help='止盈比例，如 0.1')
+    parser.add_argument('--stop-loss', type=float, help='止损比例，如 0.05')
+    parser.add_argument('--trailing', type=float, help='移动止损回撤比例，如 0.08')
+    parser.add_argument('--fee', type=float, default=DEFAULT_RULES['fee'], help='每笔往返成本')
+    parser.add_argument('--position-size', type=float, default=DEFAULT_SIZING['position_size'], help='每笔开仓占权益比例')
+    parser.add_argument('--max-positions', type=int, default=DEFAULT_SIZING['max_positions'], help='同时持仓上限')
+    parser.add_argument('--overlap', choices=OVERLAP_MODES, default=DEFAULT_SIZING['overlap'], help='重复信号处理方式')
+    parser.add_argument('--output', type=str, help='结果文件前缀，默认 backtest_portfolio_{策略}')
+    args = parser.parse_args()
+
+    rules = {'horizon': args.horizon, 'take_profit': args.take_profit, 'stop_loss': args.stop_loss,
+             'trailing': args.trailing, 'fee': args.fee}
+    sizing = {'position_size': args.position_size, 'max_positions': args.max_positions, 'overlap': args.overlap}
+    prefix = args.output or f"backtest_portfolio_{args.strat}"
+    result = run_portfolio_backtest(args.strat, args.signal, args.exact, rules, sizing, args.year,
+                                    output_prefix=prefix)
+
+    if result['stats']['trades']:
+        print("\n收益分布（%）:")
+        for row in return_histogram(result['trades'], bins=10).itertuples():
+            print(f"  {row.low:7.2f} ~ {row.high:7.2f}  {'█' * row.count if row.count <= 60 else '█' * 60 + f' {row.count}'}")
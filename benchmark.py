@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+端到端性能基准
+不需要 BaoStock：默认生成合成市场（含停牌、缺失K线、次新股、ST 名称）到临时目录，
+依次测量扫描（各引擎）、单股分析、API 扫描与回测，输出 JSON。
+示例：
+    python benchmark.py --stocks 5000 --days 250 --output bench.json
+    python benchmark.py --strat ma5 --kind scan --engine batch
+    python benchmark.py --data-root .            # 用当前目录下的真实 stock_data
+"""
+import json
+import argparse
+
+from utils.benchmark import CASE_KINDS, ENGINES, run_benchmark
+from strategies.registry import strategy_names
+
+def _print_case(row):
+    label = f"{row['kind']}:{row['strategy']}" + (f":{row['engine']}" if 'engine' in row else '')
+    if row['ok']:
+        print(f"  ✅ {label:<40} 墙钟 {row['wall_s']:>8.3f}s  CPU {row['cpu_s']:>8.3f}s  "
+              f"峰值 {row['peak_rss_mb']:>7.1f}MB  {row['stocks_per_s']} 只/秒", flush=True)
+    else:
+        print(f"  ❌ {label:<40} {row['error']}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stocks', type=int, default=1000, help='合成市场股票数')
+    parser.add_argument('--days', type=int, default=250, help='每只股票的K线数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--strat', action='append', choices=strategy_names(), help='只测指定策略（可重复），默认全部')
+    parser.add_argument('--kind', action='append', choices=CASE_KINDS, help='只测指定用例类型（可重复），默认全部')
+    parser.add_argument('--engine', action='append', choices=ENGINES, help='扫描引擎（可重复），默认全部')
+    parser.add_argument('--samples', type=int, default=200, help='单股分析的抽样股票数')
+    parser.add_argument('--data-root', type=str, help='使用已有的工作目录（包含 stock_data/），不生成合成市场')
+    parser.add_argument('--keep', action='store_true', help='保留生成的合成市场目录')
+    parser.add_argument('--output', type=str, help='JSON 报告路径，不指定时打印到标准输出')
+    args = parser.parse_args()
+
+    source = args.data_root or f"合成市场 {args.stocks} 只 × {args.days} 天"
+    print(f"⏱️ 性能基准 | 数据: {source}", flush=True)
+    report = run_benchmark(
+        stocks=args.stocks, days=args.days, seed=args.seed, strategies=args.strat,
+        kinds=args.kind or CASE_KINDS, engines=args.engine or ENGINES, samples=args.samples,
+        data_root=args.data_root, keep=args.keep, progress=_print_case
+    )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"结果已保存: {args.output}")
+    else:
+        print(text)
@@ -0,0 +1,51 @@
+"""
+测试公共夹具：合成行情工作目录
+测试在临时目录中生成 ./stock_data 并切换工作目录，不依赖真实的 BaoStock 数据
+"""
+import os
+
+import pytest
+
+from utils import bar_store, features
+from utils.synthetic import generate_market, write_market
+
+# 功能测试用的小市场；基准测试的规模见 test_benchmark.py
+MARKET_STOCKS = 120
+MARKET_DAYS = 160
+MARKET_SEED = 7
+
+def pytest_addoption(parser):
+    parser.addoption('--update-golden', action='store_true', help='重新生成策略的基准输出（golden 文件）')
+
+def make_market_dir(root, count, days=MARKET_DAYS, seed=MARKET_SEED):
+    """在 root 下写出合成行情 root/stock_data，返回 root"""
+    write_market(generate_market(count, days, seed), os.path.join(root, 'stock_data'))
+    return root
+
+def _reset_caches():
+    bar_store.clear_cache()
+    features.clear_cache()
+
+@pytest.fixture(scope='session')
+def market_root(tmp_path_factory):
+    return make_market_dir(str(tmp_path_factory.mktemp('market')), MARKET_STOCKS)
+
+@pytest.fixture
+def market(market_root, monkeypatch):
+    """切换到合成行情所在目录，前后清空行情与特征缓存"""
+    monkeypatch.chdir(market_root)
+    _reset_caches()
+    yield market_root
+    _reset_caches()
+
+@pytest.fixture
+def private_market(tmp_path, monkeypatch):
+    """会被测试修改的小市场（每个测试单独生成，不影响共享的 market）"""
+    monkeypatch.chdir(make_market_dir(str(tmp_path), 20))
+    _reset_caches()
+    yield str(tmp_path)
+    _reset_caches()
+
+@pytest.fixture
+def update_golden(request):
+    return request.config.getoption('--update-golden')
@@ -2,9 +2,29 @@
 /**
  * 构建脚本：将 React 组件打包成单个 HTML 模板文件
  * 用于 Python 后端生成报告时注入数据
+ *
+ * node scripts/build-template.js           单文件模板 report_template.html（报告格式 html）
+ * node scripts/build-template.js --bundle  预编译的静态包 report_assets/（报告格式 bundle）：
+ *     app.<hash>.js    预编译好的应用代码，文件名带内容哈希，浏览器可长期缓存
+ *     report_shell.html 报告外壳，Python 只替换数据文件与应用文件的路径
+ *     manifest.json    当前应用文件名，Python 据此生成报告外壳
+ *   每份报告只写一个很小的外壳 HTML 和一个列式数据文件 *.data.js，旧的 app.<hash>.js 保留，历史报告仍可打开
  */
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
+
+const CDN_SCRIPTS = `    <script src="https://unpkg.com/react@18/umd/react.production.min.js" crossorigin></script>
+    <script src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js" crossorigin></script>`;
+
+const HEAD_STYLES = `    <script src="https://cdn.tailwindcss.com"></script>
+    <link href="https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;700&display=swap" rel="stylesheet">
+    <style>
+        body { margin: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'PingFang SC', sans-serif; }
+        .font-mono { font-family: 'JetBrains Mono', monospace; }
+        @keyframes fadeIn { from { opacity: 0; transform: translateY(10px); } to { opacity: 1; transform: translateY(0); } }
+        .animate-fade-in { animation: fadeIn 0.3s ease-out; }
+    </style>`;
 
 // 读取文件内容
 function readFile(filePath) {
@@ -25,68 +45,75 @@ function removeExports(content) {
   return content;
 }
 
-// 构建模板
-function buildTemplate() {
+function readSource(filePath) {
+  return removeExports(removeImports(readFile(filePath)));
+}
+
+// 读取组件、工具函数、Dashboard 和 App
+function collectSources() {
   const srcDir = path.join(__dirname, '..', 'src');
-  
-  // 读取组件
-  const componentsDir = path.join(srcDir, 'components');
   const components = {};
-  
+  const utils = {};
+
+  const componentsDir = path.join(srcDir, 'components');
   fs.readdirSync(componentsDir).forEach(filename => {
     if (filename.endsWith('.js') || filename.endsWith('.jsx')) {
-      const filepath = path.join(componentsDir, filename);
-      let content = readFile(filepath);
-      content = removeImports(content);
-      content = removeExports(content);
-      components[filename] = content;
+      components[filename] = readSource(path.join(componentsDir, filename));
     }
   });
-  
-  // 读取工具函数
+
   const utilsDir = path.join(srcDir, 'utils');
-  const utils = {};
-  
   fs.readdirSync(utilsDir).forEach(filename => {
     if (filename.endsWith('.js')) {
-      const filepath = path.join(utilsDir, filename);
-      let content = readFile(filepath);
-      content = removeImports(content);
-      content = removeExports(content);
-      utils[filename] = content;
+      utils[filename] = readSource(path.join(utilsDir, filename));
     }
   });
-  
-  // 读取 Dashboard
-  const dashboardPath = path.join(srcDir, 'pages', 'Dashboard.jsx');
-  let dashboard = readFile(dashboardPath);
-  dashboard = removeImports(dashboard);
-  dashboard = removeExports(dashboard);
-  
-  // 读取 App
-  const appPath = path.join(srcDir, 'App.jsx');
-  let app = readFile(appPath);
-  app = removeImports(app);
-  app = removeExports(app);
-  
-  // 构建 HTML 模板
+
+  return {
+    components,
+    utils,
+    dashboard: readSource(path.join(srcDir, 'pages', 'Dashboard.jsx')),
+    app: readSource(path.join(srcDir, 'App.jsx'))
+  };
+}
+
+// 拼接应用源码（JSX），两种模式共用
+function appSource({ components, utils, dashboard, app }) {
+  const component = name => components[`${name}.js`] || components[`${name}.jsx`] || '';
+  return `const { useState, useMemo, useEffect, useRef, useCallback } = React;
+
+// ===== Utils =====
+${utils['clipboard.js'] || ''}
+${utils['snapshot.js'] || ''}
+${utils['resultQuery.js'] || ''}
+
+// ===== Components =====
+${component('Header')}
+${component('StageCards')}
+${component('DiffPanel')}
+${component('ConceptCloud')}
+${component('StockTable')}
+${component('Toast')}
+
+// ===== Dashboard =====
+${dashboard}
+
+// ===== App =====
+${app}
+`;
+}
+
+// 构建模板
+function buildTemplate() {
   const template = `<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8" />
     <meta name="viewport" content="width=device-width, initial-scale=1.0" />
     <title>量化扫描仪表盘</title>
-    <script src="https://unpkg.com/react@18/umd/react.production.min.js" crossorigin></script>
-    <script src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js" crossorigin></script>
+${CDN_SCRIPTS}
     <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;700&display=swap" rel="stylesheet">
-    <style>
-        body { margin: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'PingFang SC', sans-serif; }
-        .font-mono { font-family: 'JetBrains Mono', monospace; }
-        @keyframes fadeIn { from { opacity: 0; transform: translateY(10px); } to { opacity: 1; transform: translateY(0); } }
-        .animate-fade-in { animation: fadeIn 0.3s ease-out; }
-    </style>
+${HEAD_STYLES}
 </head>
 <body>
     <div id="root"></div>
@@ -95,25 +122,7 @@ function buildTemplate() {
         window.scannerData = {{DATA_PLACEHOLDER}};
     </script>
     <script type="text/babel">
-const { useState, useMemo } = React;
-
-// ===== Utils =====
-${utils['clipboard.js'] || ''}
-${utils['snapshot.js'] || ''}
-
-// ===== Components =====
-${components['Header.js'] || components['Header.jsx'] || ''}
-${components['StageCards.js'] || components['StageCards.jsx'] || ''}
-${components['ConceptCloud.js'] || components['ConceptCloud.jsx'] || ''}
-${components['StockTable.js'] || components['StockTable.jsx'] || ''}
-${components['Toast.js'] || components['Toast.jsx'] || ''}
-
-// ===== Dashboard =====
-${dashboard}
-
-// ===== App =====
-${app}
-
+${appSource(collectSources())}
 // ===== Render =====
 const root = ReactDOM.createRoot(document.getElementById('root'));
 root.render(<App />);
@@ -124,10 +133,82 @@ root.render(<App />);
   // 保存模板文件到项目根目录
   const outputPath = path.join(__dirname, '..', '..', 'report_template.html');
   fs.writeFileSync(outputPath, template, 'utf-8');
-  
+
   console.log('✅ 模板文件已生成:', outputPath);
   return outputPath;
 }
 
+// 构建预编译静态包
+function buildBundle() {
+  // 构建时编译 JSX，浏览器不再加载 Babel、不再解析源码
+  // 使用 react-scripts 自带的 Babel（@babel/core + @babel/preset-react），不额外引入依赖
+  const babel = require('@babel/core');
+  const source = `${appSource(collectSources())}
+// ===== Data =====
+// 数据文件是列式的 { columns: { code: [...], name: [...] } }，渲染前展开为逐行结果
+function expandColumns(data) {
+  if (!data || !data.columns) return data;
+  const keys = Object.keys(data.columns);
+  const total = keys.length ? data.columns[keys[0]].length : 0;
+  const results = [];
+  for (let i = 0; i < total; i++) {
+    const row = {};
+    keys.forEach(key => { row[key] = data.columns[key][i]; });
+    results.push(row);
+  }
+  const { columns, ...meta } = data;
+  return { ...meta, results };
+}
+window.scannerData = expandColumns(window.scannerData);
+
+// ===== Render =====
+const root = ReactDOM.createRoot(document.getElementById('root'));
+root.render(<App />);
+`;
+  const code = babel.transformSync(source, {
+    presets: [require.resolve('@babel/preset-react')],
+    babelrc: false,
+    configFile: false,
+    compact: true,
+    comments: false
+  }).code;
+  const hash = crypto.createHash('sha256').update(code).digest('hex').slice(0, 10);
+  const appFile = `app.${hash}.js`;
+
+  const outputDir = path.join(__dirname, '..', '..', 'report_assets');
+  fs.mkdirSync(outputDir, { recursive: true });
+  fs.writeFileSync(path.join(outputDir, appFile), `(function () {\n${code}\n})();\n`, 'utf-8');
+
+  const shell = `<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>量化扫描仪表盘</title>
+${CDN_SCRIPTS}
+${HEAD_STYLES}
+</head>
+<body>
+    <div id="root"></div>
+    <script src="{{DATA_SRC}}"></script>
+    <script src="{{APP_SRC}}"></script>
+</body>
+</html>
+`;
+  fs.writeFileSync(path.join(outputDir, 'report_shell.html'), shell, 'utf-8');
+  fs.writeFileSync(path.join(outputDir, 'manifest.json'), JSON.stringify({
+    app: appFile,
+    shell: 'report_shell.html',
+    builtAt: new Date().toISOString()
+  }, null, 2), 'utf-8');
+
+  console.log('✅ 静态包已生成:', path.join(outputDir, appFile));
+  return outputDir;
+}
+
 // 执行构建
-buildTemplate();
+if (process.argv.includes('--bundle')) {
+  buildBundle();
+} else {
+  buildTemplate();
+}
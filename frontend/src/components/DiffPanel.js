@@ -0,0 +1,53 @@
+import React, { useState } from 'react';
+
+// 日间对比分组（数据来自扫描归档，见 utils/archive.py）
+const DIFF_GROUPS = [
+  { key: 'added', label: '🆕 新进', style: 'bg-red-50 text-red-700 border-red-200' },
+  { key: 'upgraded', label: '⬆️ 升级', style: 'bg-amber-50 text-amber-700 border-amber-200' },
+  { key: 'downgraded', label: '⬇️ 降级', style: 'bg-blue-50 text-blue-700 border-blue-200' },
+  { key: 'removed', label: '👋 移出', style: 'bg-gray-50 text-gray-600 border-gray-200' }
+];
+
+function DiffPanel({ diff }) {
+  const [activeGroup, setActiveGroup] = useState(null);
+  if (!diff) return null;
+
+  const rows = activeGroup ? diff[activeGroup] : [];
+
+  return (
+    <div className="bg-white/90 backdrop-blur-sm rounded-2xl p-5 mb-5 shadow-xl">
+      <h3 className="text-sm font-semibold text-gray-600 mb-3">
+        📈 较 {diff.from} 变化 <span className="text-gray-400 font-normal">（{diff.from} → {diff.to}）</span>
+      </h3>
+      <div className="flex flex-wrap gap-3">
+        {DIFF_GROUPS.map(group => (
+          <button
+            key={group.key}
+            onClick={() => setActiveGroup(activeGroup === group.key ? null : group.key)}
+            className={`
+              px-4 py-2 rounded-xl border text-sm font-semibold transition-all duration-200
+              ${group.style}
+              ${activeGroup === group.key ? 'ring-2 ring-indigo-300' : 'hover:-translate-y-0.5'}
+            `}
+          >
+            {group.label} {diff.counts[group.key]}
+          </button>
+        ))}
+      </div>
+      {rows.length > 0 && (
+        <div className="mt-4 flex flex-wrap gap-2">
+          {rows.map(row => (
+            <span key={row.fullCode} className="px-3 py-1.5 rounded-lg bg-slate-50 text-xs text-gray-700">
+              <span className="font-mono font-semibold">{row.code}</span> {row.name}
+              <span className="text-gray-400 ml-1">
+                {row.fromStage ? `${row.fromStage} → ${row.stage}` : row.stage}
+              </span>
+            </span>
+          ))}
+        </div>
+      )}
+    </div>
+  );
+}
+
+export default DiffPanel;
@@ -1,11 +1,13 @@
-import { useState, useMemo } from 'react'
+import { useState, useMemo, useCallback } from 'react'
 import Header from '../components/Header'
 import StageCards from '../components/StageCards'
 import ConceptCloud from '../components/ConceptCloud'
+import DiffPanel from '../components/DiffPanel'
 import StockTable from '../components/StockTable'
 import Toast from '../components/Toast'
 import { generateSnapshot } from '../utils/snapshot'
 import { copyToClipboard } from '../utils/clipboard'
+import { useResultQuery } from '../utils/resultQuery'
 
 // 阶段配置
 const STAGE_CONFIG = {
@@ -45,35 +47,24 @@ function Dashboard({ data }) {
   const [stageFilter, setStageFilter] = useState(null)
   const [conceptFilter, setConceptFilter] = useState(null)
   const [toast, setToast] = useState({ show: false, message: '' })
+  const [sort, setSort] = useState({ key: null, dir: 'desc' })
 
-  // 计算统计数据
-  const stats = useMemo(() => {
-    const stageCounts = {}
-    data.results.forEach(r => {
-      stageCounts[r.stage] = (stageCounts[r.stage] || 0) + 1
-    })
-    return stageCounts
-  }, [data])
-
-  // 提取所有概念
-  const allConcepts = useMemo(() => {
-    const concepts = new Set()
-    data.results.forEach(r => {
-      if (r.concepts) {
-        r.concepts.split(' / ').forEach(c => concepts.add(c))
-      }
-    })
-    return Array.from(concepts).sort()
-  }, [data])
-
-  // 筛选后的数据
-  const filteredResults = useMemo(() => {
-    return data.results.filter(r => {
-      if (stageFilter && r.stage !== stageFilter) return false
-      if (conceptFilter && (!r.concepts || !r.concepts.includes(conceptFilter))) return false
-      return true
-    })
-  }, [data, stageFilter, conceptFilter])
+  // 筛选、排序和阶段/概念统计在 Web Worker 中完成（见 utils/resultQuery.js）
+  const query = useMemo(() => ({
+    stage: stageFilter,
+    concept: conceptFilter,
+    sortKey: sort.key,
+    sortDir: sort.dir
+  }), [stageFilter, conceptFilter, sort])
+  const { rows: filteredResults, summary } = useResultQuery(data.results, query)
+  const stats = summary.stageCounts
+
+  const codesText = useMemo(() => filteredResults.map(r => r.code).join(','), [filteredResults])
+
+  // 点击表头排序：同一列切换升降序
+  const changeSort = useCallback((key) => {
+    setSort(prev => ({ key, dir: prev.key === key && prev.dir === 'desc' ? 'asc' : 'desc' }))
+  }, [])
 
   // 显示Toast
   const showToast = (message) => {
@@ -85,13 +76,13 @@ function Dashboard({ data }) {
   const resetFilters = () => {
     setStageFilter(null)
     setConceptFilter(null)
+    setSort({ key: null, dir: 'desc' })
   }
 
   // 复制全部代码
   const copyAllCodes = () => {
-    const codes = filteredResults.map(r => r.code).join(',')
-    if (codes) {
-      copyToClipboard(codes)
+    if (codesText) {
+      copyToClipboard(codesText)
       showToast('✅ 已复制到剪贴板')
     } else {
       showToast('⚠️ 没有可复制的代码')
@@ -110,9 +101,11 @@ function Dashboard({ data }) {
       name: r.name
     }))
 
+    // 在 Worker 中绘制，完成后再提示
     const filterText = stageFilter || conceptFilter || '全部标的'
     generateSnapshot(stocks, data.strategyName, filterText)
-    showToast('✅ 快照已保存')
+      .then(count => showToast(count > 1 ? `✅ 快照已保存（${count} 张）` : '✅ 快照已保存'))
+      .catch(() => showToast('⚠️ 快照生成失败'))
   }
 
   const currentFilterText = conceptFilter ? `概念: ${conceptFilter}` : (stageFilter || '全部标的')
@@ -136,9 +129,12 @@ function Dashboard({ data }) {
           onStageClick={setStageFilter}
         />
 
+        {/* 与上一交易日对比 */}
+        <DiffPanel diff={data.diff} />
+
         {/* 概念云 */}
         <ConceptCloud 
-          concepts={allConcepts}
+          concepts={summary.conceptCounts}
           activeConcept={conceptFilter}
           onConceptClick={setConceptFilter}
         />
@@ -176,14 +172,13 @@ function Dashboard({ data }) {
         {/* 代码框 */}
         <div 
           onClick={() => {
-            const codes = filteredResults.map(r => r.code).join(',')
-            copyToClipboard(codes)
+            copyToClipboard(codesText)
             showToast('✅ 已复制到剪贴板')
           }}
           className="bg-gradient-to-r from-slate-800 to-slate-900 text-sky-400 p-4 rounded-xl mb-5 cursor-pointer hover:shadow-xl transition-all duration-300 flex justify-between items-center"
         >
           <span className="font-mono text-sm truncate max-w-[calc(100%-100px)]">
-            {filteredResults.map(r => r.code).join(',')}
+            {codesText}
           </span>
           <span className="text-xs text-gray-400 bg-white/10 px-3 py-1 rounded-lg">点击复制</span>
         </div>
@@ -193,6 +188,8 @@ function Dashboard({ data }) {
           stocks={filteredResults}
           stageConfig={STAGE_CONFIG}
           onConceptClick={setConceptFilter}
+          sort={sort}
+          onSortChange={changeSort}
         />
       </div>
 
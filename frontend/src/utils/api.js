@@ -26,6 +26,23 @@ export async function scanStrategy(strategyName) {
   return data.data;
 }
 
+/**
+ * 对比两个数据日期的扫描结果（读取扫描归档）
+ * @param {string} strategyName - 策略名称
+ * @param {object} options - { from, to }，默认最新一次与前一次
+ */
+export async function getScanDiff(strategyName, options = {}) {
+  const params = new URLSearchParams();
+  if (options.from) params.set('from', options.from);
+  if (options.to) params.set('to', options.to);
+  const response = await fetch(`${API_BASE_URL}/api/archive/${strategyName}/diff?${params}`);
+  const data = await response.json();
+  if (!data.success) {
+    throw new Error(data.error || '获取扫描对比失败');
+  }
+  return data.data;
+}
+
 /**
  * 健康检查
  */
@@ -38,3 +55,40 @@ export async function healthCheck() {
     return false;
   }
 }
+
+/**
+ * 批量获取K线及指标（用于迷你走势图）
+ * @param {string[]} codes - 股票代码列表
+ * @param {object} options - { start, end, indicators, limit }
+ */
+export async function getStockBars(codes, options = {}) {
+  const params = new URLSearchParams();
+  if (options.start) params.set('start', options.start);
+  if (options.end) params.set('end', options.end);
+  if (options.indicators) params.set('indicators', options.indicators.join(','));
+  if (options.limit) params.set('limit', options.limit);
+  const response = await fetch(`${API_BASE_URL}/api/stock/${codes.join(',')}/bars?${params}`);
+  const data = await response.json();
+  if (!data.success) {
+    throw new Error(data.error || '获取K线数据失败');
+  }
+  return data.data;
+}
+
+/**
+ * 批量分析多只股票
+ * @param {string[]} codes - 股票代码列表
+ * @param {string[]} strategies - 策略列表
+ */
+export async function analyzeStocks(codes, strategies = ['ma5']) {
+  const response = await fetch(`${API_BASE_URL}/api/stocks/analyze`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ codes, strategies }),
+  });
+  const data = await response.json();
+  if (!data.success) {
+    throw new Error(data.error || '批量分析失败');
+  }
+  return data.data;
+}
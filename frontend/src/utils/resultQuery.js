@@ -0,0 +1,137 @@
+import { useState, useEffect, useRef, useMemo } from 'react';
+
+// 结果查询：筛选、排序、阶段/概念统计
+// 在 Web Worker 中对列式数组计算，只把命中行的下标传回主线程；不支持 Worker 时在主线程用同一份实现
+// 下面三个函数会被序列化进 Worker，必须自包含（不引用函数外的变量）
+
+export function toColumns(results) {
+  const columns = { stage: [], code: [], price: [], change: [], concepts: [] };
+  for (let i = 0; i < results.length; i++) {
+    const r = results[i];
+    const concepts = r.concepts;
+    columns.stage.push(r.stage);
+    columns.code.push(r.code);
+    columns.price.push(Number(r.price) || 0);
+    columns.change.push(parseFloat(String(r.change).replace('%', '')) || 0);
+    // 后端的概念可能是数组或 ' / ' 连接的字符串
+    columns.concepts.push(!concepts ? [] : Array.isArray(concepts) ? concepts : String(concepts).split(' / '));
+  }
+  return columns;
+}
+
+export function summarize(columns) {
+  const stageCounts = {};
+  const conceptCounts = {};
+  for (let i = 0; i < columns.stage.length; i++) {
+    stageCounts[columns.stage[i]] = (stageCounts[columns.stage[i]] || 0) + 1;
+    const concepts = columns.concepts[i];
+    for (let j = 0; j < concepts.length; j++) {
+      conceptCounts[concepts[j]] = (conceptCounts[concepts[j]] || 0) + 1;
+    }
+  }
+  const concepts = Object.keys(conceptCounts)
+    .sort((a, b) => conceptCounts[b] - conceptCounts[a] || (a < b ? -1 : 1))
+    .map(name => [name, conceptCounts[name]]);
+  return { stageCounts, conceptCounts: concepts };
+}
+
+export function queryColumns(columns, query) {
+  const { stage, concept, sortKey, sortDir } = query;
+  const total = columns.stage.length;
+  const matched = new Int32Array(total);
+  let n = 0;
+  for (let i = 0; i < total; i++) {
+    if (stage && columns.stage[i] !== stage) continue;
+    if (concept && columns.concepts[i].indexOf(concept) < 0) continue;
+    matched[n++] = i;
+  }
+  const indices = matched.slice(0, n);
+  if (sortKey && columns[sortKey]) {
+    const values = columns[sortKey];
+    const sign = sortDir === 'asc' ? 1 : -1;
+    // 值相同按原顺序（后端已按阶段、代码排好）
+    indices.sort((a, b) => (values[a] < values[b] ? -sign : values[a] > values[b] ? sign : a - b));
+  }
+  return indices;
+}
+
+function createQueryWorker() {
+  if (typeof Worker === 'undefined' || typeof Blob === 'undefined') return null;
+  const source = `
+const toColumns = ${toColumns.toString()};
+const summarize = ${summarize.toString()};
+const queryColumns = ${queryColumns.toString()};
+let columns = null;
+self.onmessage = (e) => {
+  const msg = e.data;
+  if (msg.type === 'load') {
+    columns = toColumns(msg.results);
+    self.postMessage({ type: 'summary', summary: summarize(columns) });
+  } else if (msg.type === 'query') {
+    const indices = queryColumns(columns, msg.query);
+    self.postMessage({ type: 'query', id: msg.id, indices }, [indices.buffer]);
+  }
+};`;
+  try {
+    const url = URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+    const worker = new Worker(url);
+    URL.revokeObjectURL(url);
+    return worker;
+  } catch {
+    // file:// 等环境可能禁止创建 Worker，退回主线程
+    return null;
+  }
+}
+
+/**
+ * 筛选/排序/统计扫描结果
+ * @param {object[]} results - 扫描结果
+ * @param {object} query - { stage, concept, sortKey, sortDir }
+ * @returns {{ rows: object[], summary: { stageCounts, conceptCounts } }}
+ */
+export function useResultQuery(results, query) {
+  const [summary, setSummary] = useState({ stageCounts: {}, conceptCounts: [] });
+  const [indices, setIndices] = useState(null);
+  const workerRef = useRef(null);
+  const columnsRef = useRef(null);
+  const seqRef = useRef(0);
+
+  useEffect(() => {
+    const worker = createQueryWorker();
+    workerRef.current = worker;
+    setIndices(null);
+    if (!worker) {
+      columnsRef.current = toColumns(results);
+      setSummary(summarize(columnsRef.current));
+      return undefined;
+    }
+    worker.onmessage = (e) => {
+      const msg = e.data;
+      if (msg.type === 'summary') {
+        setSummary(msg.summary);
+      } else if (msg.id === seqRef.current) {
+        // 只采用最新一次查询的结果
+        setIndices(msg.indices);
+      }
+    };
+    worker.postMessage({ type: 'load', results });
+    return () => worker.terminate();
+  }, [results]);
+
+  const { stage, concept, sortKey, sortDir } = query;
+  useEffect(() => {
+    const id = ++seqRef.current;
+    const q = { stage, concept, sortKey, sortDir };
+    if (workerRef.current) {
+      workerRef.current.postMessage({ type: 'query', id, query: q });
+    } else {
+      setIndices(queryColumns(columnsRef.current, q));
+    }
+  }, [results, stage, concept, sortKey, sortDir]);
+
+  const rows = useMemo(
+    () => (indices ? Array.from(indices, i => results[i]) : results),
+    [indices, results]
+  );
+  return { rows, summary };
+}
@@ -1,88 +1,225 @@
-export function generateSnapshot(stocks, strategyName, filterText) {
-  // 创建画布
-  const canvas = document.createElement('canvas');
+// 策略快照图片：直接用结果数据绘制，不截取页面 DOM
+// 版式与 Python 端 utils/snapshot_image.py 一致（尺寸、颜色、分页、文件名），两边生成同样的图片
+// 支持 OffscreenCanvas 的浏览器在 Web Worker 中绘制与编码，不阻塞页面；否则在主线程用同一份绘制函数
+
+export const SNAPSHOT_LAYOUT = {
+  width: 1080,
+  columns: 4,
+  padding: 40,
+  cellHeight: 56,
+  headerHeight: 100,
+  footerHeight: 50,
+  maxPageHeight: 4000,
+  titleSize: 36,
+  nameSize: 18,
+  codeSize: 18,
+  infoSize: 16
+};
+
+export const SNAPSHOT_COLORS = {
+  background: '#fafafa',
+  header: '#1e40af',
+  title: '#ffffff',
+  box: '#ffffff',
+  border: '#d1d5db',
+  name: '#374151',
+  code: '#1e40af',
+  codeOnly: '#1f2937',
+  footer: '#6b7280'
+};
+
+const SNAPSHOT_FONT = '"PingFang SC", "Noto Sans CJK SC", "Microsoft YaHei", sans-serif';
+
+// 按每页最大高度分页（同 snapshot_image.paginate）
+export function paginateStocks(stocks, layout = SNAPSHOT_LAYOUT) {
+  const { maxPageHeight, headerHeight, footerHeight, padding, cellHeight, columns } = layout;
+  const rowsPerPage = Math.max(Math.floor((maxPageHeight - headerHeight - footerHeight - padding * 2) / cellHeight), 1);
+  const perPage = rowsPerPage * columns;
+  const pages = [];
+  for (let i = 0; i < stocks.length; i += perPage) {
+    pages.push(stocks.slice(i, i + perPage));
+  }
+  return pages.length ? pages : [[]];
+}
+
+// 绘制一页（同 snapshot_image.render_page）；会被序列化进 Worker，必须自包含
+function drawSnapshotPage(createCanvas, page, title, footer, layout, colors, fontFamily) {
+  const { width, columns, padding, cellHeight, headerHeight, footerHeight } = layout;
+  const rows = Math.ceil(page.length / columns);
+  const height = headerHeight + rows * cellHeight + footerHeight + padding * 2;
+  const canvas = createCanvas(width, height);
   const ctx = canvas.getContext('2d');
+  const font = size => `${size}px ${fontFamily}`;
 
-  // 设置尺寸
-  const width = 1400;
-  const padding = 60;
-  const rowHeight = 50;
-  const headerHeight = 100;
-  const footerHeight = 60;
-  const stocksPerRow = 4;
-  const rows = Math.ceil(stocks.length / stocksPerRow);
-  const contentHeight = rows * rowHeight;
-  const height = headerHeight + contentHeight + footerHeight + padding * 2;
-
-  canvas.width = width;
-  canvas.height = height;
-
-  // 绘制背景
-  ctx.fillStyle = '#fafafa';
-  ctx.fillRect(0, 0, width, height);
+  // 同一字号的字形宽度只测一次
+  const widths = {};
+  const textWidth = (text, size) => {
+    const cache = widths[size] || (widths[size] = {});
+    ctx.font = font(size);
+    let total = 0;
+    for (const ch of text) {
+      if (cache[ch] === undefined) cache[ch] = ctx.measureText(ch).width;
+      total += cache[ch];
+    }
+    return total;
+  };
+  const fit = (text, size, maxWidth) => {
+    if (textWidth(text, size) <= maxWidth) return text;
+    let chars = Array.from(text);
+    while (chars.length && textWidth(chars.join('') + '…', size) > maxWidth) chars = chars.slice(0, -1);
+    return chars.join('') + '…';
+  };
 
-  // 绘制标题背景
-  ctx.fillStyle = '#1e40af';
+  ctx.fillStyle = colors.background;
+  ctx.fillRect(0, 0, width, height);
+  ctx.fillStyle = colors.header;
   ctx.fillRect(0, 0, width, headerHeight);
 
-  // 绘制标题
-  ctx.fillStyle = 'white';
-  ctx.font = 'bold 36px Helvetica, Arial, sans-serif';
+  ctx.textBaseline = 'middle';
   ctx.textAlign = 'center';
-  ctx.fillText(`策略: ${strategyName} | ${filterText}`, width / 2, 60);
-
-  // 绘制股票信息
-  const startY = headerHeight + padding;
-  const stockWidth = (width - padding * 2) / stocksPerRow;
-
-  stocks.forEach((stock, i) => {
-    const row = Math.floor(i / stocksPerRow);
-    const col = i % stocksPerRow;
-    const x = padding + col * stockWidth + 10;
-    const y = startY + row * rowHeight + 10;
-    const boxW = stockWidth - 20;
-    const boxH = rowHeight - 10;
-
-    // 绘制背景框
-    ctx.fillStyle = 'white';
-    ctx.fillRect(x, y, boxW, boxH);
-    ctx.strokeStyle = '#d1d5db';
+  ctx.fillStyle = colors.title;
+  ctx.font = font(layout.titleSize);
+  ctx.fillText(title, Math.floor(width / 2), Math.floor(headerHeight / 2));
+
+  const cellWidth = Math.floor((width - padding * 2) / columns);
+  page.forEach((stock, i) => {
+    const x = padding + (i % columns) * cellWidth + 8;
+    const y = headerHeight + padding + Math.floor(i / columns) * cellHeight + 6;
+    const boxWidth = cellWidth - 16;
+    const boxHeight = cellHeight - 12;
+    ctx.fillStyle = colors.box;
+    ctx.fillRect(x, y, boxWidth + 1, boxHeight + 1);
+    ctx.strokeStyle = colors.border;
     ctx.lineWidth = 1;
-    ctx.strokeRect(x, y, boxW, boxH);
-
-    // 绘制股票名称（左侧）
-    ctx.fillStyle = '#374151';
-    ctx.font = 'bold 18px Helvetica, Arial, sans-serif';
-    ctx.textAlign = 'left';
-    const nameX = x + 15;
-    const centerY = y + boxH / 2 + 6;
-    ctx.fillText(stock.name, nameX, centerY);
-
-    // 绘制股票代码（右侧）
-    ctx.fillStyle = '#1e40af';
-    ctx.font = '16px "JetBrains Mono", monospace';
-    ctx.textAlign = 'right';
-    const codeX = x + boxW - 15;
-    ctx.fillText(stock.code, codeX, centerY);
+    ctx.strokeRect(x + 0.5, y + 0.5, boxWidth, boxHeight);
+
+    const centerY = y + Math.floor(boxHeight / 2);
+    if (stock.name) {
+      const codeWidth = textWidth(stock.code, layout.codeSize);
+      ctx.textAlign = 'left';
+      ctx.fillStyle = colors.name;
+      ctx.font = font(layout.nameSize);
+      ctx.fillText(fit(stock.name, layout.nameSize, boxWidth - codeWidth - 36), x + 12, centerY);
+      ctx.textAlign = 'right';
+      ctx.fillStyle = colors.code;
+      ctx.font = font(layout.codeSize);
+      ctx.fillText(stock.code, x + boxWidth - 12, centerY);
+    } else {
+      ctx.textAlign = 'center';
+      ctx.fillStyle = colors.codeOnly;
+      ctx.font = font(layout.codeSize);
+      ctx.fillText(stock.code, x + Math.floor(boxWidth / 2), centerY);
+    }
   });
 
-  // 绘制底部信息
-  ctx.fillStyle = '#6b7280';
-  ctx.font = '16px Helvetica, Arial, sans-serif';
   ctx.textAlign = 'center';
-  const now = new Date().toLocaleString('zh-CN');
-  ctx.fillText(`共 ${stocks.length} 只股票 | 生成时间: ${now}`, width / 2, height - 25);
-
-  // 下载图片
-  canvas.toBlob(blob => {
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    const safeFilterText = filterText.replace(/\s+/g, '_').replace(/[\/\\:*?"<>|]/g, '');
-    a.download = `strategy_snapshot_${strategyName}_${safeFilterText}.png`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
+  ctx.fillStyle = colors.footer;
+  ctx.font = font(layout.infoSize);
+  ctx.fillText(footer, Math.floor(width / 2), height - Math.floor(footerHeight / 2));
+  return canvas;
+}
+
+function createSnapshotWorker() {
+  if (typeof Worker === 'undefined' || typeof OffscreenCanvas === 'undefined') return null;
+  const source = `
+const drawSnapshotPage = ${drawSnapshotPage.toString()};
+self.onmessage = async (e) => {
+  const { pages, layout, colors, fontFamily, type } = e.data;
+  const createCanvas = (w, h) => new OffscreenCanvas(w, h);
+  try {
+    const blobs = [];
+    for (const p of pages) {
+      const canvas = drawSnapshotPage(createCanvas, p.stocks, p.title, p.footer, layout, colors, fontFamily);
+      blobs.push(await canvas.convertToBlob({ type }));
+    }
+    self.postMessage({ blobs });
+  } catch (err) {
+    self.postMessage({ error: String(err) });
+  }
+};`;
+  try {
+    const url = URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+    const worker = new Worker(url);
     URL.revokeObjectURL(url);
+    return worker;
+  } catch {
+    return null;
+  }
+}
+
+function renderOnMainThread(pages, type) {
+  const createCanvas = (w, h) => {
+    const canvas = document.createElement('canvas');
+    canvas.width = w;
+    canvas.height = h;
+    return canvas;
+  };
+  return Promise.all(pages.map(p => new Promise(resolve => {
+    const canvas = drawSnapshotPage(createCanvas, p.stocks, p.title, p.footer, SNAPSHOT_LAYOUT, SNAPSHOT_COLORS, SNAPSHOT_FONT);
+    canvas.toBlob(resolve, type);
+  })));
+}
+
+function renderPages(pages, type) {
+  const worker = createSnapshotWorker();
+  if (!worker) return renderOnMainThread(pages, type);
+  return new Promise(resolve => {
+    // Worker 中绘制或编码失败时退回主线程
+    const fallback = () => {
+      worker.terminate();
+      resolve(renderOnMainThread(pages, type));
+    };
+    worker.onmessage = (e) => {
+      if (e.data.error) return fallback();
+      worker.terminate();
+      resolve(e.data.blobs);
+    };
+    worker.onerror = fallback;
+    worker.postMessage({ pages, layout: SNAPSHOT_LAYOUT, colors: SNAPSHOT_COLORS, fontFamily: SNAPSHOT_FONT, type });
+  });
+}
+
+function downloadBlob(blob, filename) {
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  document.body.removeChild(a);
+  URL.revokeObjectURL(url);
+}
+
+function formatNow() {
+  const pad = n => String(n).padStart(2, '0');
+  const d = new Date();
+  return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+}
+
+/**
+ * 生成并下载策略快照图片（命中较多时分页，文件名带 _p1、_p2 …）
+ * @param {object[]} stocks - [{ code, name }]
+ * @param {string} strategyName - 策略名称
+ * @param {string} filterText - 当前筛选条件，'全部标的' 时标题与 Python 端相同
+ * @param {string} format - png / webp
+ * @returns {Promise<number>} 生成的图片张数
+ */
+export async function generateSnapshot(stocks, strategyName, filterText, format = 'png') {
+  const pages = paginateStocks(stocks);
+  const now = formatNow();
+  const filtered = filterText && filterText !== '全部标的';
+  const title = `策略: ${strategyName}${filtered ? ` | ${filterText}` : ''}`;
+  const jobs = pages.map((page, i) => ({
+    stocks: page,
+    title,
+    footer: `共 ${stocks.length} 只股票 | 生成时间: ${now}${pages.length > 1 ? ` | ${i + 1}/${pages.length}` : ''}`
+  }));
+
+  const blobs = await renderPages(jobs, `image/${format}`);
+  const safeFilterText = filtered ? `_${filterText.replace(/\s+/g, '_').replace(/[\/\\:*?"<>|]/g, '')}` : '';
+  blobs.forEach((blob, i) => {
+    const suffix = pages.length > 1 ? `_p${i + 1}` : '';
+    downloadBlob(blob, `strategy_snapshot_${strategyName}${safeFilterText}${suffix}.${format}`);
   });
+  return blobs.length;
 }
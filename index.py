@@ -1,33 +1,18 @@
 import os
+import time
+import logging
 import pandas as pd
 import argparse
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 从 utils/data_tools 导入
-from utils.data_tools import load_concept_map, load_stock_name_map, generate_report
-from strategies import ma5_support, volume_breakout, breakout_pullback
-
-DATA_DIR = "./stock_data"
-
-# 策略映射表
-STRATEGY_MAP = {
-    'ma5': {
-        'name': 'ma5',
-        'func': ma5_support.analyze,
-        'description': 'MA5均线支撑策略'
-    },
-    'volume_breakout': {
-        'name': 'volume_breakout',
-        'func': volume_breakout.analyze,
-        'description': '放量突破策略（吸筹→启动，无整理期）'
-    },
-    'breakout_pullback': {
-        'name': 'breakout_pullback',
-        'func': breakout_pullback.analyze,
-        'description': '突破回调策略（大红小绿吸筹+放量+三连阳后缩量大跌）'
-    }
-}
+from utils.data_tools import load_concept_map, load_stock_name_map
+from utils.bar_store import DATA_DIR, resolve_code
+from utils.features import load_features
+from utils.panel import load_panel
+from utils import profiling, metrics, manifest, report, archive
+from strategies.registry import STRATEGY_MAP
 
 def analyze_single_stock(code: str, strategy: str = "ma5"):
     """
@@ -43,39 +28,23 @@ def analyze_single_stock(code: str, strategy: str = "ma5"):
     analyze_func = strategy_config['func']
     
     # 2. 处理代码格式
-    if '.' in code:
-        # 已经是 sh.600519 格式
-        full_code = code
-        pure_code = code.split('.')[1]
-    else:
-        # 纯数字代码，需要判断 sh 还是 sz
-        pure_code = code
-        if code.startswith('6'):
-            full_code = f"sh.{code}"
-        elif code.startswith('0') or code.startswith('3'):
-            full_code = f"sz.{code}"
-        elif code.startswith('8') or code.startswith('4') or code.startswith('92'):
-            full_code = f"bj.{code}"
-        else:
-            return {"error": f"无法识别股票代码: {code}"}
-    
-    # 3. 加载股票数据
-    file_path = os.path.join(DATA_DIR, f"{full_code}.csv")
-    if not os.path.exists(file_path):
-        return {"error": f"股票数据不存在: {code}"}
+    resolved = resolve_code(code)
+    if not resolved:
+        return {"error": f"无法识别股票代码: {code}"}
+    pure_code, full_code = resolved
     
+    # 3. 加载特征表：与扫描（process_file）同一个加载入口，只基于策略声明的最近K线计算
     try:
-        df = pd.read_csv(file_path)
+        df = load_features(full_code, strategy_config['lookback'])
+        if df is None:
+            return {"error": f"股票数据不存在: {code}"}
         if df.empty or len(df) < 60:
             return {"error": f"股票数据不足: {code}"}
         
         # 4. 分析
         stage = analyze_func(df)
         
-        # 5. 计算额外指标
-        df['MA5'] = df['close'].rolling(5).mean()
-        df['MA30'] = df['close'].rolling(30).mean()
-        
+        # 5. 额外指标直接取特征表中的均线
         curr = df.iloc[-1]
         prev = df.iloc[-2]
         pct = round((curr['close'] - prev['close']) / prev['close'] * 100, 2)
@@ -99,18 +68,117 @@ def analyze_single_stock(code: str, strategy: str = "ma5"):
     except Exception as e:
         return {"error": f"分析失败: {str(e)}"}
 
-def process_file(file_name, concept_map, stock_name_map, analyze_func):
+def _evaluate_stock(code, strategies, concept_map, stock_name_map):
+    """
+    批量分析中的单只股票：特征表只计算一次（命中缓存时不读盘），依次执行多个策略
+    返回: (结果, 错误)，二者其一为 None
+    """
+    resolved = resolve_code(code)
+    if not resolved:
+        return None, {"code": code, "error": f"无法识别股票代码: {code}"}
+    pure_code, full_code = resolved
+
+    try:
+        # 与扫描同一个加载入口；多个策略共用一张特征表，取其中最长的回看K线数
+        df = load_features(full_code, max(STRATEGY_MAP[name]['lookback'] for name in strategies))
+        if df is None:
+            return None, {"code": code, "error": f"股票数据不存在: {code}"}
+        if len(df) < 60:
+            return None, {"code": code, "error": f"股票数据不足: {code}"}
+
+        stages = {name: STRATEGY_MAP[name]['func'](df) for name in strategies}
+
+        curr = df.iloc[-1]
+        ma5 = curr['MA5']
+        ma30 = curr['MA30']
+        prev = df.iloc[-2]
+        pct = round((curr['close'] - prev['close']) / prev['close'] * 100, 2)
+
+        return {
+            "代码": pure_code,
+            "名称": stock_name_map.get(pure_code, ''),
+            "完整代码": full_code,
+            "现价": float(curr['close']),
+            "涨跌幅": f"{pct}%",
+            "阶段": stages,
+            "概念": concept_map.get(pure_code, "未分类"),
+            "MA5": round(float(ma5), 2) if not pd.isna(ma5) else None,
+            "MA30": round(float(ma30), 2) if not pd.isna(ma30) else None,
+            "成交量": int(curr['volume']),
+            "数据日期": str(curr['date'])
+        }, None
+    except Exception as e:
+        return None, {"code": code, "error": f"分析失败: {str(e)}"}
+
+def analyze_stocks(codes, strategies=None, max_workers=16):
+    """
+    批量分析多只股票（自选股检查等场景）
+    概念与名称映射只加载一次，每只股票只读取一次数据并依次执行所有策略
+    参数:
+        codes: 股票代码列表，格式同 analyze_single_stock
+        strategies: 策略名称或列表，默认 ["ma5"]
+    返回: dict
+        strategies / total / results（每只股票的 阶段 为 {策略: 阶段}）/ errors
+    """
+    if isinstance(strategies, str):
+        strategies = [strategies]
+    strategies = list(strategies or ['ma5'])
+    unknown = [name for name in strategies if name not in STRATEGY_MAP]
+    if unknown:
+        return {"error": f"找不到策略: {', '.join(unknown)}"}
+
+    # 去重但保持顺序（600519 与 sh.600519 视为同一只股票）
+    unique = {}
+    for code in (str(c).strip() for c in codes):
+        if code:
+            resolved = resolve_code(code)
+            unique.setdefault(resolved[1] if resolved else code, code)
+    codes = list(unique.values())
+
+    concept_map = load_concept_map()
+    stock_name_map = load_stock_name_map()
+
+    results = []
+    errors = []
+    if codes:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(codes))) as executor:
+            outcomes = executor.map(
+                lambda c: _evaluate_stock(c, strategies, concept_map, stock_name_map),
+                codes
+            )
+            for result, error in outcomes:
+                if result:
+                    results.append(result)
+                else:
+                    errors.append(error)
+
+    return {
+        "strategies": strategies,
+        "total": len(codes),
+        "success_count": len(results),
+        "error_count": len(errors),
+        "results": results,
+        "errors": errors
+    }
+
+def process_file(file_name, concept_map, stock_name_map, analyze_func, lookback=None, as_of=None):
     """
     单个文件处理函数，包含概念映射和股票名称
+    lookback: 策略声明的回看K线数，只读取文件尾部这么多行；为空时读取全部历史
+    as_of: 扫描开始时的快照日期（manifest.snapshot），只看该日及之前的K线
     """
+    full_code = file_name.replace(".csv", "")
+    t_start = time.perf_counter()
     try:
-        df = pd.read_csv(os.path.join(DATA_DIR, file_name))
-        if df.empty or len(df) < 5: return None
+        # 特征表按数据版本缓存，同一只股票的多个策略共用
+        with profiling.stage('load_features'):
+            df = load_features(full_code, lookback, as_of)
+        if df is None or df.empty or len(df) < 5: return None
         
-        stage = analyze_func(df) 
+        with profiling.stage('analyze'):
+            stage = analyze_func(df) 
         
         if stage:
-            full_code = file_name.replace(".csv", "")
             # 处理代码格式，支持 sh.600000 或 600000
             pure_code = full_code.split(".")[1] if "." in full_code else full_code
             
@@ -124,51 +192,218 @@ def process_file(file_name, concept_map, stock_name_map, analyze_func):
                 '现价': curr['close'],
                 '涨跌幅': f"{pct}%", 
                 '阶段': stage,
-                '概念': concept_map.get(pure_code, "未分类")
+                '概念': concept_map.get(pure_code, "未分类"),
+                '数据日期': str(curr['date'])
             }
-    except Exception:
+    except Exception as e:
+        logging.warning(f"{full_code} 处理失败: {e}")
         return None
+    finally:
+        profiling.record_stock(full_code, time.perf_counter() - t_start)
+
+# 批量引擎每次装入面板的股票数，块与块之间检查取消
+BATCH_CHUNK_SIZE = 500
+
+def scan_batch(files, concept_map, stock_name_map, strategy_config, cancel_event=None, as_of=None):
+    """
+    用策略的批量实现（规则 DSL）扫描：按块加载面板，一次判定整块股票
+    as_of: 扫描开始时的快照日期，只看该日及之前的K线
+    返回: (命中结果列表, 是否被取消)，结果格式与 process_file 相同
+    """
+    batch_func = strategy_config['batch_func']
+    codes = [f.replace(".csv", "") for f in files]
+    results = []
+    for start in tqdm(range(0, len(codes), BATCH_CHUNK_SIZE), desc="执行扫描(批量)"):
+        if cancel_event is not None and cancel_event.is_set():
+            print("⏹️ 扫描已取消")
+            return results, True
+        with profiling.stage('load_panel'):
+            panel, _ = load_panel(codes[start:start + BATCH_CHUNK_SIZE], strategy_config['lookback'], as_of)
+        if not panel.codes:
+            continue
+        close = panel.column('close')
+        with profiling.stage('analyze_batch'):
+            stages = batch_func(panel)
+        for row, stage in enumerate(stages):
+            if not stage:
+                continue
+            full_code = panel.codes[row]
+            pure_code = full_code.split(".")[1] if "." in full_code else full_code
+            curr_close, prev_close = close[row, -1], close[row, -2]
+            pct = round((curr_close - prev_close) / prev_close * 100, 2)
+            results.append({
+                '代码': pure_code,
+                '名称': stock_name_map.get(pure_code, ''),
+                '完整代码': full_code,
+                '现价': float(curr_close),
+                '涨跌幅': f"{pct}%",
+                '阶段': stage,
+                '概念': concept_map.get(pure_code, "未分类"),
+                '数据日期': str(panel.dates[row, -1])
+            })
+    return results, False
 
-def run_scanner(strategy_name):
+def run_scanner(strategy_name, cancel_event=None, generate_html=True, open_browser=True, engine="auto",
+                report_formats=('html',), save_archive=True):
+    """
+    执行全市场扫描
+    参数:
+        strategy_name: 策略名称
+        cancel_event: 可选的 threading.Event，置位后停止提交剩余文件并提前返回
+        generate_html: 是否生成HTML报告，为 False 时只返回结构化结果
+        open_browser: 生成报告后是否自动打开浏览器
+        engine: "batch" 批量规则引擎 / "stock" 逐只判定 / "auto" 策略提供批量实现时用批量
+        report_formats: 报告格式，html / bundle / csv / jsonl / parquet 的任意组合（generate_html 为 True 时生效）
+        save_archive: 是否把结果归档到 scan_archive（用于日间对比，见 utils/archive.py）
+    返回: dict
+        success / strategy / description / hits / total_scanned / total_hit /
+        stage_counts / data_date / snapshot / diff / timings / report_path / report_files，失败时包含 error
+    """
+    t_start = time.perf_counter()
+    # 固定数据快照：扫描期间 appendData 追加的新K线不会混进本次结果
+    snapshot = manifest.snapshot()
     strategy_config = STRATEGY_MAP.get(strategy_name)
     if not strategy_config:
         print(f"❌ 找不到策略: {strategy_name}")
-        return
+        return {"success": False, "strategy": strategy_name, "error": f"找不到策略: {strategy_name}"}
     
     analyze_func = strategy_config['func']
     strategy_desc = strategy_config['description']
+    try:
+        report_formats = report.check_formats(report_formats) if generate_html else []
+    except ValueError as e:
+        print(f"❌ {e}")
+        return {"success": False, "strategy": strategy_name, "error": str(e)}
 
     print(f"⚡ 启动量价+题材扫描 | 策略: {strategy_name} ({strategy_desc})")
     
     # 1. 获取概念地图和股票名称映射，直接秒读本地磁盘
-    concept_map = load_concept_map()
-    stock_name_map = load_stock_name_map()
+    with profiling.stage('load_metadata'):
+        concept_map = load_concept_map()
+        stock_name_map = load_stock_name_map()
+    t_metadata = time.perf_counter()
     
     # 2. 获取待扫描文件
     if not os.path.exists(DATA_DIR):
         print(f"❌ 数据目录 {DATA_DIR} 不存在")
-        return
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
+        return {"success": False, "strategy": strategy_name, "error": f"数据目录 {DATA_DIR} 不存在"}
+    with profiling.stage('list_files'):
+        files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
     
+    if engine == "auto":
+        engine = "batch" if strategy_config['batch'] else "stock"
+    if engine == "batch" and not strategy_config['batch']:
+        return {"success": False, "strategy": strategy_name, "error": f"策略 {strategy_name} 没有批量实现"}
+
     results = []
-    # 3. 多线程扫描
-    with ThreadPoolExecutor(max_workers=40) as executor:
-        # 注意：这里把 concept_map 和 stock_name_map 传进去了
-        futures = [executor.submit(process_file, f, concept_map, stock_name_map, analyze_func) for f in files]
-        for f in tqdm(as_completed(futures), total=len(futures), desc="执行扫描"):
-            res = f.result()
-            if res: 
-                results.append(res)
-
-    # 4. 生成报告（传入策略名用于文件名区分）
-    if results:
-        generate_report(results, len(files), strategy_name)
+    cancelled = False
+    # 3. 扫描：批量引擎一次判定整块股票，否则多线程逐只判定
+    if engine == "batch":
+        results, cancelled = scan_batch(files, concept_map, stock_name_map, strategy_config, cancel_event, snapshot['as_of'])
     else:
+        with ThreadPoolExecutor(max_workers=40) as executor:
+            # 注意：这里把 concept_map 和 stock_name_map 传进去了
+            futures = [executor.submit(process_file, f, concept_map, stock_name_map, analyze_func,
+                                       strategy_config['lookback'], snapshot['as_of']) for f in files]
+            for f in tqdm(as_completed(futures), total=len(futures), desc="执行扫描"):
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    print("⏹️ 扫描已取消")
+                    cancelled = True
+                    break
+                res = f.result()
+                if res: 
+                    results.append(res)
+    t_scan = time.perf_counter()
+
+    with profiling.stage('sort_results'):
+        results.sort(key=lambda x: (x.get('阶段', ''), x.get('代码', '')))
+        stage_counts = {}
+        for r in results:
+            stage_counts[r['阶段']] = stage_counts.get(r['阶段'], 0) + 1
+
+    # 4. 归档并与上一个交易日对比（取消的扫描结果不完整，不归档）
+    data_date = snapshot['as_of'] or report.results_data_date(results)
+    scan_diff = None
+    if save_archive and not cancelled:
+        with profiling.stage('archive'):
+            archive.save_scan(strategy_name, data_date, results, len(files), snapshot['generation'])
+            scan_diff = archive.diff(strategy_name, to_date=data_date) if data_date else None
+
+    # 5. 生成报告（文件名带快照的数据日期，不再读取数据目录）
+    report_files = {}
+    if cancelled:
+        pass
+    elif not results:
         print("💡 扫描完成，未发现符合策略的标的。")
+    elif report_formats:
+        with profiling.stage('generate_report'):
+            report_files = report.write_report(results, len(files), strategy_name, data_date, report_formats,
+                                               diff=scan_diff)
+        for path in report_files.values():
+            print(f"✅ 报告已生成: {path}")
+        if open_browser and report.report_page(report_files):
+            report.open_in_browser(report.report_page(report_files))
+    report_path = report.report_page(report_files) or next(iter(report_files.values()), None)
+    t_end = time.perf_counter()
+    if not cancelled:
+        metrics.observe_scan(strategy_name, engine, t_scan - t_metadata)
+
+    return {
+        "success": not cancelled,
+        "cancelled": cancelled,
+        "strategy": strategy_name,
+        "description": strategy_desc,
+        "engine": engine,
+        "hits": results,
+        "total_scanned": len(files),
+        "total_hit": len(results),
+        "stage_counts": stage_counts,
+        "data_date": max((r.get('数据日期', '') for r in results), default=None),
+        "snapshot": snapshot,
+        "diff": scan_diff,
+        "timings": {
+            "load_metadata": round(t_metadata - t_start, 3),
+            "scan": round(t_scan - t_metadata, 3),
+            "report": round(t_end - t_scan, 3),
+            "total": round(t_end - t_start, 3)
+        },
+        "report_path": os.path.abspath(report_path) if report_path else None,
+        "report_files": {fmt: os.path.abspath(path) for fmt, path in report_files.items()}
+    }
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--strat', type=str, default='ma5', help='选择策略')
+    parser.add_argument('--no-report', action='store_true', help='只扫描，不生成HTML报告')
+    parser.add_argument('--no-browser', action='store_true', help='生成报告后不自动打开浏览器（无图形界面时自动跳过）')
+    parser.add_argument('--format', type=str, default='html',
+                        help=f"报告格式，逗号分隔：{' / '.join(report.REPORT_FORMATS)}，如 html,csv,jsonl")
+    parser.add_argument('--codes', type=str, help='批量分析指定股票（逗号分隔），不执行全市场扫描')
+    parser.add_argument('--engine', choices=['auto', 'batch', 'stock'], default='auto', help='扫描引擎：批量规则 / 逐只判定')
+    parser.add_argument('--profile', nargs='?', const='stages', choices=['stages', *profiling.PROFILERS],
+                        help='记录各阶段耗时并保存 JSON 跟踪；cprofile / pyinstrument 同时采集调用栈')
+    parser.add_argument('--trace-output', type=str, help='跟踪文件路径，默认 scan_trace_{策略}.json')
     args = parser.parse_args()
     
-    run_scanner(args.strat)
\ No newline at end of file
+    if args.codes:
+        import json
+        batch = analyze_stocks(args.codes.split(','), args.strat.split(','))
+        print(json.dumps(batch, ensure_ascii=False, indent=2))
+    elif args.profile:
+        trace_path = args.trace_output or f"scan_trace_{args.strat}.json"
+        profiler = None if args.profile == 'stages' else args.profile
+        dump_path = None
+        if profiler:
+            dump_path = os.path.splitext(trace_path)[0] + ('.prof' if profiler == 'cprofile' else '.html')
+        with profiling.tracing(f"scan:{args.strat}", profiler, dump_path) as trace:
+            run_scanner(args.strat, generate_html=not args.no_report, open_browser=not args.no_browser,
+                        engine=args.engine, report_formats=args.format)
+        print(profiling.format_trace(trace))
+        print(f"跟踪已保存: {profiling.save_trace(trace, trace_path)}")
+        if dump_path:
+            print(f"剖析数据已保存: {dump_path}")
+    else:
+        run_scanner(args.strat, generate_html=not args.no_report, open_browser=not args.no_browser, engine=args.engine,
+                    report_formats=args.format)
\ No newline at end of file
@@ -2,17 +2,23 @@
 import baostock as bs
 import pandas as pd
 import os
-import json
 from tqdm import tqdm
 from datetime import datetime, timedelta
+from utils import manifest, quality, storage
 
 DATA_DIR = "./stock_data"
 STOCK_NAME_CACHE = "stock_name_cache.json"
+# 每下载这么多只股票做一次校验并写入
+FLUSH_EVERY = 500
 if not os.path.exists(DATA_DIR): 
     os.makedirs(DATA_DIR)
     print(f"📁 已创建文件夹: {DATA_DIR}")
 
-def init_database():
+def init_database(cancel_event=None):
+    """
+    全量下载股票日线数据
+    cancel_event: 可选的 threading.Event，置位后在下一只股票前停止
+    """
     # 1. 登录
     lg = bs.login()
     if lg.error_code != '0':
@@ -53,14 +59,51 @@ def init_database():
         pure_code = code.split('.')[1] if '.' in code else code
         stock_name_map[pure_code] = name
     
-    # 保存股票名称缓存
-    with open(STOCK_NAME_CACHE, 'w', encoding='utf-8') as f:
-        json.dump(stock_name_map, f, ensure_ascii=False)
+    # 保存股票名称缓存（原子替换，扫描中途不会读到写了一半的文件）
+    storage.write_json(STOCK_NAME_CACHE, stock_name_map)
+    manifest.record_names(len(stock_name_map))
     print(f"💾 已保存 {len(stock_name_map)} 只股票名称映射")
 
-    success_count = 0
-    # 5. 循环下载
+    # 5. 循环下载，分批校验后写入
+    batch = {
+        'pending': {},
+        'calendar': quality.fetch_trade_calendar(start_date, end_date),
+        'manifest': {},
+        'report': {}
+    }
+    try:
+        _download_all(stock_list, start_date, end_date, batch, cancel_event)
+    finally:
+        # 已下载的部分照常写入并记入数据清单与质量报告（中途取消或出错时也保留）
+        _flush(batch)
+        if batch['manifest']:
+            manifest.record_stocks(batch['manifest'])
+        if batch['report']:
+            quality.save_report(batch['report'])
+            print(f"🧹 数据校验: {quality.format_summary(batch['report'])}")
+
+    bs.logout()
+    print(f"✅ 初始化完成！成功同步 {len(batch['manifest'])} 只股票。")
+    print(f"📂 数据存储位置: {os.path.abspath(DATA_DIR)}")
+
+def _flush(batch):
+    """校验已下载未写入的数据，写入清洗后的CSV"""
+    if not batch['pending']:
+        return
+    clean, report = quality.validate(batch['pending'], batch['calendar'])
+    for code, df in clean.items():
+        storage.write_csv(f"{DATA_DIR}/{code}.csv", df)
+        batch['manifest'][code] = {'last_date': df['date'].iloc[-1], 'rows': len(df)}
+    batch['report'].update(report)
+    batch['pending'] = {}
+
+def _download_all(stock_list, start_date, end_date, batch, cancel_event=None):
+    """逐只下载日线数据，每 FLUSH_EVERY 只校验并写入一次"""
     for code, status, name in tqdm(stock_list, desc="初始化进度"):
+        if cancel_event is not None and cancel_event.is_set():
+            print("⏹️ 初始化已取消")
+            break
+
         # 严格匹配号段：沪深主板、创业板、科创板、北交所 (920/8/4)
         # 剔除399开头的行业指数
         pure_code = code.split('.')[1]
@@ -73,8 +116,6 @@ def init_database():
         if "ST" in name or "*" in name:
             continue
 
-        file_path = f"{DATA_DIR}/{code}.csv"
-        
         # 抓取日线数据
         rs_data = bs.query_history_k_data_plus(
             code, 
@@ -90,13 +131,9 @@ def init_database():
             res_list.append(rs_data.get_row_data())
         
         if res_list:
-            df = pd.DataFrame(res_list, columns=rs_data.fields)
-            df.to_csv(file_path, index=False)
-            success_count += 1
-            
-    bs.logout()
-    print(f"✅ 初始化完成！成功同步 {success_count} 只股票。")
-    print(f"📂 数据存储位置: {os.path.abspath(DATA_DIR)}")
+            batch['pending'][code] = pd.DataFrame(res_list, columns=rs_data.fields)
+            if len(batch['pending']) >= FLUSH_EVERY:
+                _flush(batch)
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
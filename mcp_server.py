@@ -7,8 +7,9 @@ MCP Server for Stock Strategy Scanner
 import os
 import sys
 import json
+import time
+import base64
 import asyncio
-from datetime import datetime
 from typing import Optional, Dict, Any, List
 from mcp.server import Server
 from mcp.types import Tool, TextContent, ImageContent
@@ -18,33 +19,58 @@ import mcp.server.stdio
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # 导入项目模块
-from index import run_scanner, analyze_single_stock
+from index import run_scanner, analyze_single_stock, analyze_stocks
 from initData import init_database
 from appendData import update_stock_data
-from utils.data_tools import load_concept_map, sync_concepts
+from utils.data_tools import load_concept_map, sync_concepts, format_results
+from utils.bar_store import get_bar_slice, check_slice_args
+from utils.report import REPORT_FORMATS
+from utils.jobs import JOBS, run_blocking
+from utils import watchlist, metrics, archive, snapshot_image
+from strategies.registry import STRATEGY_MAP, strategy_names
 
 # 创建 MCP Server
 app = Server("stock-scanner-mcp")
 
 # ==================== Tools 定义 ====================
 
+# 策略枚举统一来自策略注册表
+STRATEGY_NAMES = strategy_names()
+STRATEGY_DESCRIPTIONS = "、".join(f"{s['name']} ({s['description']})" for s in STRATEGY_MAP.values())
+
 TOOLS = [
     Tool(
         name="run_scanner",
-        description="执行完整的股票策略扫描流程：加载概念数据→扫描所有股票→生成HTML报告",
+        description="执行股票策略扫描：加载概念数据→扫描所有股票→直接返回命中结果(JSON)，可选生成HTML报告",
         inputSchema={
             "type": "object",
             "properties": {
                 "strategy": {
                     "type": "string",
-                    "enum": ["ma5", "volume_breakout", "breakout_pullback"],
+                    "enum": STRATEGY_NAMES,
                     "default": "ma5",
-                    "description": "扫描策略名称：ma5 (MA5均线支撑策略)、volume_breakout (放量突破策略) 或 breakout_pullback (突破回调策略，大红小绿吸筹+放量+三连阳后缩量大跌)"
+                    "description": f"扫描策略名称：{STRATEGY_DESCRIPTIONS}"
+                },
+                "generate_report": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "是否额外生成HTML报告"
                 },
                 "auto_open": {
                     "type": "boolean",
                     "default": False,
-                    "description": "是否自动打开报告"
+                    "description": "是否自动打开报告（隐含生成报告）"
+                },
+                "report_formats": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(REPORT_FORMATS)},
+                    "default": ["html"],
+                    "description": "报告格式（隐含生成报告）：html 交互报告，csv / jsonl / parquet 机器可读结果"
+                },
+                "wait_seconds": {
+                    "type": "number",
+                    "default": 300,
+                    "description": "最多等待秒数，超时后任务在后台继续运行并返回 job_id；0 表示提交后立即返回"
                 }
             }
         }
@@ -61,36 +87,110 @@ TOOLS = [
                 },
                 "strategy": {
                     "type": "string",
-                    "enum": ["ma5", "volume_breakout", "breakout_pullback"],
+                    "enum": STRATEGY_NAMES,
                     "default": "ma5",
-                    "description": "分析策略：ma5 (MA5均线支撑)、volume_breakout (放量突破) 或 breakout_pullback (突破回调策略)"
+                    "description": f"分析策略：{STRATEGY_DESCRIPTIONS}"
                 }
             },
             "required": ["code"]
         }
     ),
+    Tool(
+        name="analyze_stocks_batch",
+        description="批量分析多只股票（一次调用，可同时执行多个策略），返回每只股票的结果与错误",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "codes": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "股票代码列表，如 [\"600519\", \"sz.000001\"]"
+                },
+                "strategies": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": STRATEGY_NAMES
+                    },
+                    "default": ["ma5"],
+                    "description": "要执行的策略列表"
+                }
+            },
+            "required": ["codes"]
+        }
+    ),
+    Tool(
+        name="get_stock_bars",
+        description="获取股票K线(OHLCV)及指标数据，支持多只股票一次查询",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "codes": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "股票代码列表，如 [\"600519\", \"sz.000001\"]"
+                },
+                "start": {
+                    "type": "string",
+                    "description": "开始日期 YYYY-MM-DD（可选）"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "结束日期 YYYY-MM-DD（可选）"
+                },
+                "indicators": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "指标列表：ma<N>、vol_ma<N>、pct_chg，如 [\"ma5\", \"ma20\", \"vol_ma20\"]"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "只返回最后 N 根K线（可选）"
+                }
+            },
+            "required": ["codes"]
+        }
+    ),
     Tool(
         name="init_stock_data",
-        description="初始化股票历史数据，从 BaoStock 下载 2025-01-01 至今的数据",
+        description="初始化股票历史数据，从 BaoStock 下载 2025-01-01 至今的数据（后台任务）",
         inputSchema={
             "type": "object",
-            "properties": {}
+            "properties": {
+                "wait_seconds": {
+                    "type": "number",
+                    "default": 600,
+                    "description": "最多等待秒数，超时后任务在后台继续运行并返回 job_id；0 表示提交后立即返回"
+                }
+            }
         }
     ),
     Tool(
         name="update_stock_data",
-        description="增量更新股票数据，下载最新交易日的数据",
+        description="增量更新股票数据，下载最新交易日的数据（后台任务）",
         inputSchema={
             "type": "object",
-            "properties": {}
+            "properties": {
+                "wait_seconds": {
+                    "type": "number",
+                    "default": 300,
+                    "description": "最多等待秒数，超时后任务在后台继续运行并返回 job_id；0 表示提交后立即返回"
+                }
+            }
         }
     ),
     Tool(
         name="sync_concepts",
-        description="同步东方财富概念板块数据到本地缓存",
+        description="同步东方财富概念板块数据到本地缓存（后台任务）",
         inputSchema={
             "type": "object",
-            "properties": {}
+            "properties": {
+                "wait_seconds": {
+                    "type": "number",
+                    "default": 600,
+                    "description": "最多等待秒数，超时后任务在后台继续运行并返回 job_id；0 表示提交后立即返回"
+                }
+            }
         }
     ),
     Tool(
@@ -109,6 +209,21 @@ TOOLS = [
             "properties": {}
         }
     ),
+    Tool(
+        name="get_metrics",
+        description="获取服务运行指标：各工具调用耗时、扫描耗时、缓存命中、活动任务、数据新鲜度、进程内存",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "prometheus"],
+                    "description": "输出格式，默认 json",
+                    "default": "json"
+                }
+            }
+        }
+    ),
     Tool(
         name="get_stock_concept",
         description="获取指定股票的概念板块",
@@ -122,6 +237,148 @@ TOOLS = [
             },
             "required": ["code"]
         }
+    ),
+    Tool(
+        name="manage_watchlist",
+        description="管理自选股列表：list 列出、save 创建/覆盖、delete 删除、refresh 立即重新评估",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["list", "save", "delete", "refresh"],
+                    "default": "list",
+                    "description": "操作类型"
+                },
+                "name": {
+                    "type": "string",
+                    "description": "自选股列表名称（save/delete/refresh 必填）"
+                },
+                "codes": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "股票代码列表（save 时使用）"
+                },
+                "strategies": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": STRATEGY_NAMES
+                    },
+                    "description": "监控的策略列表（save 时使用，默认 ma5）"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="get_watchlist_transitions",
+        description="查询自选股的阶段变化记录（如 蓄势中 → 启动期），无需全市场扫描",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "自选股列表名称（可选，不填返回全部）"
+                },
+                "since": {
+                    "type": "string",
+                    "description": "只返回该日期（含）之后的变化，YYYY-MM-DD"
+                },
+                "code": {
+                    "type": "string",
+                    "description": "只返回指定股票（可选）"
+                },
+                "strategy": {
+                    "type": "string",
+                    "enum": STRATEGY_NAMES,
+                    "description": "只返回指定策略（可选）"
+                },
+                "limit": {
+                    "type": "integer",
+                    "default": 100,
+                    "description": "最多返回条数"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="get_scan_diff",
+        description="对比策略在两个数据日期的扫描结果（新命中 / 不再命中 / 阶段升级 / 阶段降级），读取扫描归档，不重新扫描",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "strategy": {
+                    "type": "string",
+                    "enum": strategy_names(),
+                    "default": "ma5",
+                    "description": "策略名称"
+                },
+                "to_date": {
+                    "type": "string",
+                    "description": "较晚的数据日期 YYYY-MM-DD（可选，默认最新一次归档）"
+                },
+                "from_date": {
+                    "type": "string",
+                    "description": "较早的数据日期 YYYY-MM-DD（可选，默认 to_date 之前最近一次归档）"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="render_snapshot",
+        description="把最近一次扫描的命中股票渲染成快照图片（代码 + 名称，命中多时分页），多个策略并行渲染，读取扫描归档，不重新扫描",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "strategies": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": strategy_names()},
+                    "description": "策略名称列表（默认全部策略）"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "数据日期 YYYY-MM-DD（可选，默认各策略最新一次归档）"
+                },
+                "format": {
+                    "type": "string",
+                    "enum": list(snapshot_image.IMAGE_FORMATS),
+                    "default": "webp",
+                    "description": "图片格式"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="get_job_status",
+        description="查询后台任务状态与输出；不传 job_id 时列出所有任务",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "任务ID（可选）"
+                },
+                "active_only": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "列表模式下只返回未结束的任务"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="cancel_job",
+        description="取消后台任务（排队中的直接撤销，运行中的在下一只股票前停止）",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "任务ID"
+                }
+            },
+            "required": ["job_id"]
+        }
     )
 ]
 
@@ -134,14 +391,20 @@ async def list_tools() -> List[Tool]:
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Optional[Dict[str, Any]]) -> List[TextContent]:
-    """处理 Tool 调用"""
+    """处理 Tool 调用（按工具记录调用耗时）"""
     arguments = arguments or {}
+    start = time.perf_counter()
+    status = "ok"
     
     try:
         if name == "run_scanner":
             return await handle_run_scanner(arguments)
         elif name == "analyze_single_stock":
             return await handle_analyze_single_stock(arguments)
+        elif name == "analyze_stocks_batch":
+            return await handle_analyze_stocks_batch(arguments)
+        elif name == "get_stock_bars":
+            return await handle_get_stock_bars(arguments)
         elif name == "init_stock_data":
             return await handle_init_stock_data(arguments)
         elif name == "update_stock_data":
@@ -154,72 +417,121 @@ async def call_tool(name: str, arguments: Optional[Dict[str, Any]]) -> List[Text
             return await handle_get_data_status(arguments)
         elif name == "get_stock_concept":
             return await handle_get_stock_concept(arguments)
+        elif name == "get_metrics":
+            return await handle_get_metrics(arguments)
+        elif name == "manage_watchlist":
+            return await handle_manage_watchlist(arguments)
+        elif name == "get_watchlist_transitions":
+            return await handle_get_watchlist_transitions(arguments)
+        elif name == "get_scan_diff":
+            return await handle_get_scan_diff(arguments)
+        elif name == "render_snapshot":
+            return await handle_render_snapshot(arguments)
+        elif name == "get_job_status":
+            return await handle_get_job_status(arguments)
+        elif name == "cancel_job":
+            return await handle_cancel_job(arguments)
         else:
+            status = "unknown"
             return [TextContent(type="text", text=json.dumps({"error": f"未知工具: {name}"}, ensure_ascii=False))]
     except Exception as e:
+        status = "error"
         return [TextContent(type="text", text=json.dumps({"error": str(e)}, ensure_ascii=False))]
+    finally:
+        # 未知工具名统一归为 unknown，避免标签随调用方输入膨胀
+        metrics.observe_tool(name if status != "unknown" else "unknown", status, time.perf_counter() - start)
 
 # ==================== 具体 Tool 实现 ====================
 
+async def run_job(name: str, func, params: Dict[str, Any], wait_seconds: float, timeout_message: str) -> Dict[str, Any]:
+    """
+    提交后台任务并在事件循环中等待
+    等待超时后任务继续在后台运行，返回 job_id 供 get_job_status / cancel_job 使用
+    """
+    job = JOBS.submit(name, func, params)
+    finished = await JOBS.wait(job, wait_seconds)
+    
+    if not finished:
+        return {
+            "warning": timeout_message,
+            "job_id": job.id,
+            "status": job.status
+        }
+    
+    return {
+        "success": job.status == "succeeded",
+        "job_id": job.id,
+        "status": job.status,
+        "output": job.output.getvalue(),
+        "error": job.error
+    }
+
+def refresh_data_status_after(func):
+    """数据写入类任务结束后让数据状态（get_data_status / 指标）重新统计"""
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.invalidate_data_status()
+    return run
+
+def get_wait_seconds(arguments: Dict[str, Any], default: float) -> float:
+    """读取调用方指定的等待秒数，0 表示提交后立即返回"""
+    try:
+        return max(float(arguments.get("wait_seconds", default)), 0)
+    except (TypeError, ValueError):
+        return default
+
 async def handle_run_scanner(arguments: Dict[str, Any]) -> List[TextContent]:
     """处理 run_scanner 工具调用"""
     strategy = arguments.get("strategy", "ma5")
     auto_open = arguments.get("auto_open", False)
+    formats = arguments.get("report_formats") or ["html"]
+    with_report = arguments.get("generate_report", False) or auto_open or "report_formats" in arguments
     
-    # 注意：run_scanner 是同步函数，使用线程池运行
-    import threading
-    result_container = {}
-    
-    def run_in_thread():
-        try:
-            # 捕获输出
-            import io
-            from contextlib import redirect_stdout
-            
-            f = io.StringIO()
-            with redirect_stdout(f):
-                run_scanner(strategy)
-            
-            output = f.getvalue()
-            result_container["output"] = output
-            result_container["success"] = True
-        except Exception as e:
-            result_container["error"] = str(e)
-            result_container["success"] = False
-    
-    # 在后台线程运行
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
-    thread.join(timeout=300)  # 最多等待5分钟
+    job = JOBS.submit(
+        "run_scanner",
+        lambda cancel_event: run_scanner(
+            strategy,
+            cancel_event=cancel_event,
+            generate_html=with_report,
+            open_browser=auto_open,
+            report_formats=formats
+        ),
+        {"strategy": strategy, "generate_report": with_report, "report_formats": formats}
+    )
+    finished = await JOBS.wait(job, get_wait_seconds(arguments, 300))  # 默认最多等待5分钟
     
-    if thread.is_alive():
+    if not finished:
         return [TextContent(type="text", text=json.dumps({
-            "warning": "扫描超时，可能在后台继续运行"
+            "warning": "扫描超时，仍在后台继续运行",
+            "job_id": job.id,
+            "status": job.status
         }, ensure_ascii=False))]
     
-    if result_container.get("success"):
-        # 检查报告文件（根据策略名生成文件名）
-        report_path = f"./scanner_report_{strategy}.html"
-        if os.path.exists(report_path):
-            return [TextContent(type="text", text=json.dumps({
-                "success": True,
-                "message": "扫描完成",
-                "strategy": strategy,
-                "output": result_container.get("output", ""),
-                "report_path": os.path.abspath(report_path),
-                "report_exists": True
-            }, ensure_ascii=False))]
-        else:
-            return [TextContent(type="text", text=json.dumps({
-                "success": True,
-                "message": "扫描完成，未发现符合条件的标的",
-                "strategy": strategy,
-                "output": result_container.get("output", "")
-            }, ensure_ascii=False))]
-    else:
+    scan = job.result or {}
+    if job.status != "succeeded" or not scan.get("success"):
         return [TextContent(type="text", text=json.dumps({
-            "error": result_container.get("error", "未知错误")
+            "error": job.error or scan.get("error") or "扫描未完成",
+            "job_id": job.id,
+            "status": job.status
         }, ensure_ascii=False))]
+    
+    return [TextContent(type="text", text=json.dumps({
+        "success": True,
+        "message": "扫描完成" if scan["total_hit"] else "扫描完成，未发现符合条件的标的",
+        "job_id": job.id,
+        "strategy": strategy,
+        "total_scanned": scan["total_scanned"],
+        "total_hit": scan["total_hit"],
+        "stage_counts": scan["stage_counts"],
+        "data_date": scan["data_date"],
+        "timings": scan["timings"],
+        "report_path": scan["report_path"],
+        "report_files": scan["report_files"],
+        "diff_counts": scan["diff"]["counts"] if scan.get("diff") else None,
+        "hits": format_results(scan["hits"])
+    }, ensure_ascii=False))]
 
 async def handle_analyze_single_stock(arguments: Dict[str, Any]) -> List[TextContent]:
     """处理 analyze_single_stock 工具调用"""
@@ -231,117 +543,226 @@ async def handle_analyze_single_stock(arguments: Dict[str, Any]) -> List[TextCon
             "error": "缺少参数: code"
         }, ensure_ascii=False))]
     
-    result = analyze_single_stock(code, strategy)
+    result = await run_blocking(analyze_single_stock, code, strategy)
     return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
 
-async def handle_init_stock_data(arguments: Dict[str, Any]) -> List[TextContent]:
-    """处理 init_stock_data 工具调用"""
-    import threading
-    result_container = {}
-    
-    def run_in_thread():
-        try:
-            import io
-            from contextlib import redirect_stdout
-            
-            f = io.StringIO()
-            with redirect_stdout(f):
-                init_database()
-            
-            result_container["output"] = f.getvalue()
-            result_container["success"] = True
-        except Exception as e:
-            result_container["error"] = str(e)
-            result_container["success"] = False
-    
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
-    thread.join(timeout=600)  # 最多等待10分钟
+async def handle_analyze_stocks_batch(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 analyze_stocks_batch 工具调用"""
+    codes = arguments.get("codes")
+    if not codes:
+        return [TextContent(type="text", text=json.dumps({
+            "error": "缺少参数: codes"
+        }, ensure_ascii=False))]
+    if isinstance(codes, str):
+        codes = [c for c in codes.split(",") if c.strip()]
     
-    if thread.is_alive():
+    result = await run_blocking(analyze_stocks, codes, arguments.get("strategies"))
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False))]
+
+async def handle_get_stock_bars(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_stock_bars 工具调用"""
+    codes = arguments.get("codes")
+    if not codes:
         return [TextContent(type="text", text=json.dumps({
-            "warning": "初始化超时，可能在后台继续运行"
+            "error": "缺少参数: codes"
         }, ensure_ascii=False))]
+    if isinstance(codes, str):
+        codes = [c for c in codes.split(",") if c.strip()]
+    try:
+        check_slice_args(arguments.get("start"), arguments.get("end"), arguments.get("indicators"), arguments.get("limit"))
+    except ValueError as e:
+        return [TextContent(type="text", text=json.dumps({"error": str(e)}, ensure_ascii=False))]
     
-    return [TextContent(type="text", text=json.dumps({
-        "success": result_container.get("success", False),
-        "output": result_container.get("output", ""),
-        "error": result_container.get("error")
-    }, ensure_ascii=False))]
+    def load_all():
+        return [
+            get_bar_slice(
+                code,
+                start=arguments.get("start"),
+                end=arguments.get("end"),
+                indicators=arguments.get("indicators") or [],
+                limit=arguments.get("limit")
+            )
+            for code in codes
+        ]
+    
+    results = await run_blocking(load_all)
+    return [TextContent(type="text", text=json.dumps(results, ensure_ascii=False))]
+
+async def handle_init_stock_data(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 init_stock_data 工具调用"""
+    result = await run_job(
+        "init_stock_data",
+        refresh_data_status_after(init_database),
+        {},
+        get_wait_seconds(arguments, 600),  # 默认最多等待10分钟
+        "初始化超时，仍在后台继续运行"
+    )
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False))]
 
 async def handle_update_stock_data(arguments: Dict[str, Any]) -> List[TextContent]:
     """处理 update_stock_data 工具调用"""
-    import threading
-    result_container = {}
-    
-    def run_in_thread():
-        try:
-            import io
-            from contextlib import redirect_stdout
-            
-            f = io.StringIO()
-            with redirect_stdout(f):
-                update_stock_data()
-            
-            result_container["output"] = f.getvalue()
-            result_container["success"] = True
-        except Exception as e:
-            result_container["error"] = str(e)
-            result_container["success"] = False
+    result = await run_job(
+        "update_stock_data",
+        refresh_data_status_after(update_stock_data),
+        {},
+        get_wait_seconds(arguments, 300),  # 默认最多等待5分钟
+        "更新超时，仍在后台继续运行"
+    )
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False))]
+
+async def handle_sync_concepts(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 sync_concepts 工具调用"""
+    result = await run_job(
+        "sync_concepts",
+        sync_concepts,
+        {},
+        get_wait_seconds(arguments, 600),  # 默认最多等待10分钟
+        "同步超时，仍在后台继续运行"
+    )
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False))]
+
+async def handle_manage_watchlist(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 manage_watchlist 工具调用"""
+    action = arguments.get("action", "list")
+    name = arguments.get("name")
     
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
-    thread.join(timeout=300)  # 最多等待5分钟
+    if action == "list":
+        watchlists = await run_blocking(watchlist.list_watchlists)
+        return [TextContent(type="text", text=json.dumps(watchlists, ensure_ascii=False, indent=2))]
     
-    if thread.is_alive():
+    if not name:
         return [TextContent(type="text", text=json.dumps({
-            "warning": "更新超时，可能在后台继续运行"
+            "error": "缺少参数: name"
         }, ensure_ascii=False))]
     
+    # 自选股文件的读写与评估都在线程池中执行，不阻塞事件循环
+    if action == "save":
+        try:
+            info, invalid = await run_blocking(watchlist.save_watchlist, name, arguments.get("codes") or [],
+                                               arguments.get("strategies"))
+            result = {"success": True, "name": name, **info, "invalid_codes": invalid}
+        except ValueError as e:
+            result = {"error": str(e)}
+    elif action == "delete":
+        result = {"success": await run_blocking(watchlist.delete_watchlist, name), "name": name}
+    elif action == "refresh":
+        if await run_blocking(watchlist.get_watchlist, name) is None:
+            result = {"error": f"自选股列表不存在: {name}"}
+        else:
+            result = await run_blocking(lambda: watchlist.refresh_watchlists(names=[name]))
+    else:
+        result = {"error": f"未知操作: {action}"}
+    
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+
+async def handle_get_watchlist_transitions(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_watchlist_transitions 工具调用"""
+    transitions = await run_blocking(lambda: watchlist.get_transitions(
+        name=arguments.get("name"),
+        since=arguments.get("since"),
+        code=arguments.get("code"),
+        strategy=arguments.get("strategy"),
+        limit=arguments.get("limit", 100)
+    ))
     return [TextContent(type="text", text=json.dumps({
-        "success": result_container.get("success", False),
-        "output": result_container.get("output", ""),
-        "error": result_container.get("error")
+        "total": len(transitions),
+        "transitions": transitions
+    }, ensure_ascii=False, indent=2))]
+
+async def handle_get_scan_diff(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_scan_diff 工具调用"""
+    strategy = arguments.get("strategy", "ma5")
+    result = await run_blocking(lambda: archive.diff(strategy, to_date=arguments.get("to_date"),
+                                                     from_date=arguments.get("from_date")))
+    if result is None:
+        return [TextContent(type="text", text=json.dumps({
+            "error": "缺少可对比的扫描归档，请先运行扫描（每个数据日期一次）",
+            "dates": await run_blocking(archive.list_dates, strategy)
+        }, ensure_ascii=False))]
+    return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+
+async def handle_render_snapshot(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 render_snapshot 工具调用"""
+    fmt = arguments.get("format", "webp")
+
+    def load_archives():
+        snapshots, missing = {}, []
+        for strategy in arguments.get("strategies") or strategy_names():
+            date = arguments.get("date") or (archive.list_dates(strategy) or [None])[-1]
+            record = archive.load_scan(strategy, date) if date else None
+            if record is None:
+                missing.append(strategy)
+                continue
+            snapshots[strategy] = [{'code': row['code'], 'name': row['name']} for row in archive.record_rows(record).values()]
+        return snapshots, missing
+
+    def read_images(files):
+        images = []
+        for paths in files.values():
+            for path in paths:
+                with open(path, 'rb') as f:
+                    images.append(base64.b64encode(f.read()).decode('ascii'))
+        return images
+
+    snapshots, missing = await run_blocking(load_archives)
+    if not snapshots:
+        return [TextContent(type="text", text=json.dumps({
+            "error": "缺少扫描归档，请先运行扫描",
+            "missing": missing
+        }, ensure_ascii=False))]
+
+    files = await run_blocking(snapshot_image.render_snapshots, snapshots, fmt)
+    contents = [TextContent(type="text", text=json.dumps({
+        "success": True,
+        "files": {name: [os.path.abspath(p) for p in paths] for name, paths in files.items()},
+        "missing": missing
     }, ensure_ascii=False))]
+    for data in await run_blocking(read_images, files):
+        contents.append(ImageContent(type="image", data=data, mimeType=f"image/{fmt}"))
+    return contents
 
-async def handle_sync_concepts(arguments: Dict[str, Any]) -> List[TextContent]:
-    """处理 sync_concepts 工具调用"""
-    import threading
-    result_container = {}
+async def handle_get_job_status(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_job_status 工具调用"""
+    job_id = arguments.get("job_id")
     
-    def run_in_thread():
-        try:
-            import io
-            from contextlib import redirect_stdout
-            
-            f = io.StringIO()
-            with redirect_stdout(f):
-                sync_concepts()
-            
-            result_container["output"] = f.getvalue()
-            result_container["success"] = True
-        except Exception as e:
-            result_container["error"] = str(e)
-            result_container["success"] = False
+    if not job_id:
+        jobs = JOBS.list(active_only=arguments.get("active_only", False))
+        return [TextContent(type="text", text=json.dumps({
+            "total": len(jobs),
+            "jobs": [job.to_dict() for job in jobs]
+        }, ensure_ascii=False, indent=2))]
     
-    thread = threading.Thread(target=run_in_thread)
-    thread.start()
-    thread.join(timeout=600)  # 最多等待10分钟
+    job = JOBS.get(job_id)
+    if job is None:
+        return [TextContent(type="text", text=json.dumps({
+            "error": f"任务不存在: {job_id}"
+        }, ensure_ascii=False))]
+    return [TextContent(type="text", text=json.dumps(job.to_dict(include_output=True), ensure_ascii=False, indent=2))]
+
+async def handle_cancel_job(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 cancel_job 工具调用"""
+    job_id = arguments.get("job_id")
+    
+    if not job_id:
+        return [TextContent(type="text", text=json.dumps({
+            "error": "缺少参数: job_id"
+        }, ensure_ascii=False))]
     
-    if thread.is_alive():
+    job = JOBS.cancel(job_id)
+    if job is None:
         return [TextContent(type="text", text=json.dumps({
-            "warning": "同步超时，可能在后台继续运行"
+            "error": f"任务不存在: {job_id}"
         }, ensure_ascii=False))]
     
     return [TextContent(type="text", text=json.dumps({
-        "success": result_container.get("success", False),
-        "output": result_container.get("output", ""),
-        "error": result_container.get("error")
-    }, ensure_ascii=False))]
+        "success": True,
+        "message": "已发送取消信号，任务将在下一个检查点退出" if not job.done else "任务已结束",
+        **job.to_dict()
+    }, ensure_ascii=False, indent=2))]
 
 async def handle_get_concept_list(arguments: Dict[str, Any]) -> List[TextContent]:
     """处理 get_concept_list 工具调用"""
-    concept_map = load_concept_map()
+    concept_map = await run_blocking(load_concept_map)
     
     # 提取所有概念
     all_concepts = set()
@@ -356,49 +777,45 @@ async def handle_get_concept_list(arguments: Dict[str, Any]) -> List[TextContent
         "concepts": sorted(list(all_concepts))
     }, ensure_ascii=False, indent=2))]
 
-async def handle_get_data_status(arguments: Dict[str, Any]) -> List[TextContent]:
-    """处理 get_data_status 工具调用"""
-    DATA_DIR = "./stock_data"
+def collect_data_status() -> Dict[str, Any]:
+    """统计本地数据状态（优先读取数据清单；没有清单时使用指标模块缓存的目录统计）"""
     CONCEPT_CACHE = "concept_cache.json"
+    status = metrics.data_status()
     
-    # 检查股票数据
-    stock_count = 0
-    last_update = None
-    if os.path.exists(DATA_DIR):
-        files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
-        stock_count = len(files)
-        
-        # 获取最新修改时间
-        if files:
-            mtimes = [os.path.getmtime(os.path.join(DATA_DIR, f)) for f in files]
-            last_update = datetime.fromtimestamp(max(mtimes)).strftime("%Y-%m-%d %H:%M")
-    
-    # 检查概念缓存
-    concept_cache_date = None
-    if os.path.exists(CONCEPT_CACHE):
+    # 概念缓存版本：清单中有记录时不再读取整个概念缓存
+    concept_cache_date = (status.get("concepts") or {}).get("last_update")
+    if concept_cache_date is None and os.path.exists(CONCEPT_CACHE):
         try:
             with open(CONCEPT_CACHE, 'r', encoding='utf-8') as f:
                 cache_data = json.load(f)
-                concept_cache_date = cache_data.get('date')
+                concept_cache_date = cache_data.get('last_update')
         except:
             pass
     
-    # 判断是否需要更新
-    needs_update = False
-    if not last_update:
-        needs_update = True
-    else:
-        last_date = datetime.strptime(last_update.split()[0], "%Y-%m-%d")
-        if (datetime.now() - last_date).days >= 1:
-            needs_update = True
-    
-    return [TextContent(type="text", text=json.dumps({
-        "stock_data_count": stock_count,
-        "last_update": last_update or "未更新",
+    return {
+        "stock_data_count": status["stock_count"],
+        "last_update": status["last_update"] or "未更新",
+        "latest_bar_date": status["latest_bar_date"],
+        "stale_file_count": status["stale_count"],
+        "stale_codes": status.get("stale_codes", [])[:50],
         "concept_cache_date": concept_cache_date or "未同步",
-        "needs_update": needs_update,
-        "data_dir": os.path.abspath(DATA_DIR)
-    }, ensure_ascii=False, indent=2))]
+        "needs_update": status["needs_update"],
+        "data_dir": status["data_dir"],
+        "source": status["source"]
+    }
+
+async def handle_get_data_status(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_data_status 工具调用"""
+    status = await run_blocking(collect_data_status)
+    return [TextContent(type="text", text=json.dumps(status, ensure_ascii=False, indent=2))]
+
+async def handle_get_metrics(arguments: Dict[str, Any]) -> List[TextContent]:
+    """处理 get_metrics 工具调用"""
+    if arguments.get("format") == "prometheus":
+        text = await run_blocking(metrics.render)
+        return [TextContent(type="text", text=text)]
+    summary = await run_blocking(metrics.summary)
+    return [TextContent(type="text", text=json.dumps(summary, ensure_ascii=False, indent=2))]
 
 async def handle_get_stock_concept(arguments: Dict[str, Any]) -> List[TextContent]:
     """处理 get_stock_concept 工具调用"""
@@ -415,7 +832,7 @@ async def handle_get_stock_concept(arguments: Dict[str, Any]) -> List[TextConten
     else:
         pure_code = code
     
-    concept_map = load_concept_map()
+    concept_map = await run_blocking(load_concept_map)
     concepts = concept_map.get(pure_code, "未分类")
     
     return [TextContent(type="text", text=json.dumps({
@@ -429,6 +846,11 @@ async def main():
     """启动 MCP Server"""
     # 使用 stdio 传输
     from mcp.server.stdio import stdio_server
+
+    # 设置 MCP_METRICS_PORT 时额外提供 http://127.0.0.1:<端口>/metrics 供 Prometheus 抓取
+    metrics_port = os.environ.get("MCP_METRICS_PORT")
+    if metrics_port:
+        metrics.serve(int(metrics_port))
     
     async with stdio_server() as (read_stream, write_stream):
         await app.run(
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+策略阈值参数扫描
+示例：
+    # 网格搜索（9 组）
+    python param_sweep.py --strat ma5 -p acc_ratio=1.3,1.5,1.7 -p breakout_pct=3,4,5
+    # 随机搜索 200 组，区间均匀采样
+    python param_sweep.py --strat breakout_pullback -p acc_ratio=1.1:1.6 -p drop_min=-9:-5 --random 200
+    # 查看策略的可调参数及默认值
+    python param_sweep.py --strat volume_breakout --list
+"""
+import argparse
+
+from utils.param_sweep import grid_combinations, random_combinations, parse_space, run_sweep
+from strategies.registry import get_strategy
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strat', type=str, default='ma5', help='选择策略')
+    parser.add_argument('-p', '--param', action='append', help='参数空间：名称=v1,v2,... 或 名称=下限:上限（随机搜索）')
+    parser.add_argument('--random', type=int, help='随机搜索的组数，不指定时做网格搜索')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--signal', type=str, default='🚀 启动期', help='统计的信号阶段')
+    parser.add_argument('--exact', action='store_true', help='信号阶段精确匹配（默认包含匹配）')
+    parser.add_argument('--year', type=int, default=2025, help='回测年份')
+    parser.add_argument('--workers', type=int, help='进程数，默认 CPU 核数')
+    parser.add_argument('--output', type=str, help='结果表路径，默认 param_sweep_{策略}.csv')
+    parser.add_argument('--list', action='store_true', help='列出策略的可调参数')
+    args = parser.parse_args()
+
+    strategy = get_strategy(args.strat)
+    if strategy is None:
+        raise SystemExit(f"❌ 找不到策略: {args.strat}")
+
+    if args.list:
+        for name, default in strategy['params'].items():
+            print(f"  {name} = {default}")
+        raise SystemExit(0)
+
+    space = parse_space(args.param)
+    if args.random:
+        combos = random_combinations(space, args.random, args.seed)
+    else:
+        if any(isinstance(v, tuple) for v in space.values()):
+            raise SystemExit("❌ 区间写法只能用于随机搜索（--random N）")
+        combos = grid_combinations(space)
+
+    output = args.output or f"param_sweep_{args.strat}.csv"
+    print(f"🔧 参数扫描 | 策略: {args.strat} | 组合数: {len(combos)} | 信号: {args.signal}")
+    rows = run_sweep(args.strat, combos, args.signal, args.exact, output, args.workers, args.year)
+
+    print(f"结果已保存: {output}")
+    for row in rows[:10]:
+        print(f"  {row}")
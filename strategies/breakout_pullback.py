@@ -1,5 +1,29 @@
-import pandas as pd
-import numpy as np
+from utils.features import ensure_features
+from utils import kernels
+from utils.rule_dsl import (
+    col, param, bars, where, sum_, max_, min_, count, streak_max, first_true, last_true, at, found, StageRules
+)
+
+STRATEGY_META = {
+    'name': 'breakout_pullback',
+    'description': '突破回调策略（大红小绿吸筹+放量+三连阳后缩量大跌）',
+    'lookback': 60,
+    'columns': ['date', 'open', 'high', 'low', 'close', 'volume'],
+    'indicators': ['ma5', 'ma20', 'ma30', 'ma60', 'vol_ma20', 'pct_chg'],
+    'batch': True,
+    'order': 3
+}
+
+# 可调阈值（analyze 与 RULES 共用，参数扫描时按名称覆盖）
+PARAMS = {
+    'acc_ratio': 1.3,          # 吸筹：红量 / 绿量
+    'max_vol_ratio': 3.0,      # 放量：近5日量能 / 20日均量的上限
+    'rising_gain': 3.0,        # 三连阳：累计涨幅%
+    'shrink_ratio': 0.8,       # 大跌日量能不超过前三日均量的倍数
+    'drop_min': -7.0,          # 大跌日跌幅%下限（不含）
+    'drop_max': -3.0,          # 大跌日跌幅%上限（不含）
+    'recover_ratio': 1.02,     # 收复：收盘价超过大跌日收盘价的倍数
+}
 
 def analyze(df):
     """
@@ -18,60 +42,28 @@ def analyze(df):
     if df is None or len(df) < 60:
         return None
     
-    df = df.copy()
-    for col in ['open', 'high', 'low', 'close', 'volume']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # 指标计算
-    df['MA5'] = df['close'].rolling(5).mean()
-    df['MA20'] = df['close'].rolling(20).mean()
-    df['MA30'] = df['close'].rolling(30).mean()
-    df['MA60'] = df['close'].rolling(60).mean()
-    df['MA20_vol'] = df['volume'].rolling(20).mean()
-    df['pct_chg'] = df['close'].pct_change() * 100
+    # 共享特征表（均线、量均线、吸筹窗口红绿量），只读使用
+    df = ensure_features(df)
     
     curr = df.iloc[-1]
     
     # 时间切片
-    acc_period = df.iloc[-60:-20]
     recent_5d = df.iloc[-5:]
-    recent_20d = df.iloc[-20:]  # 近20日
     
     # ========== 0. 新增筛选：近20日内未出现连续四天及以上阴线 ==========
-    def has_consecutive_bearish(days_df, consecutive_days=4):
-        """检查是否出现连续N天及以上阴线"""
-        if len(days_df) < consecutive_days:
-            return False
-        
-        # 标记阴线（收盘 < 开盘）
-        days_df = days_df.copy()
-        days_df['is_bearish'] = days_df['close'] < days_df['open']
-        
-        # 检查连续阴线
-        consecutive_count = 0
-        for is_bear in days_df['is_bearish']:
-            if is_bear:
-                consecutive_count += 1
-                if consecutive_count >= consecutive_days:
-                    return True
-            else:
-                consecutive_count = 0
-        return False
-    
-    # 如果近20日出现连续4天及以上阴线，直接返回None
-    if has_consecutive_bearish(recent_20d, 4):
+    # 如果近20日出现连续4天及以上阴线（阴线：收盘 < 开盘），直接返回None
+    open_ = df['open'].to_numpy()
+    close = df['close'].to_numpy()
+    if kernels.max_bearish_streak(open_, close, 20)[0] >= 4:
         return None
     
     # ========== 1. 吸筹判定（大红小绿） ==========
-    red_days = acc_period[acc_period['close'] > acc_period['open']]
-    green_days = acc_period[acc_period['close'] <= acc_period['open']]
-    
-    red_vol = red_days['volume'].sum()
-    green_vol = green_days['volume'].sum()
-    red_count = len(red_days)
-    green_count = len(green_days)
+    red_vol = curr['acc_red_vol_60_20']
+    green_vol = curr['acc_green_vol_60_20']
+    red_count = curr['acc_red_cnt_60_20']
+    green_count = curr['acc_green_cnt_60_20']
     
-    is_accumulating = (red_vol > green_vol * 1.3) and (red_count >= green_count)
+    is_accumulating = (red_vol > green_vol * PARAMS['acc_ratio']) and (red_count >= green_count)
     
     if not is_accumulating:
         return None
@@ -80,68 +72,18 @@ def analyze(df):
     vol_above_ma20 = (recent_5d['volume'] > recent_5d['MA20_vol']).sum()
     has_volume_expansion = vol_above_ma20 >= 3
     max_vol_ratio = (recent_5d['volume'] / recent_5d['MA20_vol']).max()
-    is_moderate_volume = max_vol_ratio < 3.0
+    is_moderate_volume = max_vol_ratio < PARAMS['max_vol_ratio']
     volume_ok = has_volume_expansion and is_moderate_volume
     
-    # ========== 3. 三连阳后缩量大跌判定 ==========
-    has_three_rising = False
-    has_crash = False
-    crash_recovered = False
-    
-    three_rising_last_low = None
-    
-    for i in range(-20, -3):
-        if i < -len(df) + 3:
-            continue
-        
-        day1 = df.iloc[i]
-        day2 = df.iloc[i+1]
-        day3 = df.iloc[i+2]
-        
-        rising_count = 0
-        if day1['close'] > day1['open']: rising_count += 1
-        if day2['close'] > day2['open']: rising_count += 1
-        if day3['close'] > day3['open']: rising_count += 1
-        
-        total_gain = (day3['close'] - day1['open']) / day1['open'] * 100
-        
-        if rising_count >= 2 and total_gain > 3:
-            has_three_rising = True
-            three_rising_last_low = day3['low']
-            
-            crash_day = df.iloc[i+3]
-            prev_day = day3
-            
-            is_falling = crash_day['close'] < crash_day['open']
-            break_low = crash_day['low'] < prev_day['low']
-            
-            avg_vol_3d = (day1['volume'] + day2['volume'] + day3['volume']) / 3
-            is_shrinking = crash_day['volume'] < avg_vol_3d * 0.8
-            
-            drop_pct = (crash_day['close'] - crash_day['open']) / crash_day['open'] * 100
-            is_big_drop = -7 < drop_pct < -3
-            
-            if is_falling and break_low and is_shrinking and is_big_drop:
-                has_crash = True
-                
-                if i + 6 < 0:
-                    crash_close = crash_day['close']
-                    for j in range(i+4, min(i+7, 0)):
-                        if df.iloc[j]['close'] > crash_close * 1.02:
-                            crash_recovered = True
-                            break
-                break
-    
-    # ========== 4. 重中之重判定 ==========
-    is_key_signal = False
-    if has_three_rising and three_rising_last_low is not None:
-        for i in range(-5, 0):
-            if i < -len(df):
-                continue
-            check_day = df.iloc[i]
-            if check_day['low'] < three_rising_last_low and check_day['close'] < check_day['open']:
-                is_key_signal = True
-                break
+    # ========== 3. 三连阳后缩量大跌判定 + 4. 重中之重判定 ==========
+    # 逐日顺序搜索在 utils.kernels 中完成（numba 编译或 NumPy 实现）
+    has_three_rising, has_crash, crash_recovered, is_key_signal = (
+        bool(flag[0]) for flag in kernels.three_rising_crash(
+            open_, close, df['low'].to_numpy(), df['volume'].to_numpy(),
+            rising_gain=PARAMS['rising_gain'], shrink_ratio=PARAMS['shrink_ratio'],
+            drop_min=PARAMS['drop_min'], drop_max=PARAMS['drop_max'], recover_ratio=PARAMS['recover_ratio']
+        )
+    )
     
     # ========== 5. 结果输出 ==========
     if has_three_rising and has_crash:
@@ -157,3 +99,63 @@ def analyze(df):
         return "🏖️ 整理区"
     
     return None
+
+# ========== 批量版本（规则 DSL，与 analyze 逐条对应） ==========
+_close, _open, _low, _volume = col('close'), col('open'), col('low'), col('volume')
+_is_red = _close > _open
+_is_bearish = _close < _open
+
+# 0. 近20日内没有连续四天及以上阴线
+_no_bearish_streak = streak_max(_is_bearish, -20, 0) < 4
+
+# 1. 吸筹判定（大红小绿）
+_red_vol = sum_(where(_is_red, _volume, 0), -60, -20)
+_green_vol = sum_(where(_close <= _open, _volume, 0), -60, -20)
+_is_accumulating = (_red_vol > _green_vol * param('acc_ratio', PARAMS['acc_ratio'])) & (count(_is_red, -60, -20) >= count(_close <= _open, -60, -20))
+
+# 2. 五日小幅放量
+_ma20_vol = _volume.rolling_mean(20)
+_volume_ok = (count(_volume > _ma20_vol, -5, 0) >= 3) & (max_(_volume / _ma20_vol, -5, 0) < param('max_vol_ratio', PARAMS['max_vol_ratio']))
+
+# 3. 三连阳后缩量大跌
+# 以三连阳第一天为基准：三天中至少两天收阳且累计涨幅 > 3%
+_rising_count = _is_red + _is_red.shift(-1) + _is_red.shift(-2)
+_total_gain = (_close.shift(-2) - _open) / _open * 100
+_is_rising = (_rising_count >= 2) & (_total_gain > param('rising_gain', PARAMS['rising_gain']))
+
+# 以大跌日为基准：收阴、跌破前一日低点、量能低于前三日均量的80%、跌幅在 3%~7%
+_avg_vol_3d = (_volume.shift(3) + _volume.shift(2) + _volume.shift(1)) / 3
+_drop_pct = (_close - _open) / _open * 100
+_is_crash = (_is_bearish & (_low < _low.shift(1)) & (_volume < _avg_vol_3d * param('shrink_ratio', PARAMS['shrink_ratio']))
+             & (_drop_pct > param('drop_min', PARAMS['drop_min'])) & (_drop_pct < param('drop_max', PARAMS['drop_max'])))
+
+# analyze 顺序检查每个起点，遇到后一天大跌的起点即停止，否则扫描到窗口末尾：
+# 有大跌时取第一个紧跟大跌的起点，没有时取最后一个起点
+_crash_start = first_true(_is_rising & _is_crash.shift(-3), -20, -3)
+_rising_start = where(found(_crash_start), _crash_start, last_true(_is_rising, -20, -3))
+_has_three_rising = found(_rising_start)
+_has_crash = found(_crash_start)
+
+# 大跌后三天内收盘收复大跌日收盘价的 102%（需三天都已走完）
+_recover_close = _close * param('recover_ratio', PARAMS['recover_ratio'])
+_recovers = (_close.shift(-1) > _recover_close) | (_close.shift(-2) > _recover_close) | (_close.shift(-3) > _recover_close)
+_crash_recovered = (_crash_start + 6 < 0) & at(_recovers, _crash_start, 3)
+
+# 4. 重中之重：近5日有收阴且最低价跌破三连阳最后一天的最低价
+_bearish_low = min_(where(_is_bearish, _low, float('inf')), -5, 0)
+_is_key_signal = _bearish_low < at(_low, _rising_start, 2)
+
+RULES = StageRules(
+    [
+        ("🚀 启动期（重中之重）", _has_three_rising & _has_crash & _is_key_signal),
+        ("🚀 启动期（重点）", _has_three_rising & _has_crash & _crash_recovered),
+        ("🚀 启动期", _has_three_rising & _has_crash),
+        ("🧪 蓄势中", _volume_ok & _has_three_rising),
+        ("🏖️ 整理区", True),
+    ],
+    require=(bars() >= 60) & _no_bearish_streak & _is_accumulating
+)
+
+def analyze_batch(panel):
+    """批量判定面板内每只股票最新一根K线的阶段，返回与 panel.codes 对应的列表"""
+    return RULES.latest(panel)
@@ -1,5 +1,24 @@
-import pandas as pd
-import numpy as np
+from utils.features import ensure_features
+from utils.rule_dsl import col, param, bars, where, sum_, mean_, max_, count, any_, StageRules
+
+STRATEGY_META = {
+    'name': 'ma5',
+    'description': 'MA5均线支撑策略',
+    'lookback': 60,
+    'columns': ['date', 'open', 'high', 'low', 'close', 'volume'],
+    'indicators': ['ma5', 'ma30', 'pct_chg'],
+    'batch': True,
+    'order': 1
+}
+
+# 可调阈值（analyze 与 RULES 共用，参数扫描时按名称覆盖）
+PARAMS = {
+    'acc_ratio': 1.5,          # 吸筹：红量 / 绿量
+    'big_vol_ratio': 2.5,      # 洗盘：单日放量超过长期均量的倍数即视为不干净
+    'breakout_pct': 4.0,       # 启动：大阳线涨幅%
+    'breakout_days': 2,        # 启动：10日内大阳线天数
+    'ma5_tolerance': 1.015,    # 回踩：最低价不高于 MA5 的倍数
+}
 
 def analyze(df):
     """
@@ -9,42 +28,31 @@ def analyze(df):
     if df is None or len(df) < 60: 
         return None 
     
-    df = df.copy()
-    for col in ['open', 'high', 'low', 'close', 'volume']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # 指标计算
-    df['MA5'] = df['close'].rolling(5).mean()
-    df['MA30'] = df['close'].rolling(30).mean()
-    df['pct_chg'] = df['close'].pct_change() * 100
-    
-    # 核心判定：缩量大跌信号
-    df['is_shrink_drop'] = (df['low'] < df['low'].shift(1)) & (df['volume'] < df['volume'].shift(1))
+    # 共享特征表（均线、涨跌幅、缩量下跌、吸筹窗口红绿量），只读使用
+    df = ensure_features(df)
     
     # 时间切片
-    acc_period = df.iloc[-60:-30]   
-    shake_period = df.iloc[-30:-10] 
     active_period = df.iloc[-10:]  
     
     curr = df.iloc[-1]
     prev = df.iloc[-2]
 
     # 1. 吸筹判定
-    red_vol = acc_period[acc_period['close'] > acc_period['open']]['volume'].sum()
-    green_vol = acc_period[acc_period['close'] <= acc_period['open']]['volume'].sum()
-    is_accumulating = (red_vol > green_vol * 1.5) 
+    red_vol = curr['acc_red_vol_60_30']
+    green_vol = curr['acc_green_vol_60_30']
+    is_accumulating = (red_vol > green_vol * PARAMS['acc_ratio']) 
     
     # 2. 20日洗盘特征
-    had_panic_shrink_20d = df.iloc[-20:]['is_shrink_drop'].any()
+    had_panic_shrink_20d = df.iloc[-20:]['shrink_drop'].any()
     avg_vol_long = df.iloc[-60:-10]['volume'].mean()
-    big_down_vol = df.iloc[-30:-1]['volume'] > avg_vol_long * 2.5
+    big_down_vol = df.iloc[-30:-1]['volume'] > avg_vol_long * PARAMS['big_vol_ratio']
     is_clean_shake = big_down_vol.any() == False and had_panic_shrink_20d
 
     # 3. 启动特征
-    has_breakout = len(active_period[active_period['pct_chg'] >= 4.0]) >= 2 
+    has_breakout = len(active_period[active_period['pct_chg'] >= PARAMS['breakout_pct']]) >= PARAMS['breakout_days'] 
     is_shrinking = curr['volume'] < prev['volume']  
     ma5_trending_up = curr['MA5'] > prev['MA5']     
-    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * 1.015) 
+    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * PARAMS['ma5_tolerance']) 
     
     is_pullback = is_shrinking and on_ma5 and ma5_trending_up
 
@@ -57,4 +65,37 @@ def analyze(df):
         else:
             return "🏖️ 整理区"
             
-    return None
\ No newline at end of file
+    return None
+
+# ========== 批量版本（规则 DSL，与 analyze 逐条对应） ==========
+_close, _open, _low, _volume = col('close'), col('open'), col('low'), col('volume')
+_ma5 = _close.rolling_mean(5)
+_pct_chg = (_close / _close.shift(1) - 1) * 100
+
+# 1. 吸筹判定（60~30日前红量 > 绿量 × acc_ratio）
+_red_vol = sum_(where(_close > _open, _volume, 0), -60, -30)
+_green_vol = sum_(where(_close <= _open, _volume, 0), -60, -30)
+_is_accumulating = _red_vol > _green_vol * param('acc_ratio', PARAMS['acc_ratio'])
+
+# 2. 20日洗盘特征（"任一天放量超过均量 N 倍" 即 "最大量超过均量 N 倍"）
+_had_panic_shrink_20d = any_((_low < _low.shift(1)) & (_volume < _volume.shift(1)), -20, 0)
+_avg_vol_long = mean_(_volume, -60, -10)
+_is_clean_shake = ~(max_(_volume, -30, -1) > _avg_vol_long * param('big_vol_ratio', PARAMS['big_vol_ratio'])) & _had_panic_shrink_20d
+
+# 3. 启动特征
+_has_breakout = count(_pct_chg >= param('breakout_pct', PARAMS['breakout_pct']), -10, 0) >= param('breakout_days', PARAMS['breakout_days'])
+_is_pullback = ((_volume < _volume.shift(1)) & (_close >= _ma5)
+                & (_low <= _ma5 * param('ma5_tolerance', PARAMS['ma5_tolerance'])) & (_ma5 > _ma5.shift(1)))
+
+RULES = StageRules(
+    [
+        ("🚀 启动期", _has_breakout & _is_pullback),
+        ("🧪 蓄势中", ~_has_breakout & _had_panic_shrink_20d),
+        ("🏖️ 整理区", True),
+    ],
+    require=(bars() >= 60) & _is_accumulating & _is_clean_shake
+)
+
+def analyze_batch(panel):
+    """批量判定面板内每只股票最新一根K线的阶段，返回与 panel.codes 对应的列表"""
+    return RULES.latest(panel)
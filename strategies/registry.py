@@ -0,0 +1,83 @@
+"""
+策略注册表
+自动发现 strategies 目录下的策略模块：模块内定义 analyze(df) 和 STRATEGY_META 即视为一个策略。
+扫描器、API、MCP 和回测脚本统一从这里获取策略，不再各自维护映射表。
+
+STRATEGY_META 字段：
+    name:        策略名称（命令行 / 接口中使用）
+    description: 策略说明
+    lookback:    判定所需的最近K线数量，加载数据时只需读取这么多根
+    columns:     需要的数据列
+    indicators:  用到的指标（与 utils.bar_store 的指标命名一致）
+    batch:       是否提供批量（多只股票一次计算）的实现 analyze_batch
+模块内定义的 RULES（utils.rule_dsl.StageRules）会一并登记，回测等场景可直接在全市场面板上批量计算；
+PARAMS 为策略的可调阈值及默认值（参数扫描使用）
+    order:       展示顺序
+"""
+import os
+import pkgutil
+import importlib
+
+_REQUIRED_META = ('name', 'description', 'lookback')
+
+def discover():
+    """
+    扫描 strategies 目录并加载所有策略模块
+    返回: {策略名称: 策略配置}，按 order 排序
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    found = []
+    for module_info in pkgutil.iter_modules([package_dir]):
+        if module_info.name.startswith('_') or module_info.name == 'registry':
+            continue
+        module = importlib.import_module(f"strategies.{module_info.name}")
+        meta = getattr(module, 'STRATEGY_META', None)
+        if meta is None or not callable(getattr(module, 'analyze', None)):
+            continue
+        missing = [key for key in _REQUIRED_META if key not in meta]
+        if missing:
+            raise ValueError(f"策略 {module_info.name} 的 STRATEGY_META 缺少字段: {', '.join(missing)}")
+
+        found.append({
+            'name': meta['name'],
+            'func': module.analyze,
+            'batch_func': getattr(module, 'analyze_batch', None) if meta.get('batch') else None,
+            'rules': getattr(module, 'RULES', None),
+            'params': dict(getattr(module, 'PARAMS', {})),
+            'description': meta['description'],
+            'lookback': int(meta['lookback']),
+            'columns': list(meta.get('columns', ['date', 'open', 'high', 'low', 'close', 'volume'])),
+            'indicators': list(meta.get('indicators', [])),
+            'batch': bool(meta.get('batch', False)),
+            'order': meta.get('order', 100),
+            'module': module.__name__
+        })
+
+    found.sort(key=lambda s: (s['order'], s['name']))
+    return {s['name']: s for s in found}
+
+# 导入时完成发现，全局共享
+STRATEGY_MAP = discover()
+
+def get_strategy(name):
+    """按名称获取策略配置，不存在返回 None"""
+    return STRATEGY_MAP.get(name)
+
+def strategy_names():
+    return list(STRATEGY_MAP.keys())
+
+def describe_strategies():
+    """返回可 JSON 序列化的策略说明列表（不含函数对象）"""
+    return [
+        {
+            'id': s['name'],
+            'name': s['name'],
+            'description': s['description'],
+            'lookback': s['lookback'],
+            'columns': s['columns'],
+            'indicators': s['indicators'],
+            'batch': s['batch'],
+            'params': s['params']
+        }
+        for s in STRATEGY_MAP.values()
+    ]
@@ -1,5 +1,23 @@
-import pandas as pd
-import numpy as np
+from utils.features import ensure_features
+from utils import kernels
+from utils.rule_dsl import col, param, bars, where, sum_, count, any_, StageRules
+
+STRATEGY_META = {
+    'name': 'volume_breakout',
+    'description': '放量突破策略（吸筹→启动，无整理期）',
+    'lookback': 60,
+    'columns': ['date', 'open', 'high', 'low', 'close', 'volume'],
+    'indicators': ['ma5', 'ma30', 'pct_chg'],
+    'batch': True,
+    'order': 2
+}
+
+# 可调阈值（analyze 与 RULES 共用，参数扫描时按名称覆盖）
+PARAMS = {
+    'acc_ratio': 1.5,          # 吸筹：红量 / 绿量
+    'breakout_pct': 4.0,       # 启动：大阳线涨幅%
+    'ma5_tolerance': 1.015,    # 回踩：最低价不高于 MA5 的倍数
+}
 
 def analyze(df):
     """
@@ -12,56 +30,34 @@ def analyze(df):
     if df is None or len(df) < 60: 
         return None 
     
-    df = df.copy()
-    for col in ['open', 'high', 'low', 'close', 'volume']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # 指标计算
-    df['MA5'] = df['close'].rolling(5).mean()
-    df['MA30'] = df['close'].rolling(30).mean()
-    df['pct_chg'] = df['close'].pct_change() * 100
+    # 共享特征表（均线、涨跌幅、吸筹窗口红绿量、低点下移标记），只读使用
+    df = ensure_features(df)
     
     # 时间切片
-    acc_period = df.iloc[-60:-20]   # 吸筹期：60-20日前
-    shake_period = df.iloc[-20:-5]  # 观察期：20-5日前
     recent_period = df.iloc[-10:]   # 近期：10日内
     
     curr = df.iloc[-1]
     prev = df.iloc[-2]
 
     # 1. 吸筹判定（60-20日前）
-    red_vol = acc_period[acc_period['close'] > acc_period['open']]['volume'].sum()
-    green_vol = acc_period[acc_period['close'] <= acc_period['open']]['volume'].sum()
-    is_accumulating = (red_vol > green_vol * 1.5)
+    red_vol = curr['acc_red_vol_60_20']
+    green_vol = curr['acc_green_vol_60_20']
+    is_accumulating = (red_vol > green_vol * PARAMS['acc_ratio'])
     
     if not is_accumulating:
         return None
     
     # 2. 检测特殊形态：启动期（重点）
-    # 条件：某日最低点 < 前一天最低点 且 前一天股价上涨
-    is_key_breakout = False
-    breakout_date = None
-    
-    for i in range(-30, -1):  # 检查最近30天（不包括今天）
-        if i < -len(df) + 1:
-            continue
-            
-        today_low = df.iloc[i]['low']
-        prev_day = df.iloc[i-1]
-        prev_low = prev_day['low']
-        prev_change = (prev_day['close'] - prev_day['open']) / prev_day['open'] * 100
-        
-        # 条件：今天最低 < 昨天最低 且 昨天上涨
-        if today_low < prev_low and prev_change > 0:
-            is_key_breakout = True
-            breakout_date = df.iloc[i]['date']
-            break
+    # 条件：最近30天内（不包括今天）某日最低点 < 前一天最低点 且 前一天股价上涨
+    is_key_breakout = bool(kernels.lower_low_after_up(
+        df['open'].to_numpy(), df['close'].to_numpy(), df['low'].to_numpy(), -30, -1
+    )[0])
     
     # 3. 启动特征（10日内）
-    has_breakout = len(recent_period[recent_period['pct_chg'] >= 4.0]) >= 1
+    has_breakout = len(recent_period[recent_period['pct_chg'] >= PARAMS['breakout_pct']]) >= 1
     is_shrinking = curr['volume'] < prev['volume']
     ma5_trending_up = curr['MA5'] > prev['MA5']
-    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * 1.015)
+    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * PARAMS['ma5_tolerance'])
     
     is_pullback = is_shrinking and on_ma5 and ma5_trending_up
     
@@ -75,3 +71,34 @@ def analyze(df):
         return "🧪 蓄势中"
     
     return None
+
+# ========== 批量版本（规则 DSL，与 analyze 逐条对应） ==========
+_close, _open, _low, _volume = col('close'), col('open'), col('low'), col('volume')
+_ma5 = _close.rolling_mean(5)
+_pct_chg = (_close / _close.shift(1) - 1) * 100
+
+# 1. 吸筹判定（60~20日前红量 > 绿量 × acc_ratio）
+_red_vol = sum_(where(_close > _open, _volume, 0), -60, -20)
+_green_vol = sum_(where(_close <= _open, _volume, 0), -60, -20)
+_is_accumulating = _red_vol > _green_vol * param('acc_ratio', PARAMS['acc_ratio'])
+
+# 2. 特殊形态：最近30天内（不含今天）某日低点下移且前一天收阳
+_is_key_breakout = any_((_low < _low.shift(1)) & (_close.shift(1) > _open.shift(1)), -30, -1)
+
+# 3. 启动特征
+_has_breakout = count(_pct_chg >= param('breakout_pct', PARAMS['breakout_pct']), -10, 0) >= 1
+_is_pullback = ((_volume < _volume.shift(1)) & (_close >= _ma5)
+                & (_low <= _ma5 * param('ma5_tolerance', PARAMS['ma5_tolerance'])) & (_ma5 > _ma5.shift(1)))
+
+RULES = StageRules(
+    [
+        ("🚀 启动期（重点）", _has_breakout & _is_pullback & _is_key_breakout),
+        ("🚀 启动期", _has_breakout & _is_pullback),
+        ("🧪 蓄势中", _has_breakout),
+    ],
+    require=(bars() >= 60) & _is_accumulating
+)
+
+def analyze_batch(panel):
+    """批量判定面板内每只股票最新一根K线的阶段，返回与 panel.codes 对应的列表"""
+    return RULES.latest(panel)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+扫描归档与日间对比测试
+"""
+from utils import archive, manifest
+
+def _hit(full_code, stage, price=10.0):
+    return {'代码': full_code.split('.')[1], '名称': f'样本{full_code[-1]}', '完整代码': full_code,
+            '现价': price, '涨跌幅': '1.0%', '阶段': stage}
+
+def test_diff_between_dates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    archive.save_scan('breakout_pullback', '2026-02-02', [
+        _hit('sh.600001', '🧪 蓄势中'),
+        _hit('sh.600002', '🚀 启动期'),
+        _hit('sz.000003', '🏖️ 整理区'),
+    ], total_scanned=100)
+    archive.save_scan('breakout_pullback', '2026-02-03', [
+        _hit('sh.600001', '🚀 启动期（重点）'),
+        _hit('sh.600002', '🧪 蓄势中'),
+        _hit('sz.000004', '🚀 启动期'),
+    ], total_scanned=100)
+    assert archive.list_dates('breakout_pullback') == ['2026-02-02', '2026-02-03']
+
+    record = archive.load_scan('breakout_pullback', '2026-02-03')
+    assert record['columns']['fullCode'] == ['sh.600001', 'sh.600002', 'sz.000004']
+    assert record['stages'][record['columns']['stage'][0]] == '🚀 启动期（重点）'
+
+    diff = archive.diff('breakout_pullback')
+    assert (diff['from'], diff['to']) == ('2026-02-02', '2026-02-03')
+    assert [r['fullCode'] for r in diff['added']] == ['sz.000004']
+    assert [r['fullCode'] for r in diff['removed']] == ['sz.000003']
+    assert [(r['code'], r['fromStage']) for r in diff['upgraded']] == [('600001', '🧪 蓄势中')]
+    assert [r['stage'] for r in diff['downgraded']] == ['🧪 蓄势中']
+    assert diff['counts']['unchanged'] == 0
+    assert diff['stageFlow']['🚀 启动期'] == {'entered': 1, 'left': 1}
+
+    assert archive.diff('breakout_pullback', to_date='2026-02-02') is None
+    assert archive.diff('ma5') is None
+
+def test_scanner_archives_results(private_market):
+    from index import run_scanner
+    manifest.rebuild_manifest()
+    result = run_scanner('ma5', generate_html=False, engine='batch')
+    as_of = result['snapshot']['as_of']
+    assert archive.list_dates('ma5') == [as_of]
+    assert result['diff'] is None
+
+    # 伪造前一天的归档：今天的命中全部算新进
+    archive.save_scan('ma5', '2000-01-03', [])
+    result = run_scanner('ma5', generate_html=False, engine='batch')
+    assert result['diff']['from'] == '2000-01-03'
+    assert result['diff']['counts']['added'] == result['total_hit']
+    assert run_scanner('ma5', generate_html=False, save_archive=False)['diff'] is None
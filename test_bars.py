@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+K线区间切片与 /api/stock/<code>/bars 接口测试
+"""
+import numpy as np
+
+from utils import bar_store, kernels
+
+def test_get_bar_slice_range(market):
+    dates = bar_store.load_bars('sh.600001')['date'].tolist()
+    start, end = dates[40], dates[59]
+
+    item = bar_store.get_bar_slice('600001', start=start, end=end)
+    assert item['fullCode'] == 'sh.600001' and item['count'] == 20
+    assert item['dates'] == dates[40:60] and len(item['close']) == 20
+
+    item = bar_store.get_bar_slice('sh.600001', end=end, limit=5)
+    assert item['dates'] == dates[55:60]
+    assert bar_store.get_bar_slice('600001', limit=3)['dates'] == dates[-3:]
+    # 区间外的日期返回空切片
+    assert bar_store.get_bar_slice('600001', start='2999-01-01')['count'] == 0
+
+def test_get_bar_slice_indicators_use_full_history(market):
+    close = bar_store.load_bars('sh.600001')['close'].to_numpy()
+    item = bar_store.get_bar_slice('600001', indicators=['ma5', 'ma20', 'pct_chg'], limit=10)
+    # 均线按全量历史计算后再截取，切片开头的值不会因为窗口不足而为空
+    expected = np.round(kernels.window_mean(close, 20)[-10:], 4).tolist()
+    assert item['indicators']['ma20'] == expected and None not in expected
+    assert item['indicators']['ma5'] == np.round(kernels.window_mean(close, 5)[-10:], 4).tolist()
+
+    head = bar_store.get_bar_slice('600001', indicators=['ma5'], limit=len(close))['indicators']['ma5']
+    assert head[:4] == [None] * 4 and head[4] is not None
+
+def test_get_bar_slice_rejects_bad_arguments(market):
+    assert not bar_store.is_valid_indicator('ma0') and not bar_store.is_valid_indicator('vol_ma0')
+    assert bar_store.is_valid_indicator('ma1') and bar_store.is_valid_indicator('vol_ma20')
+    assert '不支持的指标' in bar_store.get_bar_slice('600001', indicators=['ma0'])['error']
+    assert 'start' in bar_store.get_bar_slice('600001', start='2025/01/02')['error']
+    assert 'limit' in bar_store.get_bar_slice('600001', limit=0)['error']
+    assert '股票数据不存在' in bar_store.get_bar_slice('600999')['error']
+
+def test_bars_endpoint(market):
+    from api_server import app
+    client = app.test_client()
+
+    response = client.get('/api/stock/600001,sz.000002,600999/bars?indicators=ma5,vol_ma20&limit=5')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [item['fullCode'] for item in data['data']] == ['sh.600001', 'sz.000002']
+    assert all(item['count'] == 5 and set(item['indicators']) == {'ma5', 'vol_ma20'} for item in data['data'])
+    assert [e['code'] for e in data['errors']] == ['600999']
+
+    assert client.get('/api/stock/600999/bars').status_code == 404
+    for query in ('indicators=ma0', 'start=20250102', 'end=2025-13-01', 'limit=abc', 'limit=0'):
+        response = client.get(f'/api/stock/600001/bars?{query}')
+        assert response.status_code == 400 and not response.get_json()['success'], query
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+性能基准（需要 pytest-benchmark：pip install pytest-benchmark）
+在合成市场（默认 5000 只股票，环境变量 BENCH_STOCKS 可调）上测量扫描、单股分析与回测的耗时：
+    python -m pytest test_benchmark.py --benchmark-autosave
+    python -m pytest test_benchmark.py --benchmark-compare    # 与上次保存的结果对比
+"""
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from conftest import make_market_dir, _reset_caches
+from strategies.registry import STRATEGY_MAP
+
+BENCH_STOCKS = int(os.environ.get('BENCH_STOCKS', 5000))
+BENCH_DAYS = 250
+
+@pytest.fixture(scope='module')
+def big_market(tmp_path_factory):
+    root = make_market_dir(str(tmp_path_factory.mktemp('bench')), BENCH_STOCKS, BENCH_DAYS)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        _reset_caches()
+        yield root
+    _reset_caches()
+
+@pytest.mark.parametrize('engine', ['batch', 'stock'])
+@pytest.mark.parametrize('strategy_name', sorted(STRATEGY_MAP))
+def test_scan(benchmark, big_market, strategy_name, engine):
+    from index import run_scanner
+    result = benchmark.pedantic(run_scanner, args=(strategy_name,),
+                                kwargs={'generate_html': False, 'engine': engine}, rounds=3, warmup_rounds=1)
+    assert result['success'] and result['total_scanned'] == BENCH_STOCKS
+
+@pytest.mark.parametrize('strategy_name', sorted(STRATEGY_MAP))
+def test_single_stock(benchmark, big_market, strategy_name):
+    from index import analyze_single_stock
+    result = benchmark(analyze_single_stock, '600001', strategy_name)
+    assert 'error' not in result
+
+@pytest.mark.parametrize('strategy_name,signal,exact', [
+    ('ma5', '🚀 启动期', False),
+    ('volume_breakout', '🚀 启动期（重点）', True),
+    ('breakout_pullback', '🚀 启动期（重中之重）', True),
+])
+def test_backtest(benchmark, big_market, strategy_name, signal, exact):
+    from utils.backtest import run_backtest
+    results = benchmark.pedantic(run_backtest, args=(strategy_name, signal, exact), rounds=2, warmup_rounds=1)
+    assert set(results) == {10, 20}
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+后台任务测试：输出分流与线程池隔离
+"""
+import sys
+import asyncio
+import threading
+
+from utils import jobs
+
+def test_light_call_output_goes_to_stderr(capfd, monkeypatch):
+    # 结束后恢复 sys.stdout（分流器会替换它）
+    monkeypatch.setattr(sys, 'stdout', sys.stdout)
+
+    async def call():
+        return await jobs.run_blocking(lambda: print('light call') or 1)
+
+    assert asyncio.run(call()) == 1
+    job = jobs.JOBS.submit('test_output', lambda: print('long job'), cancellable=False)
+    job.future.result(timeout=5)
+
+    out, err = capfd.readouterr()
+    assert 'light call' not in out and 'light call' in err
+    assert 'long job' not in out + err
+    assert job.output.getvalue() == 'long job\n'
+
+def test_long_jobs_do_not_starve_light_calls():
+    release = threading.Event()
+    running = [jobs.JOBS.submit('test_block', release.wait, {'n': i}, cancellable=False)
+               for i in range(jobs.MAX_WORKERS)]
+    try:
+        async def call():
+            return await asyncio.wait_for(jobs.run_blocking(lambda: 'ok'), 5)
+        assert asyncio.run(call()) == 'ok'
+    finally:
+        release.set()
+    for job in running:
+        job.future.result(timeout=5)
+    assert all(job.status == 'succeeded' for job in running)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+运行指标测试
+"""
+from utils import metrics
+
+def test_histogram_render():
+    histogram = metrics.Histogram('t_seconds', '测试', ('route',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.5, '/a')
+    histogram.observe(5.0, '/a')
+    lines = histogram.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 't_seconds_count{route="/a"} 3' in lines
+
+def test_data_status(market):
+    status = metrics.data_status(max_age=0)
+    assert status['stock_count'] == 120
+    assert status['latest_bar_date'] and status['stale_count'] == 0
+
+def test_metrics_endpoint(market):
+    from api_server import app
+    client = app.test_client()
+    health = client.get('/api/health').get_json()
+    assert health['stockCount'] == 120
+    client.get('/api/stock/600001/bars')
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'celue_http_request_duration_seconds_count{route="/api/health",method="GET",status="200"}' in text
+    assert 'route="/api/stock/<code>/bars"' in text
+    assert 'celue_data_stocks 120' in text
+    assert 'celue_cache_requests_total{cache="bars",result="miss"}' in text
+
+def test_manifest_status(private_market):
+    from utils import manifest
+    scanned = metrics.data_status(max_age=0)
+    assert scanned['source'] == 'scan'
+
+    manifest.rebuild_manifest()
+    status = metrics.data_status()
+    assert status['source'] == 'manifest'
+    assert status['stock_count'] == scanned['stock_count']
+    assert status['latest_bar_date'] == scanned['latest_bar_date'] and status['stale_count'] == 0
+
+    code = next(iter(manifest.load_manifest()['stocks']))
+    manifest.record_stocks({code: {'last_date': '2000-01-01', 'rows': 1}})
+    manifest.record_concepts('2026-01-01 00:00:00', 10, 3)
+    status = metrics.data_status()
+    assert status['stale_codes'] == [code] and status['concepts']['last_update'] == '2026-01-01 00:00:00'
+
+def test_manifest_status_tracks_bar_writes(private_market):
+    from utils import manifest
+    manifest.rebuild_manifest()
+    assert metrics.data_status()['needs_update'] is False
+
+    # 日线很久没有更新：同步概念、名称只更新清单，不会让数据显示为最新
+    stale = manifest._editable()
+    stale['bars_updated_at'] = '2000-01-03 15:30:00'
+    manifest.save_manifest(stale)
+    manifest.record_concepts('2026-01-01 00:00:00', 10, 3)
+    manifest.record_names(20)
+    status = metrics.data_status()
+    assert status['last_update'] == '2000-01-03 15:30' and status['needs_update'] is True
+
+    code = next(iter(manifest.load_manifest()['stocks']))
+    manifest.record_stocks({code: manifest.load_manifest()['stocks'][code]})
+    assert metrics.data_status()['needs_update'] is False
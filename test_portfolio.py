@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+组合回测测试：退出规则、重复信号、资金曲线
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.panel import MarketPanel
+from utils import portfolio
+
+def _panel(bars, stocks=1):
+    """bars: [(open, high, low, close)]，stocks 只股票使用相同的K线"""
+    df = pd.DataFrame(bars, columns=['open', 'high', 'low', 'close'])
+    df['volume'] = 1000.0
+    df.insert(0, 'date', pd.bdate_range('2025-01-01', periods=len(df)).strftime('%Y-%m-%d'))
+    return MarketPanel.from_frames({f"sh.{600001 + i}": df for i in range(stocks)})
+
+FLAT = (10, 10, 10, 10)
+
+@pytest.mark.parametrize('rules, bars, reason, price', [
+    # 第2根K线最高价触及止盈，按止盈价成交
+    ({'take_profit': 0.1}, [FLAT, FLAT, (10.5, 11.5, 10.4, 11), FLAT], 'take_profit', 11.0),
+    # 跳空低开到止损线下方，按开盘价成交
+    ({'stop_loss': 0.05}, [FLAT, FLAT, (9, 9.2, 8.8, 9), FLAT], 'stop_loss', 9.0),
+    # 最高涨到 12 后回撤 10%，移动止损在 10.8
+    ({'trailing': 0.1}, [FLAT, FLAT, (11, 12, 11, 11.5), (11.5, 11.6, 10.5, 10.6)], 'trailing', 10.8),
+    ({'horizon': 3}, [FLAT, FLAT, (10, 11, 9, 10.5), (10.5, 11, 10, 10.8), FLAT], 'horizon', 10.8),
+    ({'horizon': 10}, [FLAT, FLAT, (10, 11, 9, 10.5)], 'end', 10.5),
+])
+def test_exit_rules(rules, bars, reason, price):
+    trades = portfolio.simulate_trades(_panel(bars), [(0, 0, '🚀 启动期')], rules)
+    assert len(trades) == 1
+    trade = trades.iloc[0]
+    assert trade['entry_price'] == 10 and trade['entry_date'] == '2025-01-02'
+    assert trade['exit_reason'] == reason
+    assert trade['exit_price'] == pytest.approx(price)
+    assert trade['return'] == pytest.approx((price / 10 - 1) * 100)
+
+def test_overlap_and_equity():
+    bars = [FLAT] * 3 + [(10, 12, 10, 12)] * 10
+    panel = _panel(bars)
+    # 持仓期间的第二个信号跳过，平仓后的信号重新入场
+    signals = [(0, 0, 's'), (0, 2, 's'), (0, 5, 's')]
+    trades = portfolio.simulate_trades(panel, signals, {'horizon': 4})
+    equity, filled = portfolio.simulate_portfolio(panel, trades, {'initial_capital': 1.0, 'position_size': 0.5})
+    assert filled['skip_reason'].tolist() == ['', 'overlap', '']
+    assert portfolio.simulate_portfolio(panel, trades, {'overlap': 'allow'})[1]['taken'].all()
+
+    returns = filled.loc[filled['taken'], 'return'].to_numpy() / 100
+    assert equity['equity'].iat[-1] == pytest.approx((1 + 0.5 * returns[0]) * (1 + 0.5 * returns[1]))
+    assert (equity['drawdown'] <= 0).all()
+    assert equity['positions'].max() == 1
+
+    # 持仓上限为 0 时没有任何持仓，所有交易都因仓位不足跳过
+    _, blocked = portfolio.simulate_portfolio(panel, trades, {'max_positions': 0})
+    assert set(blocked['skip_reason']) == {'capacity'}
+
+def test_overlap_checks_actual_holdings():
+    """因仓位不足没有成交的交易不占用该股票，之后的信号不算重复"""
+    panel = _panel([FLAT] * 15, stocks=2)
+    trades = portfolio.simulate_trades(panel, [(1, 0, 's'), (0, 0, 's'), (0, 5, 's')], {'horizon': 8})
+    _, filled = portfolio.simulate_portfolio(panel, trades, {'max_positions': 1})
+    assert filled['skip_reason'].tolist() == ['', 'capacity', 'capacity']
+
+    _, filled = portfolio.simulate_portfolio(panel, trades, {'max_positions': 2})
+    assert filled['skip_reason'].tolist() == ['', '', 'overlap']
+
+def test_run_portfolio_backtest(market):
+    result = portfolio.run_portfolio_backtest('ma5', '🚀 启动期', rules={'stop_loss': 0.05, 'take_profit': 0.1})
+    stats, trades, equity = result['stats'], result['trades'], result['equity']
+    assert stats['trades'] == int(trades['taken'].sum()) <= stats['signals']
+    # 止损为 5%，除跳空外单笔亏损不超过 5%
+    gapped = trades['exit_price'] < trades['entry_price'] * 0.95 - 1e-9
+    assert (trades.loc[~gapped, 'return'] >= -5 - 1e-9).all()
+    assert stats['max_drawdown'] == pytest.approx(equity['drawdown'].min())
+    assert np.isfinite(equity['equity']).all()
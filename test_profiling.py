@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+扫描流水线埋点测试
+"""
+from utils import profiling
+
+def test_stage_is_noop_without_trace():
+    assert profiling.active_trace() is None
+    with profiling.stage('parse_csv'):
+        pass
+    assert profiling.active_trace() is None
+
+def test_scan_stages_recorded(market):
+    from index import run_scanner
+    with profiling.tracing('scan:ma5') as trace:
+        run_scanner('ma5', generate_html=False, engine='stock')
+    data = trace.to_dict()
+    assert profiling.active_trace() is None
+    assert data['total_s'] > 0
+    for name in ('list_files', 'load_features', 'parse_csv', 'build_features', 'analyze'):
+        assert name in data['stages']
+    assert data['stages']['analyze']['count'] == 120
+
+def test_nested_tracing_does_not_steal(market):
+    with profiling.tracing('outer') as outer:
+        with profiling.tracing('inner') as inner:
+            with profiling.stage('x'):
+                pass
+    assert 'x' in outer.stages and not inner.stages
+
+def test_api_scan_profile(market):
+    from api_server import app
+    client = app.test_client()
+    response = client.get('/api/scan/ma5?profile=1&engine=stock')
+    data = response.get_json()
+    assert response.status_code == 200 and data['success']
+    assert data['profile']['stages']['analyze']['count'] == data['data']['totalScanned']
+    assert client.get('/api/scan/ma5?profile=bogus').status_code == 400
+    assert client.get('/api/scan/ma5?engine=bogus').status_code == 400
+
+    batch = client.get('/api/scan/ma5?engine=batch').get_json()
+    assert batch['success'] and batch['data']['engine'] == 'batch'
+    assert batch['data']['totalHit'] == data['data']['totalHit']
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+数据质量校验测试
+"""
+import os
+
+import pandas as pd
+
+from utils import quality, synthetic
+
+def test_validate_cleans_bars():
+    raw = pd.DataFrame({
+        'date': ['2025-01-02', '2025-01-03', '2025-01-03', '2025-01-07', '2025-01-06', '2025-01-08', 'bad'],
+        'open': ['1', '2', '2.1', '', '4', '5', '1'],
+        'high': ['1', '2', '2.1', '', '4', '5', '1'],
+        'low': ['1', '2', '2.1', '', '4', '5', '1'],
+        'close': ['1', '2', '2.1', '', '4', '5', '1'],
+        'volume': ['10', '20', '21', '', '40', '0', '1'],
+    })
+    clean, report = quality.validate({'sh.600001': raw})
+    df = clean['sh.600001']
+    # 重复日期保留最后一条；缺价格的停牌行剔除，其余价格与成交量不修改
+    assert df['date'].tolist() == ['2025-01-02', '2025-01-03', '2025-01-06', '2025-01-08']
+    assert all(df[col].dtype == 'float64' for col in quality.BAR_COLUMNS)
+    assert df['close'].tolist() == [1.0, 2.1, 4.0, 5.0]
+    assert df['volume'].tolist() == [10.0, 21.0, 40.0, 0.0]
+    entry = report['sh.600001']
+    assert (entry['duplicates'], entry['out_of_order'], entry['bad_rows']) == (1, 1, 2)
+    assert (entry['suspended'], entry['filled'], entry['rows']) == (1, 0, 4)
+
+    # 有价格、成交量为空的停牌行保留原样
+    priced = raw.assign(**{col: raw[col].replace('', '3') for col in quality.PRICE_COLUMNS})
+    clean, _ = quality.validate({'sh.600001': priced})
+    assert clean['sh.600001'].loc[3, 'close'] == 3.0 and pd.isna(clean['sh.600001'].loc[3, 'volume'])
+
+    # 可选：停牌日价格沿用前收盘价、成交量补 0
+    clean, report = quality.validate({'sh.600001': raw}, fill_suspended=True)
+    df = clean['sh.600001']
+    assert df['date'].tolist() == ['2025-01-02', '2025-01-03', '2025-01-06', '2025-01-07', '2025-01-08']
+    assert df['close'].tolist() == [1.0, 2.1, 4.0, 4.0, 5.0]
+    assert df['volume'].tolist() == [10.0, 21.0, 40.0, 0.0, 0.0]
+    entry = report['sh.600001']
+    assert (entry['bad_rows'], entry['suspended'], entry['filled'], entry['rows']) == (1, 2, 1, 5)
+
+def test_calendar_gaps():
+    frames, _, _ = synthetic.generate_realistic_market(40, days=60, seed=3, gap_ratio=0.3)
+    calendar = quality.infer_calendar(frames)
+    assert len(calendar) == 60
+    _, report = quality.validate(frames, calendar)
+    gaps = {code for code, entry in report.items() if entry['missing_dates']}
+    assert gaps
+    for code in gaps:
+        dates = set(frames[code]['date'])
+        assert all(date not in dates for date in report[code]['missing_samples'])
+
+    # 增量数据从本地最后日期之后开始统计（逐只检查，不依赖集合的遍历顺序）
+    for code in sorted(gaps):
+        tail = frames[code]['date'].iloc[-4:].tolist()
+        expected = int(((calendar > tail[0]) & (calendar <= tail[-1])).sum()) - 3
+        _, report = quality.validate({code: frames[code].iloc[-3:]}, calendar, since={code: tail[0]})
+        assert report[code]['missing_dates'] == expected
+
+def test_validate_data_dir(tmp_path, monkeypatch):
+    frames = synthetic.generate_market(10, days=40, seed=1)
+    bad = frames['sh.600001']
+    frames['sh.600001'] = pd.concat([bad.iloc[::-1], bad.iloc[-2:]], ignore_index=True)
+    synthetic.write_market(frames, str(tmp_path / 'stock_data'))
+    monkeypatch.chdir(tmp_path)
+
+    report = quality.validate_data_dir()
+    assert report['sh.600001']['duplicates'] == 2 and report['sh.600001']['out_of_order'] > 0
+    fixed = pd.read_csv(os.path.join('stock_data', 'sh.600001.csv'))
+    assert fixed['date'].is_monotonic_increasing and fixed['date'].is_unique
+    assert quality.load_report()['totals']['stocks_with_issues'] == 1
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+报告输出测试
+"""
+import csv
+import json
+
+import pytest
+
+from utils import report
+
+TEMPLATE = "<html><script>window.scannerData = {{DATA_PLACEHOLDER}};</script></html>"
+
+def _embedded_data(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    start = html.index('window.scannerData = ') + len('window.scannerData = ')
+    return json.loads(html[start:html.index(';</script>')])
+
+def test_write_report_formats(tmp_path):
+    template = tmp_path / 'report_template.html'
+    template.write_text(TEMPLATE, encoding='utf-8')
+    results = [
+        {'代码': '600001', '名称': '测试</script>', '完整代码': 'sh.600001', '现价': 10.5,
+         '涨跌幅': '1.2%', '阶段': '🚀 启动期', '概念': ['芯片', '算力'], '数据日期': '2026-02-03'},
+        {'代码': '000002', '名称': '样本', '完整代码': 'sz.000002', '现价': 3.0,
+         '涨跌幅': '-0.5%', '阶段': '🧪 蓄势中', '概念': '未分类', '数据日期': '2026-02-02'},
+    ]
+    files = report.write_report(results, 100, 'ma5', formats=('html', 'csv', 'jsonl'),
+                                output_dir=str(tmp_path), template=str(template))
+    assert files['html'].endswith('scanner_report_ma5_0203.html')
+
+    data = _embedded_data(files['html'])
+    assert data['totalScanned'] == 100 and data['totalHit'] == 2 and data['dataDate'] == '2026-02-03'
+    assert [r['code'] for r in data['results']] == ['600001', '000002']
+    assert data['results'][0]['name'] == '测试</script>'
+
+    with open(files['csv'], encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['concepts'] == '芯片|算力' and rows[0]['dataDate'] == '2026-02-03'
+    with open(files['jsonl'], encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['fullCode'] for line in lines] == ['sh.600001', 'sz.000002']
+
+    assert report.load_template(str(template)) is report.load_template(str(template))
+
+def test_check_formats():
+    assert report.check_formats('html, csv') == ['html', 'csv']
+    with pytest.raises(ValueError):
+        report.check_formats(['pdf'])
+
+def test_headless_does_not_open(monkeypatch):
+    monkeypatch.setenv('CELUE_HEADLESS', '1')
+    assert report.open_in_browser('scanner_report_ma5.html') is False
+
+def test_scanner_report_files(private_market, monkeypatch):
+    from index import run_scanner
+    monkeypatch.setenv('CELUE_HEADLESS', '1')
+    with open('report_template.html', 'w', encoding='utf-8') as f:
+        f.write(TEMPLATE)
+    result = run_scanner('volume_breakout', engine='batch', report_formats='html,jsonl')
+    if not result['hits']:
+        pytest.skip('合成市场没有命中')
+    assert set(result['report_files']) == {'html', 'jsonl'}
+    assert _embedded_data(result['report_files']['html'])['totalHit'] == result['total_hit']
+    assert run_scanner('ma5', report_formats='pdf')['success'] is False
+
+def test_bundle_report(tmp_path):
+    assets = tmp_path / 'report_assets'
+    assets.mkdir()
+    (assets / 'report_shell.html').write_text(
+        '<html><script src="{{DATA_SRC}}"></script><script src="{{APP_SRC}}"></script></html>', encoding='utf-8')
+    (assets / 'manifest.json').write_text(json.dumps({'app': 'app.0123456789.js', 'shell': 'report_shell.html'}),
+                                          encoding='utf-8')
+    out = tmp_path / 'reports'
+    out.mkdir()
+    results = [{'代码': '600001', '名称': '测试</script>', '完整代码': 'sh.600001', '现价': 10.5,
+                '涨跌幅': '1.2%', '阶段': '🚀 启动期', '概念': ['芯片'], '数据日期': '2026-02-03'}]
+    files = report.write_report(results, 100, 'ma5', formats='bundle', output_dir=str(out), assets=str(assets))
+    assert report.report_page(files) == files['bundle']
+    html = (out / 'scanner_report_ma5_0203.html').read_text(encoding='utf-8')
+    assert 'src="scanner_report_ma5_0203.data.js"' in html and 'src="../report_assets/app.0123456789.js"' in html
+
+    data_js = (out / 'scanner_report_ma5_0203.data.js').read_text(encoding='utf-8')
+    assert '</script>' not in data_js
+    data = json.loads(data_js[len('window.scannerData = '):].rstrip().rstrip(';'))
+    assert data['totalHit'] == 1 and data['columns']['code'] == ['600001']
+    assert data['columns']['name'] == ['测试</script>']
+
+    with pytest.raises(ValueError):
+        report.check_formats('html,bundle', str(assets))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+快照图片渲染测试
+"""
+import os
+import re
+
+import pytest
+from PIL import Image
+
+from utils import snapshot_image
+
+def _stocks(n):
+    return [{'code': f"{600000 + i}", 'name': f"样本{i}"} for i in range(n)]
+
+def test_paginated_parallel_render(tmp_path):
+    max_height = 1200
+    files = snapshot_image.render_snapshots(
+        {'ma5': _stocks(200), 'volume_breakout': ['000001', '000002']},
+        fmt='webp', output_dir=str(tmp_path), max_height=max_height)
+
+    per_page = snapshot_image.rows_per_page(max_height) * snapshot_image.COLUMNS
+    assert len(files['ma5']) == -(-200 // per_page) > 1
+    assert files['ma5'][0].endswith('strategy_snapshot_ma5_p1.webp')
+    assert files['volume_breakout'] == [str(tmp_path / 'strategy_snapshot_volume_breakout.webp')]
+    for path in files['ma5']:
+        with Image.open(path) as img:
+            assert img.format == 'WEBP'
+            assert img.width == snapshot_image.WIDTH and img.height <= max_height
+
+def test_font_and_width_cache():
+    assert snapshot_image.load_font(18) is snapshot_image.load_font(18)
+    font = snapshot_image.load_font(18)
+    assert snapshot_image.text_width('600001', 18) == pytest.approx(font.getlength('600001'), abs=1)
+    assert snapshot_image.text_width('600001', 18) == snapshot_image.text_width('600001', 18)
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        snapshot_image.render_snapshot(['600001'], fmt='gif', output_dir=str(tmp_path))
+
+def test_frontend_layout_matches():
+    # 前端快照（frontend/src/utils/snapshot.js）与这里使用同一套版式和颜色
+    path = os.path.join(os.path.dirname(__file__), 'frontend', 'src', 'utils', 'snapshot.js')
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+
+    def js_object(name):
+        body = re.search(rf"{name} = \{{(.*?)\}};", source, re.S).group(1)
+        return {key.lower(): value.strip("'") for key, value in re.findall(r"(\w+): ('[^']*'|\d+)", body)}
+
+    layout = js_object('SNAPSHOT_LAYOUT')
+    for key, value in layout.items():
+        constant = {'maxpageheight': 'MAX_PAGE_HEIGHT'}.get(key) or re.sub(r'(height|size)$', r'_\1', key).upper()
+        assert getattr(snapshot_image, constant) == int(value), key
+    assert len(layout) == 11
+    colors = {key.replace('_', ''): value for key, value in snapshot_image.COLORS.items()}
+    assert js_object('SNAPSHOT_COLORS') == colors
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+原子写入与扫描快照隔离测试
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from utils import storage, manifest, bar_store, features
+
+def test_atomic_write_keeps_original_on_error(tmp_path):
+    path = tmp_path / 'cache.json'
+    storage.write_json(str(path), {'v': 1})
+    with pytest.raises(RuntimeError):
+        with storage.atomic_write(str(path)) as f:
+            f.write('{"v": ')
+            raise RuntimeError('crash')
+    assert path.read_text(encoding='utf-8') == '{"v": 1}'
+    assert os.listdir(tmp_path) == ['cache.json']
+
+def test_append_csv(tmp_path):
+    path = str(tmp_path / 'sh.600001.csv')
+    first = pd.DataFrame({'date': ['2025-01-02'], 'open': [1.0], 'high': [1.0], 'low': [1.0],
+                          'close': [1.0], 'volume': [10.0]})
+    storage.append_csv(path, first)
+    assert os.stat(path).st_mode & 0o777 == storage.DEFAULT_FILE_MODE
+    os.chmod(path, 0o640)
+    storage.append_csv(path, first.assign(date='2025-01-03'))
+    df = pd.read_csv(path)
+    assert df['date'].tolist() == ['2025-01-02', '2025-01-03']
+    assert os.stat(path).st_mode & 0o777 == 0o640
+
+def test_scan_snapshot_isolation(private_market):
+    from index import run_scanner
+    from utils.panel import load_panel
+    manifest.rebuild_manifest()
+    as_of = manifest.snapshot()['as_of']
+
+    # 模拟 appendData 写到一半：文件已追加新K线，清单尚未更新
+    code = 'sh.600001'
+    last = bar_store.load_bars(code).iloc[[-1]]
+    storage.append_csv(bar_store.stock_file_path(code), last.assign(date='2099-01-01'))
+
+    assert features.load_features(code, 60, as_of)['date'].iat[-1] == as_of
+    panel, _ = load_panel([code], 60, as_of)
+    assert panel.last_dates() == [as_of]
+    result = run_scanner('ma5', generate_html=False, engine='batch')
+    assert result['snapshot']['as_of'] == as_of
+    assert all(hit['数据日期'] <= as_of for hit in result['hits'])
+
+    manifest.record_stocks({code: {'last_date': '2099-01-01', 'rows': None}})
+    assert manifest.snapshot()['as_of'] == '2099-01-01'
+    assert features.load_features(code, 60, '2099-01-01')['date'].iat[-1] == '2099-01-01'
+
+def test_append_after_stale_manifest(private_market, monkeypatch):
+    """上次追加后、写清单前中断：清单落后于文件，再次追加时不重复写入已有日期"""
+    import appendData
+    from utils import quality
+    monkeypatch.setattr(quality, 'fetch_trade_calendar', lambda start, end: None)
+    manifest.rebuild_manifest()
+
+    code = 'sh.600001'
+    path = bar_store.stock_file_path(code)
+    last = bar_store.load_bars(code).iloc[[-1]]
+    stale_date = last['date'].iat[0]
+    crashed = last.assign(date='2099-01-01')
+    storage.append_csv(path, crashed)
+
+    local = {code: appendData._local_state(code, path)}
+    assert local[code][0] == stale_date
+    increments = {code: pd.concat([crashed, last.assign(date='2099-01-02')]).astype(str)}
+    assert appendData._write_increments(increments, local, '2099-01-02') == [code]
+
+    dates = pd.read_csv(path)['date'].tolist()
+    assert dates[-3:] == [stale_date, '2099-01-01', '2099-01-02']
+    assert manifest.last_date(code) == '2099-01-02'
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+策略一致性测试
+- 每个策略的每个阶段都有手工构造的K线，analyze 与 analyze_batch 都应判定为该阶段
+- 固定种子的合成市场上，各策略的判定结果与 golden 文件一致；golden 由重构前的原始 analyze（tests_reference）生成
+  （python -m pytest --update-golden 重新生成）
+- 逐只 analyze 与批量规则（RULES）、JIT 内核与 NumPy 实现、扫描的两种引擎、参数扫描与回测结果相互一致
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.registry import STRATEGY_MAP
+from utils import kernels
+from utils.panel import MarketPanel, load_panel
+from utils.synthetic import (SCENARIOS, scenario_bars, scenario_stages, generate_market, generate_realistic_market,
+                             write_workspace)
+import tests_reference as reference
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_strategies_golden.json')
+
+SCENARIO_CASES = [(name, stage) for name in SCENARIOS for stage in scenario_stages(name) + [None]]
+
+def _frame_at(panel, row, end):
+    """面板第 row 行的前 end 根K线还原为 DataFrame（与 CSV 读入的列一致）"""
+    width = panel.shape[1]
+    start = width - int(panel.bar_count[row, -1])
+    cols = slice(start, start + end)
+    return pd.DataFrame({'date': panel.dates[row, cols],
+                         **{name: values[row, cols] for name, values in panel.columns.items()}})
+
+# 三连阳起点不止一个的市场：sh.600275 第一个起点后没有大跌，后面的起点才紧跟大跌
+REFERENCE_MARKET = {'count': 800, 'days': 300, 'seed': 3}
+
+@pytest.fixture(scope='module')
+def reference_market():
+    """固定种子的合成市场，及重构前原始 analyze（tests_reference）对 breakout_pullback 的判定"""
+    frames = generate_market(**REFERENCE_MARKET)
+    return frames, {code: reference.ANALYZE['breakout_pullback'](df) for code, df in frames.items()}
+
+# ================= 1. 阶段场景 =================
+
+@pytest.mark.parametrize('strategy_name,stage', SCENARIO_CASES)
+def test_scenario_stage(strategy_name, stage):
+    config = STRATEGY_MAP[strategy_name]
+    df = scenario_bars(strategy_name, stage)
+    assert config['func'](df) == stage
+
+    panel = MarketPanel.from_frames({'sh.600000': df}, config['lookback'])
+    assert config['batch_func'](panel) == [stage]
+
+# ================= 2. Golden 输出 =================
+
+def _strategy_outputs(panel):
+    """批量规则的判定：最新阶段与全部K线位置上的阶段计数"""
+    outputs = {}
+    for name, config in sorted(STRATEGY_MAP.items()):
+        latest = config['batch_func'](panel)
+        grid = config['rules'].evaluate(panel)
+        labels = config['rules'].labels()
+        outputs[name] = {
+            'latest': {code: stage for code, stage in zip(panel.codes, latest) if stage},
+            'stage_counts': {label: int((grid == k).sum()) for k, label in enumerate(labels)}
+        }
+    return outputs
+
+def _reference_outputs(panel):
+    """golden 内容：重构前的原始 analyze（tests_reference）对每只股票截至每根K线的判定"""
+    outputs = {}
+    for name, config in sorted(STRATEGY_MAP.items()):
+        analyze = reference.ANALYZE[name]
+        latest = {}
+        counts = {label: 0 for label in config['rules'].labels()}
+        for row, code in enumerate(panel.codes):
+            length = int(panel.bar_count[row, -1])
+            for end in range(1, length + 1):
+                stage = analyze(_frame_at(panel, row, end))
+                if stage:
+                    counts[stage] += 1
+            if stage:
+                latest[code] = stage
+        outputs[name] = {'latest': latest, 'stage_counts': counts}
+    return outputs
+
+def test_golden_outputs(market, update_golden):
+    panel, missing = load_panel()
+    assert not missing
+
+    if update_golden or not os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(_reference_outputs(panel), f, ensure_ascii=False, indent=2, sort_keys=True)
+        pytest.skip("已按原始实现重新生成 golden 文件")
+
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        assert _strategy_outputs(panel) == json.load(f)
+
+# ================= 3. 逐只与批量一致 =================
+
+@pytest.mark.parametrize('strategy_name', sorted(STRATEGY_MAP))
+def test_rules_match_analyze(market, strategy_name):
+    """RULES 在每根K线上的阶段与对截断后的数据调用 analyze 相同"""
+    config = STRATEGY_MAP[strategy_name]
+    panel, _ = load_panel()
+    grid = config['rules'].evaluate(panel)
+    labels = config['rules'].labels()
+    width = panel.shape[1]
+
+    mismatches = []
+    for row in range(0, len(panel.codes), 6):
+        length = int(panel.bar_count[row, -1])
+        for end in range(config['lookback'], length + 1, 3):
+            expected = config['func'](_frame_at(panel, row, end))
+            code = grid[row, width - length + end - 1]
+            actual = labels[code] if code >= 0 else None
+            if actual != expected:
+                mismatches.append((panel.codes[row], end, expected, actual))
+    assert mismatches == []
+
+def test_rules_match_reference(reference_market):
+    """批量规则（扫描默认引擎）与重构前的原始 analyze 逐只一致"""
+    frames, expected = reference_market
+    panel = MarketPanel.from_frames(frames)
+    actual = STRATEGY_MAP['breakout_pullback']['batch_func'](panel)
+    assert dict(zip(panel.codes, actual)) == expected
+
+def test_tail_matches_full_history():
+    """扫描只加载尾部K线：均线与判定不随数据起点变化（MA5 持平时不能因最后一位误差变成"上行"）"""
+    df = generate_market(60, 160, seed=11)['sh.600059'].iloc[:122].reset_index(drop=True)
+    config = STRATEGY_MAP['volume_breakout']
+    tail = df.tail(config['lookback']).reset_index(drop=True)
+
+    full_ma5 = kernels.window_mean(df['close'].to_numpy(), 5)
+    np.testing.assert_array_equal(kernels.window_mean(tail['close'].to_numpy(), 5)[4:], full_ma5[-len(tail) + 4:])
+    assert config['func'](tail) == config['func'](df) == reference.ANALYZE['volume_breakout'](df) == '🧪 蓄势中'
+
+def test_scanner_engines_agree(market):
+    from index import run_scanner
+    for name in STRATEGY_MAP:
+        batch = run_scanner(name, generate_html=False, engine='batch')
+        stock = run_scanner(name, generate_html=False, engine='stock')
+        assert batch['engine'] == 'batch' and stock['engine'] == 'stock'
+        assert batch['hits'] == stock['hits']
+
+def test_single_stock_matches_scan(market):
+    """单股分析与扫描读取同一张特征表，阶段相同"""
+    from index import run_scanner, analyze_single_stock
+    panel, _ = load_panel()
+    for name in STRATEGY_MAP:
+        hits = {hit['完整代码']: hit['阶段'] for hit in run_scanner(name, generate_html=False)['hits']}
+        single = {code: analyze_single_stock(code, name)['阶段'] for code in panel.codes}
+        assert {code: stage for code, stage in single.items() if stage} == hits
+
+def test_analyze_stocks(market):
+    """批量分析：代码去重、无法识别/不存在的代码进 errors，多个策略与单股分析一致"""
+    from index import analyze_stocks, analyze_single_stock
+    batch = analyze_stocks(['600001', 'sh.600001', ' 600001 ', 'sz.000002', 'bogus', '600999', ''],
+                           ['ma5', 'breakout_pullback'])
+    assert batch['strategies'] == ['ma5', 'breakout_pullback']
+    assert (batch['total'], batch['success_count'], batch['error_count']) == (4, 2, 2)
+    assert [r['完整代码'] for r in batch['results']] == ['sh.600001', 'sz.000002']
+    assert [e['code'] for e in batch['errors']] == ['bogus', '600999']
+    assert '无法识别' in batch['errors'][0]['error'] and '不存在' in batch['errors'][1]['error']
+    for result in batch['results']:
+        assert result['阶段'] == {name: analyze_single_stock(result['完整代码'], name)['阶段']
+                                for name in ('ma5', 'breakout_pullback')}
+
+    assert analyze_stocks(['600001'], 'volume_breakout')['strategies'] == ['volume_breakout']
+    assert analyze_stocks(['600001'])['strategies'] == ['ma5']
+    assert analyze_stocks([], 'ma5')['total'] == 0
+    assert analyze_stocks(['600001'], ['ma5', 'ma_5']) == {'error': '找不到策略: ma_5'}
+
+def test_scanner_engines_agree_on_realistic_market(tmp_path, monkeypatch):
+    """停牌、缺失K线、次新股、ST 名称下两种引擎结果仍相同"""
+    from index import run_scanner
+    from conftest import _reset_caches
+    write_workspace(str(tmp_path), *generate_realistic_market(150, 120, seed=3, suspend_ratio=0.3,
+                                                             gap_ratio=0.3, new_listing_ratio=0.2, st_ratio=0.2))
+    monkeypatch.chdir(tmp_path)
+    _reset_caches()
+    try:
+        for name in STRATEGY_MAP:
+            batch = run_scanner(name, generate_html=False, engine='batch')
+            stock = run_scanner(name, generate_html=False, engine='stock')
+            assert batch['total_scanned'] == 150
+            assert batch['hits'] == stock['hits']
+    finally:
+        _reset_caches()
+
+# ================= 4. 顺序内核 =================
+
+def _random_ohlcv(seed, rows=200, width=40):
+    rng = np.random.default_rng(seed)
+    open_ = rng.uniform(9, 11, (rows, width)).round(2)
+    close = (open_ * (1 + rng.normal(0, 0.03, (rows, width)))).round(2)
+    low = np.minimum(open_, close) * rng.uniform(0.97, 1.0, (rows, width))
+    volume = rng.integers(1, 10, (rows, width)).astype('float64') * 1e5
+    lengths = rng.integers(1, width + 1, rows)
+    # 右对齐：有效K线之前为 NaN
+    pad = np.arange(width)[None, :] < (width - lengths)[:, None]
+    for values in (open_, close, low, volume):
+        values[pad] = np.nan
+    return open_, close, low, volume, lengths
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_kernels_match_loops(seed):
+    """编译后的内核、NumPy 实现与纯 Python 循环三者一致"""
+    open_, close, low, volume, lengths = _random_ohlcv(seed)
+    implementations = [
+        (kernels._max_bearish_streak_loops, kernels._max_bearish_streak_numpy, kernels._max_bearish_streak_impl,
+         (open_, close, lengths, 20)),
+        (kernels._lower_low_after_up_loops, kernels._lower_low_after_up_numpy, kernels._lower_low_after_up_impl,
+         (open_, close, low, lengths, -30, -1)),
+        (kernels._three_rising_crash_loops, kernels._three_rising_crash_numpy, kernels._three_rising_crash_impl,
+         (open_, close, low, volume, lengths, 1.0, 0.8, -7.0, -1.0, 1.02)),
+    ]
+    for loops, numpy_impl, impl, args in implementations:
+        expected = loops(*args)
+        for actual in (numpy_impl(*args), impl(*args)):
+            for e, a in zip(np.atleast_2d(expected), np.atleast_2d(actual)):
+                np.testing.assert_array_equal(e, a)
+
+def test_kernels_match_reference(reference_market):
+    """使用顺序内核的 analyze 与原始实现逐只一致"""
+    frames, expected = reference_market
+    analyze = STRATEGY_MAP['breakout_pullback']['func']
+    assert expected['sh.600275'] == '🚀 启动期（重点）'
+    assert {code: analyze(df) for code, df in frames.items()} == expected
+
+# ================= 5. 参数扫描与回测 =================
+
+def test_sweep_matches_backtest(market):
+    from utils.backtest import run_backtest, summarize
+    from utils.param_sweep import SweepContext
+
+    for name, signal, exact in [('ma5', '🚀 启动期', False), ('volume_breakout', '🚀 启动期（重点）', True)]:
+        results = run_backtest(name, signal, exact)
+        row = SweepContext(name).evaluate(STRATEGY_MAP[name]['params'], signal, exact)
+        for days, detail in results.items():
+            stats = summarize(detail)
+            assert row[f'signals_{days}d'] == stats['total']
+            assert row[f'success_rate_{days}d'] == round(stats['success_rate'], 2)
+            assert row[f'avg_max_return_{days}d'] == pytest.approx(stats['avg_max_return'], abs=0.01)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+自选股测试：列表校验、阶段转换记录与增量评估
+"""
+import pytest
+
+from utils import watchlist
+
+def test_save_watchlist_validates_strategies(private_market):
+    info, invalid = watchlist.save_watchlist('w', ['600001', 'sz.000002', 'bogus'], 'ma5')
+    assert info['codes'] == ['sh.600001', 'sz.000002'] and invalid == ['bogus']
+    assert info['strategies'] == ['ma5']
+
+    info, _ = watchlist.save_watchlist('w', ['600001'], 'ma5,volume_breakout')
+    assert info['strategies'] == ['ma5', 'volume_breakout']
+    # 不传策略时沿用原列表的策略
+    assert watchlist.save_watchlist('w', ['600001'])[0]['strategies'] == ['ma5', 'volume_breakout']
+
+    with pytest.raises(ValueError, match='ma_5'):
+        watchlist.save_watchlist('w', ['600001'], ['ma5', 'ma_5'])
+    assert watchlist.get_watchlist('w')['strategies'] == ['ma5', 'volume_breakout']
+
+def test_api_save_watchlist_rejects_unknown_strategy(private_market):
+    from api_server import app
+    client = app.test_client()
+    response = client.put('/api/watchlists/w', json={'codes': ['600001'], 'strategies': 'ma5'})
+    assert response.status_code == 200 and response.get_json()['data']['strategies'] == ['ma5']
+    response = client.put('/api/watchlists/w', json={'codes': ['600001'], 'strategies': ['ma_5']})
+    assert response.status_code == 400 and 'ma_5' in response.get_json()['error']
+
+def test_record_stage_transitions():
+    history = {'stages': {}, 'transitions': []}
+    # 首次记录只建立基线
+    assert watchlist._record_stage(history, 'sh.600001', 'ma5', '2025-01-02', '🧪 蓄势中') is None
+    assert watchlist._record_stage(history, 'sh.600001', 'ma5', '2025-01-03', '🧪 蓄势中') is None
+
+    transition = watchlist._record_stage(history, 'sh.600001', 'ma5', '2025-01-06', '🚀 启动期')
+    assert {k: transition[k] for k in ('date', 'strategy', 'from', 'to')} == {
+        'date': '2025-01-06', 'strategy': 'ma5', 'from': '🧪 蓄势中', 'to': '🚀 启动期'}
+
+    # 同一交易日数据被修正：覆盖当日记录，与前一日比较
+    assert watchlist._record_stage(history, 'sh.600001', 'ma5', '2025-01-06', '🧪 蓄势中') is None
+    transition = watchlist._record_stage(history, 'sh.600001', 'ma5', '2025-01-06', None)
+    assert (transition['from'], transition['to']) == ('🧪 蓄势中', None)
+    entries = history['stages']['sh.600001']['ma5']
+    assert [e['date'] for e in entries] == ['2025-01-02', '2025-01-03', '2025-01-06']
+
+def test_refresh_watchlists_incremental(private_market):
+    watchlist.save_watchlist('good', ['600001', '600003'], ['ma5'])
+    watchlist.save_watchlist('bad', ['600003'], ['ma5'])
+
+    result = watchlist.refresh_watchlists(updated_codes=['600001'])
+    assert result['evaluated'] == 1 and not result['errors']
+    stages = watchlist._load_history()['stages']
+    assert list(stages) == ['sh.600001']
+
+    # 已保存的列表里出现未注册的策略：只记错误，同一只股票在其他列表中的监控不受影响
+    watchlists = watchlist.list_watchlists()
+    watchlists['bad']['strategies'] = ['ma5', 'ma_5']
+    watchlist._save_json(watchlist.WATCHLIST_FILE, watchlists)
+
+    # 把上一条阶段记录改成更早日期的另一个阶段，下次评估应产生转换
+    history = watchlist._load_history()
+    history['stages']['sh.600003'] = {'ma5': [{'date': '2000-01-03', 'stage': '🏖️ 测试阶段'}]}
+    watchlist._save_json(watchlist.HISTORY_FILE, history)
+
+    result = watchlist.refresh_watchlists(updated_codes=['sh.600003'])
+    assert result['evaluated'] == 1
+    assert result['errors'] == [{'watchlist': 'bad', 'error': '找不到策略: ma_5'}]
+    [transition] = result['transitions']
+    assert transition['fullCode'] == 'sh.600003' and transition['from'] == '🏖️ 测试阶段'
+    assert transition['watchlists'] == ['good', 'bad']
+    assert watchlist.get_transitions(name='good', strategy='ma5') == [transition]
+    assert watchlist.get_transitions(strategy='volume_breakout') == []
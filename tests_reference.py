@@ -0,0 +1,309 @@
+"""
+策略判定的原始实现（重构前逐只 analyze 的原文，仅供一致性测试与生成 golden 使用）
+特征表、规则 DSL、顺序内核等重构后的实现都应与这里逐位一致；修改策略逻辑时需同步更新本文件。
+扫描原先对完整 CSV 调用 analyze，因此这里的结果以完整历史（或截至某日的全部K线）为输入。
+键为策略注册名（strategies.registry），与 STRATEGY_MAP 对应。
+"""
+import pandas as pd
+
+# ================= ma5_support =================
+
+def ma5_support(df):
+    """
+    策略版本：V1 (中线版)
+    核心逻辑：吸筹判定 -> 20日内出现缩量挖坑(诱空) -> 缩量回踩MA5(确认启动)
+    """
+    if df is None or len(df) < 60: 
+        return None 
+    
+    df = df.copy()
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # 指标计算
+    df['MA5'] = df['close'].rolling(5).mean()
+    df['MA30'] = df['close'].rolling(30).mean()
+    df['pct_chg'] = df['close'].pct_change() * 100
+    
+    # 核心判定：缩量大跌信号
+    df['is_shrink_drop'] = (df['low'] < df['low'].shift(1)) & (df['volume'] < df['volume'].shift(1))
+    
+    # 时间切片
+    acc_period = df.iloc[-60:-30]   
+    shake_period = df.iloc[-30:-10] 
+    active_period = df.iloc[-10:]  
+    
+    curr = df.iloc[-1]
+    prev = df.iloc[-2]
+
+    # 1. 吸筹判定
+    red_vol = acc_period[acc_period['close'] > acc_period['open']]['volume'].sum()
+    green_vol = acc_period[acc_period['close'] <= acc_period['open']]['volume'].sum()
+    is_accumulating = (red_vol > green_vol * 1.5) 
+    
+    # 2. 20日洗盘特征
+    had_panic_shrink_20d = df.iloc[-20:]['is_shrink_drop'].any()
+    avg_vol_long = df.iloc[-60:-10]['volume'].mean()
+    big_down_vol = df.iloc[-30:-1]['volume'] > avg_vol_long * 2.5
+    is_clean_shake = big_down_vol.any() == False and had_panic_shrink_20d
+
+    # 3. 启动特征
+    has_breakout = len(active_period[active_period['pct_chg'] >= 4.0]) >= 2 
+    is_shrinking = curr['volume'] < prev['volume']  
+    ma5_trending_up = curr['MA5'] > prev['MA5']     
+    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * 1.015) 
+    
+    is_pullback = is_shrinking and on_ma5 and ma5_trending_up
+
+    # 4. 结果输出
+    if is_accumulating and is_clean_shake:
+        if has_breakout and is_pullback:
+            return "🚀 启动期"
+        elif not has_breakout and had_panic_shrink_20d:
+            return "🧪 蓄势中"
+        else:
+            return "🏖️ 整理区"
+            
+    return None
+
+# ================= volume_breakout =================
+
+def volume_breakout(df):
+    """
+    策略版本：V1 (放量突破版)
+    核心逻辑：吸筹期 → 启动期（无整理期）
+    
+    特殊标记：启动期（重点）
+    条件：某日股价最低点低于前一天最低价且前一天股价上涨
+    """
+    if df is None or len(df) < 60: 
+        return None 
+    
+    df = df.copy()
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # 指标计算
+    df['MA5'] = df['close'].rolling(5).mean()
+    df['MA30'] = df['close'].rolling(30).mean()
+    df['pct_chg'] = df['close'].pct_change() * 100
+    
+    # 时间切片
+    acc_period = df.iloc[-60:-20]   # 吸筹期：60-20日前
+    shake_period = df.iloc[-20:-5]  # 观察期：20-5日前
+    recent_period = df.iloc[-10:]   # 近期：10日内
+    
+    curr = df.iloc[-1]
+    prev = df.iloc[-2]
+
+    # 1. 吸筹判定（60-20日前）
+    red_vol = acc_period[acc_period['close'] > acc_period['open']]['volume'].sum()
+    green_vol = acc_period[acc_period['close'] <= acc_period['open']]['volume'].sum()
+    is_accumulating = (red_vol > green_vol * 1.5)
+    
+    if not is_accumulating:
+        return None
+    
+    # 2. 检测特殊形态：启动期（重点）
+    # 条件：某日最低点 < 前一天最低点 且 前一天股价上涨
+    is_key_breakout = False
+    breakout_date = None
+    
+    for i in range(-30, -1):  # 检查最近30天（不包括今天）
+        if i < -len(df) + 1:
+            continue
+            
+        today_low = df.iloc[i]['low']
+        prev_day = df.iloc[i-1]
+        prev_low = prev_day['low']
+        prev_change = (prev_day['close'] - prev_day['open']) / prev_day['open'] * 100
+        
+        # 条件：今天最低 < 昨天最低 且 昨天上涨
+        if today_low < prev_low and prev_change > 0:
+            is_key_breakout = True
+            breakout_date = df.iloc[i]['date']
+            break
+    
+    # 3. 启动特征（10日内）
+    has_breakout = len(recent_period[recent_period['pct_chg'] >= 4.0]) >= 1
+    is_shrinking = curr['volume'] < prev['volume']
+    ma5_trending_up = curr['MA5'] > prev['MA5']
+    on_ma5 = (curr['close'] >= curr['MA5']) and (curr['low'] <= curr['MA5'] * 1.015)
+    
+    is_pullback = is_shrinking and on_ma5 and ma5_trending_up
+    
+    # 4. 结果输出
+    if has_breakout and is_pullback:
+        if is_key_breakout:
+            return "🚀 启动期（重点）"  # 特殊标记
+        else:
+            return "🚀 启动期"
+    elif has_breakout:
+        return "🧪 蓄势中"
+    
+    return None
+
+# ================= breakout_pullback =================
+
+def breakout_pullback(df):
+    """
+    策略版本：V3.2 (突破回调版 - 增强版)
+    核心逻辑：大红小绿吸筹期 + 五日小幅放量 + 三连阳后缩量大跌
+    
+    新增筛选条件：近20日内未出现过连续四天及以上阴线
+    
+    阶段定义：
+    - 🚀 启动期（重中之重）：满足启动期(重点)条件，且近5日内有效跌破三连阳最后一天的最低价，收盘下跌
+    - 🚀 启动期（重点）：满足所有条件，且大跌后快速收复
+    - 🚀 启动期：满足所有条件
+    - 🧪 蓄势中：满足吸筹+放量条件，等待大跌信号
+    - 🏖️ 整理区：仅满足吸筹条件
+    """
+    if df is None or len(df) < 60:
+        return None
+    
+    df = df.copy()
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # 指标计算
+    df['MA5'] = df['close'].rolling(5).mean()
+    df['MA20'] = df['close'].rolling(20).mean()
+    df['MA30'] = df['close'].rolling(30).mean()
+    df['MA60'] = df['close'].rolling(60).mean()
+    df['MA20_vol'] = df['volume'].rolling(20).mean()
+    df['pct_chg'] = df['close'].pct_change() * 100
+    
+    curr = df.iloc[-1]
+    
+    # 时间切片
+    acc_period = df.iloc[-60:-20]
+    recent_5d = df.iloc[-5:]
+    recent_20d = df.iloc[-20:]  # 近20日
+    
+    # ========== 0. 新增筛选：近20日内未出现连续四天及以上阴线 ==========
+    def has_consecutive_bearish(days_df, consecutive_days=4):
+        """检查是否出现连续N天及以上阴线"""
+        if len(days_df) < consecutive_days:
+            return False
+        
+        # 标记阴线（收盘 < 开盘）
+        days_df = days_df.copy()
+        days_df['is_bearish'] = days_df['close'] < days_df['open']
+        
+        # 检查连续阴线
+        consecutive_count = 0
+        for is_bear in days_df['is_bearish']:
+            if is_bear:
+                consecutive_count += 1
+                if consecutive_count >= consecutive_days:
+                    return True
+            else:
+                consecutive_count = 0
+        return False
+    
+    # 如果近20日出现连续4天及以上阴线，直接返回None
+    if has_consecutive_bearish(recent_20d, 4):
+        return None
+    
+    # ========== 1. 吸筹判定（大红小绿） ==========
+    red_days = acc_period[acc_period['close'] > acc_period['open']]
+    green_days = acc_period[acc_period['close'] <= acc_period['open']]
+    
+    red_vol = red_days['volume'].sum()
+    green_vol = green_days['volume'].sum()
+    red_count = len(red_days)
+    green_count = len(green_days)
+    
+    is_accumulating = (red_vol > green_vol * 1.3) and (red_count >= green_count)
+    
+    if not is_accumulating:
+        return None
+    
+    # ========== 2. 五日小幅放量判定 ==========
+    vol_above_ma20 = (recent_5d['volume'] > recent_5d['MA20_vol']).sum()
+    has_volume_expansion = vol_above_ma20 >= 3
+    max_vol_ratio = (recent_5d['volume'] / recent_5d['MA20_vol']).max()
+    is_moderate_volume = max_vol_ratio < 3.0
+    volume_ok = has_volume_expansion and is_moderate_volume
+    
+    # ========== 3. 三连阳后缩量大跌判定 ==========
+    has_three_rising = False
+    has_crash = False
+    crash_recovered = False
+    
+    three_rising_last_low = None
+    
+    for i in range(-20, -3):
+        if i < -len(df) + 3:
+            continue
+        
+        day1 = df.iloc[i]
+        day2 = df.iloc[i+1]
+        day3 = df.iloc[i+2]
+        
+        rising_count = 0
+        if day1['close'] > day1['open']: rising_count += 1
+        if day2['close'] > day2['open']: rising_count += 1
+        if day3['close'] > day3['open']: rising_count += 1
+        
+        total_gain = (day3['close'] - day1['open']) / day1['open'] * 100
+        
+        if rising_count >= 2 and total_gain > 3:
+            has_three_rising = True
+            three_rising_last_low = day3['low']
+            
+            crash_day = df.iloc[i+3]
+            prev_day = day3
+            
+            is_falling = crash_day['close'] < crash_day['open']
+            break_low = crash_day['low'] < prev_day['low']
+            
+            avg_vol_3d = (day1['volume'] + day2['volume'] + day3['volume']) / 3
+            is_shrinking = crash_day['volume'] < avg_vol_3d * 0.8
+            
+            drop_pct = (crash_day['close'] - crash_day['open']) / crash_day['open'] * 100
+            is_big_drop = -7 < drop_pct < -3
+            
+            if is_falling and break_low and is_shrinking and is_big_drop:
+                has_crash = True
+                
+                if i + 6 < 0:
+                    crash_close = crash_day['close']
+                    for j in range(i+4, min(i+7, 0)):
+                        if df.iloc[j]['close'] > crash_close * 1.02:
+                            crash_recovered = True
+                            break
+                break
+    
+    # ========== 4. 重中之重判定 ==========
+    is_key_signal = False
+    if has_three_rising and three_rising_last_low is not None:
+        for i in range(-5, 0):
+            if i < -len(df):
+                continue
+            check_day = df.iloc[i]
+            if check_day['low'] < three_rising_last_low and check_day['close'] < check_day['open']:
+                is_key_signal = True
+                break
+    
+    # ========== 5. 结果输出 ==========
+    if has_three_rising and has_crash:
+        if is_key_signal:
+            return "🚀 启动期（重中之重）"
+        elif crash_recovered:
+            return "🚀 启动期（重点）"
+        else:
+            return "🚀 启动期"
+    elif volume_ok and has_three_rising:
+        return "🧪 蓄势中"
+    elif is_accumulating:
+        return "🏖️ 整理区"
+    
+    return None
+
+ANALYZE = {
+    'ma5': ma5_support,
+    'volume_breakout': volume_breakout,
+    'breakout_pullback': breakout_pullback,
+}
@@ -0,0 +1,202 @@
+"""
+扫描结果归档与日间对比模块
+每次全市场扫描完成后按 策略 + 数据日期 归档一条列式记录：
+    scan_archive/{策略}/{YYYY-MM-DD}.json
+    {version, strategy, date, generation, total_scanned, archived_at,
+     stages: [阶段名称（强 → 弱）],
+     columns: {fullCode: [...], name: [...], stage: [阶段下标], price: [...], change: [...]}}
+同一天重复扫描覆盖当天记录。对比任意两个日期时只读这两条记录，不重新扫描历史数据：
+新命中 / 不再命中 / 阶段升级 / 阶段降级，以及每个阶段的进出数量。
+阶段强弱取记录里保存的阶段顺序（策略 RULES 的判定顺序，越靠前越强）。
+"""
+import os
+import json
+import datetime
+import threading
+
+from strategies.registry import get_strategy
+from utils import storage
+
+ARCHIVE_DIR = "scan_archive"
+ARCHIVE_VERSION = 1
+# 每个策略保留的归档天数
+MAX_ARCHIVE_DAYS = 250
+
+_cache = {}
+_lock = threading.Lock()
+
+# ================= 1. 归档 =================
+
+def _strategy_dir(strategy):
+    return os.path.join(ARCHIVE_DIR, strategy)
+
+def _record_path(strategy, date):
+    return os.path.join(_strategy_dir(strategy), f"{date}.json")
+
+def _stage_order(strategy, results):
+    """阶段顺序：策略规则的判定顺序，结果里出现的其他阶段接在后面"""
+    config = get_strategy(strategy)
+    stages = config['rules'].labels() if config and config.get('rules') else []
+    for r in results:
+        if r.get('阶段') not in stages:
+            stages.append(r.get('阶段'))
+    return stages
+
+def save_scan(strategy, data_date, results, total_scanned=None, generation=None):
+    """
+    归档一次扫描结果（同一天重复扫描覆盖当天记录）
+    参数:
+        data_date: 扫描快照的数据日期，为空时不归档
+        results: 扫描结果列表（中文字段）
+        generation: 扫描时的数据版本号（manifest.snapshot）
+    返回: 归档文件路径，未归档返回 None
+    """
+    if not data_date:
+        return None
+    stages = _stage_order(strategy, results)
+    index = {stage: i for i, stage in enumerate(stages)}
+    rows = sorted(results, key=lambda r: r.get('完整代码', ''))
+    record = {
+        'version': ARCHIVE_VERSION,
+        'strategy': strategy,
+        'date': str(data_date),
+        'generation': generation,
+        'total_scanned': total_scanned,
+        'archived_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'stages': stages,
+        'columns': {
+            'fullCode': [r.get('完整代码', '') for r in rows],
+            'name': [r.get('名称', '') for r in rows],
+            'stage': [index[r.get('阶段')] for r in rows],
+            'price': [float(r.get('现价', 0)) for r in rows],
+            'change': [r.get('涨跌幅', '0%') for r in rows]
+        }
+    }
+    os.makedirs(_strategy_dir(strategy), exist_ok=True)
+    path = _record_path(strategy, record['date'])
+    storage.write_json(path, record)
+    _prune(strategy)
+    return path
+
+def _prune(strategy):
+    for date in list_dates(strategy)[:-MAX_ARCHIVE_DAYS]:
+        try:
+            os.remove(_record_path(strategy, date))
+        except OSError:
+            pass
+
+# ================= 2. 读取 =================
+
+def list_dates(strategy):
+    """策略已归档的数据日期（升序）"""
+    directory = _strategy_dir(strategy)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-5] for f in os.listdir(directory) if f.endswith('.json') and not f.startswith('.'))
+
+def load_scan(strategy, date):
+    """
+    读取一条归档记录，文件未变化时直接返回缓存
+    返回: 记录 dict，不存在返回 None
+    """
+    path = _record_path(strategy, date)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _cache.get(os.path.abspath(path))
+        if cached and cached[0] == key:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    with _lock:
+        _cache[os.path.abspath(path)] = (key, record)
+    return record
+
+def record_rows(record):
+    """把列式记录展开为 {完整代码: 行}，行字段与 report.format_results 一致"""
+    columns = record['columns']
+    stages = record['stages']
+    rows = {}
+    for i, full_code in enumerate(columns['fullCode']):
+        rows[full_code] = {
+            'code': full_code.split('.')[-1],
+            'name': columns['name'][i],
+            'fullCode': full_code,
+            'price': columns['price'][i],
+            'change': columns['change'][i],
+            'stage': stages[columns['stage'][i]]
+        }
+    return rows
+
+# ================= 3. 对比 =================
+
+def diff_records(old, new):
+    """
+    对比两条归档记录（old 较早，new 较晚）
+    返回: {from, to, added, removed, upgraded, downgraded, stageFlow, counts}
+        added / removed: 新命中 / 不再命中的股票
+        upgraded / downgraded: 阶段变强 / 变弱的股票，带 fromStage
+        stageFlow: {阶段: {entered, left}}，阶段变化同时计入新旧两个阶段
+    """
+    old_rows, new_rows = record_rows(old), record_rows(new)
+    order = list(new['stages']) + [s for s in old['stages'] if s not in new['stages']]
+    rank = {stage: i for i, stage in enumerate(order)}
+
+    added = [row for code, row in new_rows.items() if code not in old_rows]
+    removed = [row for code, row in old_rows.items() if code not in new_rows]
+    upgraded, downgraded = [], []
+    for code, row in new_rows.items():
+        before = old_rows.get(code)
+        if before is None or before['stage'] == row['stage']:
+            continue
+        change = {**row, 'fromStage': before['stage']}
+        (upgraded if rank[row['stage']] < rank[before['stage']] else downgraded).append(change)
+
+    flow = {stage: {'entered': 0, 'left': 0} for stage in order}
+    for row in added + upgraded + downgraded:
+        flow[row['stage']]['entered'] += 1
+    for row in removed:
+        flow[row['stage']]['left'] += 1
+    for row in upgraded + downgraded:
+        flow[row['fromStage']]['left'] += 1
+
+    return {
+        'strategy': new['strategy'],
+        'from': old['date'],
+        'to': new['date'],
+        'added': added,
+        'removed': removed,
+        'upgraded': upgraded,
+        'downgraded': downgraded,
+        'stageFlow': {stage: counts for stage, counts in flow.items() if counts['entered'] or counts['left']},
+        'counts': {
+            'added': len(added),
+            'removed': len(removed),
+            'upgraded': len(upgraded),
+            'downgraded': len(downgraded),
+            'unchanged': len(new_rows) - len(added) - len(upgraded) - len(downgraded)
+        }
+    }
+
+def diff(strategy, to_date=None, from_date=None):
+    """
+    对比策略在两个数据日期的扫描结果
+    参数:
+        to_date: 较晚的日期，为空时取最新归档
+        from_date: 较早的日期，为空时取 to_date 之前最近的一次归档
+    返回: diff_records 的结果，缺少任一日期的归档时返回 None
+    """
+    dates = list_dates(strategy)
+    to_date = to_date or (dates[-1] if dates else None)
+    if from_date is None:
+        earlier = [d for d in dates if to_date and d < to_date]
+        from_date = earlier[-1] if earlier else None
+    if not to_date or not from_date:
+        return None
+    old, new = load_scan(strategy, from_date), load_scan(strategy, to_date)
+    if old is None or new is None:
+        return None
+    return diff_records(old, new)
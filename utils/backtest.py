@@ -0,0 +1,205 @@
+"""
+回测模块
+在全市场面板上用策略的规则（RULES）一次性算出每根K线的阶段，取检查日出现的信号，
+统计其后 N 日内的最高涨幅。各策略的回测脚本共用这里的实现，只需指定策略与信号。
+成功率定义：信号出现后N日内最高涨幅 >= 目标涨幅（默认 5%）
+"""
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from utils.panel import load_panel
+from strategies.registry import get_strategy
+
+HORIZONS = (10, 20)
+TARGET_RETURN = 0.05
+# 检查点：每月这几天（非交易日自动跳过）
+CHECK_DAYS = (1, 5, 10, 15, 20, 25)
+
+# ================= 1. 信号提取 =================
+
+def default_check_dates(year=2025):
+    return [f"{year}-{month:02d}-{day:02d}" for month in range(1, 13) for day in CHECK_DAYS]
+
+def stage_grid(panel, strategy_config, params=None, shared_cache=None):
+    """
+    计算面板每个位置的阶段编号及阶段名称列表
+    策略有 RULES 时批量计算；否则逐只股票、逐根K线调用 analyze（较慢）
+    返回: ((S, T) int16 数组，-1 表示无信号, 阶段名称列表)
+    """
+    rules = strategy_config.get('rules')
+    if rules is not None:
+        return rules.evaluate(panel, params, shared_cache), rules.labels()
+
+    labels = []
+    grid = np.full(panel.shape, -1, dtype='int16')
+    width = panel.shape[1]
+    for row, full_code in enumerate(tqdm(panel.codes, desc="逐只判定")):
+        length = int(panel.bar_count[row, -1])
+        df = pd.DataFrame({'date': panel.dates[row, width - length:],
+                           **{name: values[row, width - length:] for name, values in panel.columns.items()}})
+        for end in range(1, length + 1):
+            stage = strategy_config['func'](df.iloc[:end])
+            if stage:
+                if stage not in labels:
+                    labels.append(stage)
+                grid[row, width - length + end - 1] = labels.index(stage)
+    return grid, labels
+
+def signal_mask(panel, grid, labels, check_dates, signal, exact=False, year=2025, min_year_bars=60):
+    """
+    检查日中出现目标信号的位置
+    参数:
+        signal: 目标阶段名称；exact=False 时匹配所有包含该名称的阶段（如各类 "🚀 启动期"）
+        min_year_bars: 当年K线不足该数量的股票不参与回测
+    返回: (S, T) 布尔数组
+    """
+    wanted = [i for i, label in enumerate(labels) if (label == signal if exact else signal in label)]
+    if not wanted:
+        return np.zeros(panel.shape, dtype=bool)
+    return np.isin(grid, wanted) & check_date_mask(panel, check_dates, year, min_year_bars)
+
+def check_date_mask(panel, check_dates, year=2025, min_year_bars=60):
+    """检查日所在位置（只与面板有关，多组参数之间可复用）"""
+    year_prefix = f"{year}-"
+    in_year = np.vectorize(lambda d: d.startswith(year_prefix), otypes=[bool])(panel.dates)
+    eligible = in_year.sum(axis=1) >= min_year_bars
+    return np.isin(panel.dates, list(check_dates)) & eligible[:, None]
+
+def find_signals(panel, grid, labels, check_dates, signal, exact=False, year=2025, min_year_bars=60):
+    """
+    在检查日中筛出目标信号（参数同 signal_mask）
+    返回: [(行, 列, 阶段名称)]，按股票、日期排序
+    """
+    mask = signal_mask(panel, grid, labels, check_dates, signal, exact, year, min_year_bars)
+    rows, cols = np.nonzero(mask)
+    return [(r, c, labels[grid[r, c]]) for r, c in zip(rows.tolist(), cols.tolist())]
+
+# ================= 2. 收益统计 =================
+
+def forward_return(panel, row, col, days, target_return=TARGET_RETURN):
+    """
+    信号后 days 根K线内的最高涨幅
+    返回: (是否成功, 最高涨幅%, 达到最高涨幅的日期)
+    """
+    future_high = panel.column('high')[row, col + 1:col + 1 + days]
+    if len(future_high) == 0 or np.isnan(future_high).all():
+        return False, 0, None
+
+    signal_close = panel.column('close')[row, col]
+    best = int(np.nanargmax(future_high))
+    max_return = (future_high[best] - signal_close) / signal_close
+    return bool(max_return >= target_return), float(max_return * 100), panel.dates[row, col + 1 + best]
+
+def forward_max_returns(panel, days):
+    """
+    面板每个位置之后 days 根K线内的最高涨幅%（与 forward_return 一致：之后没有K线时为 0）
+    返回: (S, T) float64 数组
+    """
+    high = panel.column('high')
+    close = panel.column('close')
+    future_high = np.full(high.shape, np.nan)
+    for k in range(1, days + 1):
+        shifted = np.full(high.shape, np.nan)
+        shifted[:, :-k] = high[:, k:]
+        future_high = np.fmax(future_high, shifted)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (future_high - close) / close * 100
+    return np.where(np.isnan(future_high), 0.0, returns)
+
+def evaluate_signals(panel, signals, horizons=HORIZONS, target_return=TARGET_RETURN):
+    """为每个信号计算各持有期的结果，返回 {持有期: [信号明细]}"""
+    close = panel.column('close')
+    results = {days: [] for days in horizons}
+    for row, col, stage in signals:
+        info = {
+            'code': panel.codes[row],
+            'date': panel.dates[row, col],
+            'close': float(close[row, col]),
+            'stage': stage
+        }
+        for days in horizons:
+            success, max_return, max_date = forward_return(panel, row, col, days, target_return)
+            results[days].append({**info, 'success': success, 'max_return': max_return, 'max_date': max_date})
+    return results
+
+def summarize(signals):
+    """汇总信号明细：总数 / 成功数 / 成功率% / 平均最高涨幅%"""
+    total = len(signals)
+    success = sum(1 for s in signals if s['success'])
+    return {
+        'total': total,
+        'success': success,
+        'success_rate': success / total * 100 if total else 0.0,
+        'avg_max_return': sum(s['max_return'] for s in signals) / total if total else 0.0
+    }
+
+# ================= 3. 回测入口 =================
+
+def _print_horizon(days, signals):
+    if not signals:
+        print(f"【{days}日回测结果】无信号")
+        print()
+        return
+
+    stats = summarize(signals)
+    print(f"【{days}日回测结果】")
+    print(f"  总信号数: {stats['total']}")
+    print(f"  成功次数: {stats['success']}")
+    print(f"  成功率: {stats['success_rate']:.2f}%")
+    print(f"  平均最高涨幅: {stats['avg_max_return']:.2f}%")
+    print()
+
+    # 显示前10个成功信号
+    print("  成功信号示例（前10个）:")
+    for s in [s for s in signals if s['success']][:10]:
+        print(f"    {s['code']} - 信号日期: {s['date']}, 阶段: {s['stage']}, 最高涨幅: {s['max_return']:.2f}%")
+    print()
+
+def run_backtest(strategy_name, signal, exact=False, title=None, output_prefix=None, year=2025, codes=None):
+    """
+    运行回测并打印结果，明细保存为 {output_prefix}_{N}d.csv
+    参数:
+        strategy_name: 策略名称
+        signal / exact: 统计的信号（见 find_signals）
+        codes: 只回测指定股票（完整代码），默认全部
+    返回: {持有期: [信号明细]}
+    """
+    strategy_config = get_strategy(strategy_name)
+    if strategy_config is None:
+        raise ValueError(f"找不到策略: {strategy_name}")
+    title = title or f"{strategy_name} 回测"
+
+    print("=" * 80)
+    print(f"{title} - {year}年全年数据")
+    print(f"信号：{signal}")
+    print(f"成功率定义：信号出现后N日内最高涨幅 > {TARGET_RETURN * 100:.0f}%")
+    print("=" * 80)
+    print()
+
+    panel, _ = load_panel(codes)
+    print(f"共加载 {len(panel.codes)} 只股票")
+    print()
+
+    print("开始回测...")
+    print()
+    grid, labels = stage_grid(panel, strategy_config)
+    signals = find_signals(panel, grid, labels, default_check_dates(year), signal, exact, year)
+    results = evaluate_signals(panel, signals)
+
+    print()
+    print("=" * 80)
+    print("回测结果")
+    print("=" * 80)
+    print()
+    for days, detail in results.items():
+        _print_horizon(days, detail)
+
+    # 保存详细结果到CSV
+    if output_prefix:
+        for days, detail in results.items():
+            if detail:
+                path = f"{output_prefix}_{days}d.csv"
+                pd.DataFrame(detail).to_csv(path, index=False, encoding='utf-8-sig')
+                print(f"详细结果已保存: {path}")
+    return results
@@ -0,0 +1,347 @@
+"""
+行情数据快速读取模块
+把 stock_data 下的 CSV 解析为带类型的列式数组并常驻内存，
+文件未变化（mtime/size 不变）时直接命中缓存，指标按需计算后一并缓存。
+"""
+import io
+import os
+import re
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils import kernels, profiling
+
+DATA_DIR = "./stock_data"
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 常驻内存的股票数量上限（全市场约5000只，留一些余量）
+MAX_CACHED_STOCKS = 6000
+
+_bar_cache = OrderedDict()        # full_code -> (signature, DataFrame)
+_tail_cache = OrderedDict()       # full_code -> (signature, DataFrame)，只含最近若干根K线
+_indicator_cache = {}             # (full_code, signature, indicator) -> np.ndarray
+_cache_lock = threading.Lock()
+# 缓存命中统计（在已持有的 _cache_lock 内累加，供 utils.metrics 读取）
+_cache_stats = {'bars_hit': 0, 'bars_miss': 0, 'tail_hit': 0, 'tail_miss': 0}
+
+# 支持的指标：ma5 / ma20 / vol_ma20 / pct_chg（均线窗口至少为 1）
+_INDICATOR_PATTERN = re.compile(r'^(ma|vol_ma)([1-9]\d*)$')
+
+# ================= 1. 代码解析 =================
+
+def resolve_code(code):
+    """
+    将用户输入的股票代码解析为 (纯代码, 完整代码)
+    code: "600519" 或 "sh.600519" 或 "sz.000001"
+    返回: (pure_code, full_code)，无法识别时返回 None
+    """
+    code = str(code).strip()
+    if '.' in code:
+        return code.split('.')[1], code
+
+    if code.startswith('6'):
+        return code, f"sh.{code}"
+    elif code.startswith('0') or code.startswith('3'):
+        return code, f"sz.{code}"
+    elif code.startswith('8') or code.startswith('4') or code.startswith('92'):
+        return code, f"bj.{code}"
+    return None
+
+def stock_file_path(full_code):
+    """返回股票数据文件路径"""
+    return os.path.join(DATA_DIR, f"{full_code}.csv")
+
+# ================= 2. 行情缓存 =================
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def data_version(full_code):
+    """返回股票数据文件的版本标识（文件变化即变化），文件不存在返回 None"""
+    try:
+        return _file_signature(stock_file_path(full_code))
+    except OSError:
+        return None
+
+# 解析时直接指定类型，避免逐列 pd.to_numeric
+_CSV_DTYPES = {'date': str, **{col: 'float64' for col in BAR_COLUMNS}}
+
+# 反向读取文件尾部时的块大小（一行日线约 60 字节）
+_TAIL_BLOCK_SIZE = 8192
+
+def _read_csv_typed(source, path):
+    """
+    按固定类型解析CSV（initData / appendData 写入的是经 utils.quality 校验过的数据）；
+    只有未经校验的旧文件含非数字脏数据时才退回逐列强制转换
+    """
+    try:
+        with profiling.stage('parse_csv'):
+            return pd.read_csv(source, dtype=_CSV_DTYPES)
+    except ValueError:
+        logging.warning(f"{path} 含非数字数据，建议运行 utils.quality.validate_data_dir() 清洗")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        with profiling.stage('coerce_numeric'):
+            df = pd.read_csv(source, dtype={'date': str})
+            for col in BAR_COLUMNS:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        return df
+
+def _parse_bars(path):
+    """读取CSV并一次性完成类型转换"""
+    return _read_csv_typed(path, path)
+
+def _read_tail_bytes(path, n):
+    """
+    从文件末尾向前读取，直到凑够 n 行数据
+    返回: (表头行, 尾部数据字节)；文件不足 n 行时返回全部数据
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+
+        pos = end
+        chunks = []
+        newlines = 0
+        # 末尾换行符不算一行；多读一个换行符以确保第一行完整
+        while pos > data_start and newlines <= n:
+            size = min(_TAIL_BLOCK_SIZE, pos - data_start)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+
+    tail = b''.join(reversed(chunks))
+    if pos > data_start:
+        # 丢弃第一段不完整的行
+        tail = tail[tail.index(b'\n') + 1:]
+    lines = tail.rstrip(b'\r\n').split(b'\n')
+    return header, b'\n'.join(lines[-n:]) + b'\n'
+
+def read_last_date(path):
+    """只读取文件最后一行的日期（数据新鲜度统计用），文件为空或无法读取时返回 None"""
+    try:
+        _, tail = _read_tail_bytes(path, 1)
+    except (OSError, ValueError):
+        return None
+    line = tail.strip().split(b',', 1)[0].decode('utf-8', 'ignore')
+    return line or None
+
+def load_bars(full_code):
+    """
+    加载单只股票的全部日线（带类型），文件未变化时直接返回缓存
+    返回: DataFrame，不存在时返回 None
+    注意：返回的是共享缓存，调用方不要原地修改
+    """
+    path = stock_file_path(full_code)
+    try:
+        signature = _file_signature(path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _bar_cache.get(full_code)
+        if cached and cached[0] == signature:
+            _bar_cache.move_to_end(full_code)
+            _cache_stats['bars_hit'] += 1
+            return cached[1]
+        _cache_stats['bars_miss'] += 1
+
+    df = _parse_bars(path)
+
+    with _cache_lock:
+        _bar_cache[full_code] = (signature, df)
+        _bar_cache.move_to_end(full_code)
+        while len(_bar_cache) > MAX_CACHED_STOCKS:
+            evicted, _ = _bar_cache.popitem(last=False)
+            _drop_indicators(evicted)
+    return df
+
+def cut_as_of(df, as_of):
+    """截掉 as_of 之后的K线（快照读取），没有更新的K线时原样返回"""
+    if as_of is None or df is None or df.empty or df['date'].iat[-1] <= as_of:
+        return df
+    return df.iloc[:int(np.searchsorted(df['date'].to_numpy(), as_of, side='right'))]
+
+def load_tail(full_code, n, as_of=None):
+    """
+    只加载最近 n 根K线（带类型），策略扫描使用
+    已有全量缓存时直接切片；否则从文件尾部反向读取，读盘与解析量与历史长度无关
+    as_of: 快照日期，只返回该日及之前的K线（见 utils.manifest.snapshot）
+    返回: DataFrame，不存在时返回 None
+    注意：返回的是共享缓存（或其切片），调用方不要原地修改
+    """
+    df = _load_tail(full_code, n)
+    if as_of is None or df is None or df.empty or df['date'].iat[-1] <= as_of:
+        return df
+    # 快照之后已经追加了新K线（只在增量更新期间出现），按全量数据截断后再取尾部
+    return cut_as_of(load_bars(full_code), as_of).iloc[-n:]
+
+def _load_tail(full_code, n):
+    path = stock_file_path(full_code)
+    try:
+        signature = _file_signature(path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _bar_cache.get(full_code)
+        if cached and cached[0] == signature:
+            _cache_stats['tail_hit'] += 1
+            return cached[1].iloc[-n:]
+        cached = _tail_cache.get(full_code)
+        if cached and cached[0] == signature and len(cached[1]) >= n:
+            _tail_cache.move_to_end(full_code)
+            _cache_stats['tail_hit'] += 1
+            return cached[1].iloc[-n:]
+        _cache_stats['tail_miss'] += 1
+
+    with profiling.stage('read_file'):
+        header, tail = _read_tail_bytes(path, n)
+    df = _read_csv_typed(io.BytesIO(header + tail), path)
+
+    with _cache_lock:
+        _tail_cache[full_code] = (signature, df)
+        _tail_cache.move_to_end(full_code)
+        while len(_tail_cache) > MAX_CACHED_STOCKS:
+            _tail_cache.popitem(last=False)
+    return df
+
+def _drop_indicators(full_code):
+    for key in [k for k in _indicator_cache if k[0] == full_code]:
+        del _indicator_cache[key]
+
+def clear_cache():
+    """清空全部缓存（数据全量重建后调用）"""
+    with _cache_lock:
+        _bar_cache.clear()
+        _tail_cache.clear()
+        _indicator_cache.clear()
+
+def cache_stats():
+    """缓存命中次数与当前缓存的股票数"""
+    with _cache_lock:
+        return {**_cache_stats, 'bars_cached': len(_bar_cache), 'tail_cached': len(_tail_cache)}
+
+# ================= 3. 指标计算 =================
+
+def is_valid_indicator(name):
+    return name == 'pct_chg' or _INDICATOR_PATTERN.match(name) is not None
+
+def compute_indicator(df, name):
+    """
+    计算单个指标，返回与 df 等长的 float64 数组
+    name: ma<N> (收盘价均线) / vol_ma<N> (成交量均线) / pct_chg (涨跌幅%)
+    """
+    if name == 'pct_chg':
+        return (df['close'].pct_change() * 100).to_numpy()
+
+    m = _INDICATOR_PATTERN.match(name)
+    if not m:
+        raise ValueError(f"不支持的指标: {name}")
+    kind, window = m.group(1), int(m.group(2))
+    column = 'close' if kind == 'ma' else 'volume'
+    return kernels.window_mean(df[column].to_numpy(dtype='float64'), window)
+
+def get_indicator(full_code, name):
+    """获取缓存的指标数组，数据文件变化后自动失效"""
+    df = load_bars(full_code)
+    if df is None:
+        return None
+
+    with _cache_lock:
+        signature = _bar_cache[full_code][0] if full_code in _bar_cache else None
+        key = (full_code, signature, name)
+        values = _indicator_cache.get(key)
+    if values is not None:
+        return values
+
+    values = compute_indicator(df, name)
+    with _cache_lock:
+        # 同一只股票的旧版本指标一起清掉
+        for stale in [k for k in _indicator_cache if k[0] == full_code and k[1] != signature]:
+            del _indicator_cache[stale]
+        _indicator_cache[key] = values
+    return values
+
+# ================= 4. 区间切片 =================
+
+def _to_json_list(values, digits=None):
+    """numpy 数组转 JSON 友好的列表（NaN -> None）"""
+    if digits is not None:
+        values = np.round(values, digits)
+    return [None if v != v else float(v) for v in values.tolist()]
+
+def check_slice_args(start=None, end=None, indicators=None, limit=None):
+    """
+    校验区间切片参数（与股票无关，多只股票共用时只需校验一次）
+    参数不合法时抛出 ValueError
+    """
+    for name, value in (('start', start), ('end', end)):
+        if not value:
+            continue
+        try:
+            datetime.datetime.strptime(value, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} 应为 YYYY-MM-DD 格式的日期: {value}")
+    invalid = [name for name in indicators or [] if not is_valid_indicator(name)]
+    if invalid:
+        raise ValueError(f"不支持的指标: {', '.join(invalid)}")
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+        raise ValueError(f"limit 应为正整数: {limit}")
+
+def get_bar_slice(code, start=None, end=None, indicators=None, limit=None):
+    """
+    获取单只股票的K线区间及指标（列式输出，适合直接画图）
+    参数:
+        code: 股票代码
+        start/end: 起止日期 "YYYY-MM-DD"（包含），为空表示不限
+        indicators: 指标名列表，如 ['ma5', 'ma20', 'vol_ma20']
+        limit: 只返回最后 N 根K线
+    返回: dict，失败时包含 error 字段（参数不合法或股票不存在）
+    """
+    indicators = indicators or []
+    try:
+        check_slice_args(start, end, indicators, limit)
+    except ValueError as e:
+        return {"code": code, "error": str(e)}
+
+    resolved = resolve_code(code)
+    if not resolved:
+        return {"code": code, "error": f"无法识别股票代码: {code}"}
+    pure_code, full_code = resolved
+
+    df = load_bars(full_code)
+    if df is None:
+        return {"code": pure_code, "error": f"股票数据不存在: {code}"}
+
+    # 日期是 YYYY-MM-DD 字符串，按字典序即时间序，用二分定位切片
+    dates = df['date'].to_numpy()
+    lo = int(np.searchsorted(dates, start, side='left')) if start else 0
+    hi = int(np.searchsorted(dates, end, side='right')) if end else len(dates)
+    if limit:
+        lo = max(lo, hi - limit)
+
+    result = {
+        "code": pure_code,
+        "fullCode": full_code,
+        "count": max(hi - lo, 0),
+        "dates": dates[lo:hi].tolist(),
+    }
+    for col in BAR_COLUMNS:
+        result[col] = _to_json_list(df[col].to_numpy()[lo:hi])
+
+    result["indicators"] = {
+        name: _to_json_list(get_indicator(full_code, name)[lo:hi], 4)
+        for name in indicators
+    }
+    return result
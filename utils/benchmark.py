@@ -0,0 +1,203 @@
+"""
+端到端性能基准模块
+在合成市场（utils/synthetic.generate_realistic_market）或已有的数据目录上依次运行：
+    scan:     run_scanner（每个策略 × 每个引擎）
+    single:   analyze_single_stock（抽样若干只股票）
+    api_scan: Flask /api/scan/<策略>
+    backtest: run_backtest
+每个用例在独立的子进程中运行，行情/特征缓存都是冷的，峰值内存也只属于该用例。
+结果为 JSON：每个用例的墙钟时间、CPU 时间、峰值 RSS 与每秒处理股票数，便于跨版本对比。
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.synthetic import generate_realistic_market, write_workspace
+
+CASE_KINDS = ('scan', 'single', 'api_scan', 'backtest')
+ENGINES = ('batch', 'stock')
+
+# 与 backtest_strategy*.py 统计的信号一致
+BACKTEST_SIGNALS = {
+    'ma5': ("🚀 启动期", False),
+    'volume_breakout': ("🚀 启动期（重点）", True),
+    'breakout_pullback': ("🚀 启动期（重中之重）", True),
+}
+
+# ================= 1. 测量 =================
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）；Linux 上 ru_maxrss 单位为 KB，macOS 上为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def measure(func):
+    """
+    运行 func 并计时（屏蔽其打印输出与进度条）
+    返回: (func 的返回值, {wall_s, cpu_s})
+    """
+    sink = io.StringIO()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        result = func()
+    return result, {
+        'wall_s': round(time.perf_counter() - wall_start, 3),
+        'cpu_s': round(time.process_time() - cpu_start, 3)
+    }
+
+# ================= 2. 用例 =================
+
+def _scan(strategy, engine):
+    from index import run_scanner
+    result = run_scanner(strategy, generate_html=False, open_browser=False, engine=engine, save_archive=False)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', '扫描失败'))
+    return result['total_scanned'], {'hits': result['total_hit']}
+
+def _single(strategy, samples):
+    from index import analyze_single_stock
+    codes = sorted(f[:-4] for f in os.listdir('stock_data') if f.endswith('.csv'))[:samples]
+    errors = sum(1 for code in codes if 'error' in (analyze_single_stock(code, strategy) or {'error': ''}))
+    return len(codes), {'errors': errors}
+
+def _api_scan(strategy):
+    from api_server import app
+    response = app.test_client().get(f'/api/scan/{strategy}')
+    data = response.get_json()
+    if response.status_code != 200 or not data.get('success'):
+        raise RuntimeError(data.get('error', f'HTTP {response.status_code}'))
+    return data['data']['totalScanned'], {'hits': data['data']['totalHit']}
+
+def _backtest(strategy):
+    from utils.backtest import run_backtest
+    from strategies.registry import get_strategy
+    signal, exact = BACKTEST_SIGNALS.get(strategy, ("🚀 启动期", False))
+    results = run_backtest(strategy, signal, exact)
+    stocks = len([f for f in os.listdir('stock_data') if f.endswith('.csv')])
+    return stocks, {'signals': {f'{days}d': len(detail) for days, detail in results.items()},
+                    'grid': 'rules' if get_strategy(strategy).get('rules') is not None else 'analyze'}
+
+def run_case(workdir, case):
+    """
+    在 workdir 下运行一个用例（子进程入口）
+    参数:
+        case: {'kind', 'strategy', 'engine'?, 'samples'?}
+    返回: 用例结果 dict
+    """
+    os.chdir(workdir)
+    kind, strategy = case['kind'], case['strategy']
+    if kind == 'scan':
+        func = lambda: _scan(strategy, case['engine'])
+    elif kind == 'single':
+        func = lambda: _single(strategy, case['samples'])
+    elif kind == 'api_scan':
+        func = lambda: _api_scan(strategy)
+    elif kind == 'backtest':
+        func = lambda: _backtest(strategy)
+    else:
+        raise ValueError(f"未知的用例类型: {kind}")
+
+    row = dict(case)
+    try:
+        (units, extra), timing = measure(func)
+    except Exception as e:
+        row.update({'ok': False, 'error': str(e), 'peak_rss_mb': peak_rss_mb()})
+        return row
+    row.update(timing)
+    row.update({
+        'ok': True,
+        'stocks': units,
+        'stocks_per_s': round(units / timing['wall_s'], 1) if timing['wall_s'] else None,
+        'peak_rss_mb': peak_rss_mb(),
+        **extra
+    })
+    return row
+
+def build_cases(strategies, kinds=CASE_KINDS, engines=ENGINES, samples=200):
+    cases = []
+    for strategy in strategies:
+        for kind in kinds:
+            if kind == 'scan':
+                cases.extend({'kind': kind, 'strategy': strategy, 'engine': engine} for engine in engines)
+            elif kind == 'single':
+                cases.append({'kind': kind, 'strategy': strategy, 'samples': samples})
+            else:
+                cases.append({'kind': kind, 'strategy': strategy})
+    return cases
+
+# ================= 3. 基准入口 =================
+
+def environment():
+    """运行环境信息（写入报告，便于比较不同机器/依赖版本的结果）"""
+    import numpy
+    import pandas
+    from utils import kernels
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'kernel_backend': kernels.BACKEND
+    }
+
+def run_benchmark(stocks=1000, days=250, seed=0, strategies=None, kinds=CASE_KINDS, engines=ENGINES,
+                  samples=200, data_root=None, keep=False, progress=None):
+    """
+    运行基准
+    参数:
+        stocks / days / seed: 合成市场规模与随机种子（data_root 指定时忽略）
+        strategies: 策略名称列表，默认全部
+        data_root: 已有的工作目录（包含 stock_data/），不指定时生成合成市场到临时目录
+        keep: 保留生成的临时目录
+        progress: 可选回调 progress(用例结果)，每个用例结束后调用
+    返回: 报告 dict {'config', 'environment', 'cases'}
+    """
+    from strategies.registry import strategy_names
+    strategies = list(strategies or strategy_names())
+
+    workdir = data_root
+    generate_s = None
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='celue_bench_')
+        t_start = time.perf_counter()
+        write_workspace(workdir, *generate_realistic_market(stocks, days, seed))
+        generate_s = round(time.perf_counter() - t_start, 3)
+    workdir = os.path.abspath(workdir)
+
+    cases = build_cases(strategies, kinds, engines, samples)
+    results = []
+    # spawn：每个用例一个全新的解释器，不继承父进程的缓存和内存占用
+    context = multiprocessing.get_context('spawn')
+    try:
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                row = executor.submit(run_case, workdir, case).result()
+            results.append(row)
+            if progress:
+                progress(row)
+    finally:
+        if data_root is None and not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'config': {
+            'stocks': stocks if data_root is None else None,
+            'days': days if data_root is None else None,
+            'seed': seed if data_root is None else None,
+            'data_root': workdir if (data_root is not None or keep) else None,
+            'strategies': strategies,
+            'generate_s': generate_s,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'environment': environment(),
+        'cases': results
+    }
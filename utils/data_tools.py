@@ -4,13 +4,10 @@ import datetime
 import logging
 import time
 import random
-import webbrowser
-import platform
 import urllib.parse
-import pandas as pd
 import akshare as ak
 from tqdm import tqdm
-from PIL import Image, ImageDraw, ImageFont
+from utils import manifest, storage, report, snapshot_image
 
 # ================= 配置与初始化 =================
 
@@ -30,10 +27,11 @@ logging.basicConfig(
 
 # ================= 1. 概念数据同步模块 =================
 
-def sync_concepts():
+def sync_concepts(cancel_event=None):
     """
     管理员专用：同步东方财富概念板块数据到本地缓存
     只需要在概念数据需要更新时运行
+    cancel_event: 可选的 threading.Event，置位后放弃本次同步（不覆盖已有缓存）
     """
     print("🔄 开始同步概念板块数据...")
     
@@ -46,6 +44,9 @@ def sync_concepts():
         concept_list = df_concepts['板块名称'].tolist()[:100]  # 只取前100个热门概念
         
         for name in tqdm(concept_list, desc="同步题材中"):
+            if cancel_event is not None and cancel_event.is_set():
+                print("⏹️ 概念同步已取消，保留原有缓存")
+                return
             retry = 0
             max_retries = 3
             
@@ -85,8 +86,8 @@ def sync_concepts():
             'data': concept_map
         }
         
-        with open(CONCEPT_CACHE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        storage.write_json(CONCEPT_CACHE, cache_data, indent=2)
+        manifest.record_concepts(cache_data['last_update'], len(concept_map), len(concept_list))
         
         print(f"✅ 概念数据同步完成！共 {len(concept_map)} 只股票关联了概念")
         print(f"💾 数据已保存到: {CONCEPT_CACHE}")
@@ -126,178 +127,48 @@ def load_stock_name_map():
 
 # ================= 3. 股票代码图片生成模块 =================
 
-def generate_strategy_snapshot_image(stock_codes, strategy_name='ma5'):
+def generate_strategy_snapshot_image(stock_codes, strategy_name='ma5', fmt='png'):
     """
-    生成策略股票代码汇总快照图片（单张图片包含所有股票代码）
+    生成策略股票代码汇总快照图片（实现见 utils/snapshot_image.py）
     参数:
-        stock_codes: 股票代码列表
+        stock_codes: 股票代码列表（名称从股票名称缓存补齐）
         strategy_name: 策略名称
+        fmt: png / webp
     返回:
-        生成的图片路径
+        生成的图片路径（命中较多分页时为第一页），无代码时返回 None
     """
     if not stock_codes:
         return None
-    
-    # 设置图片尺寸和布局
-    width = 1200
-    padding = 60
-    code_height = 50
-    header_height = 100
-    footer_height = 60
-    
-    # 计算每行显示的代码数量
-    codes_per_row = 6
-    rows = (len(stock_codes) + codes_per_row - 1) // codes_per_row
-    
-    # 计算总高度
-    content_height = rows * code_height
-    height = header_height + content_height + footer_height + padding * 2
-    
-    # 创建图片
-    img = Image.new('RGB', (width, height), '#fafafa')
-    draw = ImageDraw.Draw(img)
-    
-    # 尝试加载字体
-    try:
-        font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 36)
-        font_code = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 20)
-        font_info = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 16)
-    except:
-        font_title = ImageFont.load_default()
-        font_code = ImageFont.load_default()
-        font_info = ImageFont.load_default()
-    
-    # 绘制标题背景
-    draw.rectangle([0, 0, width, header_height], fill='#1e40af')
-    
-    # 绘制标题
-    title = f"策略: {strategy_name}"
-    bbox = draw.textbbox((0, 0), title, font=font_title)
-    title_width = bbox[2] - bbox[0]
-    title_x = (width - title_width) // 2
-    draw.text((title_x, 30), title, font=font_title, fill='white')
-    
-    # 绘制股票代码
-    start_y = header_height + padding
-    code_width = (width - padding * 2) // codes_per_row
-    
-    for i, code in enumerate(stock_codes):
-        row = i // codes_per_row
-        col = i % codes_per_row
-        
-        x = padding + col * code_width + 10
-        y = start_y + row * code_height + 10
-        
-        # 绘制代码背景框
-        box_coords = [x, y, x + code_width - 20, y + code_height - 10]
-        draw.rectangle(box_coords, fill='white', outline='#d1d5db', width=1)
-        
-        # 绘制代码文字
-        text_x = x + (code_width - 20) // 2
-        text_y = y + (code_height - 10) // 2 - 8
-        bbox = draw.textbbox((0, 0), code, font=font_code)
-        text_width = bbox[2] - bbox[0]
-        draw.text((text_x - text_width // 2, text_y), code, font=font_code, fill='#1f2937')
-    
-    # 绘制底部信息
-    footer_y = height - footer_height + 20
-    info_text = f"共 {len(stock_codes)} 只股票 | 生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    bbox = draw.textbbox((0, 0), info_text, font=font_info)
-    info_width = bbox[2] - bbox[0]
-    draw.text(((width - info_width) // 2, footer_y), info_text, font=font_info, fill='#6b7280')
-    
-    # 保存图片
-    image_path = f"./strategy_snapshot_{strategy_name}.png"
-    img.save(image_path, 'PNG')
-    
-    return image_path
+    name_map = load_stock_name_map()
+    stocks = [{'code': code, 'name': name_map.get(code.split('.')[-1], '')} for code in stock_codes]
+    return snapshot_image.render_snapshot(stocks, strategy_name, fmt)[0]
 
 # ================= 4. 交互式报告生成模块 =================
 
-def generate_report(results, total_scanned, strategy_name='ma5'):
+# 结果整理已移至 utils/report.py，这里保留导入以兼容原有调用
+format_results = report.format_results
+
+def generate_report(results, total_scanned, strategy_name='ma5', open_browser=True, data_date=None, formats=('html',)):
     """
-    生成使用React的HTML报告
+    生成使用React的HTML报告（实现见 utils/report.py）
     参数:
         results: 扫描结果列表
         total_scanned: 扫描总数
         strategy_name: 策略名称，用于文件名区分
+        open_browser: 是否自动打开报告（没有图形界面时忽略）
+        data_date: 数据日期（文件名后缀），为空时取结果中最新的数据日期
+        formats: 输出格式，html / bundle / csv / jsonl / parquet 的任意组合
+    返回:
+        HTML 报告路径（未输出 HTML 时为第一个输出文件），无结果时返回 None
     """
     if not results:
         print("💡 无结果，跳过报告。")
-        return
-
-    # 格式化数据为JSON
-    formatted_results = []
-    for r in sorted(results, key=lambda x: (x.get('阶段', ''), x.get('代码', ''))):
-        formatted_results.append({
-            'code': r.get('代码', ''),
-            'name': r.get('名称', ''),
-            'fullCode': r.get('完整代码', ''),
-            'price': r.get('现价', 0),
-            'change': r.get('涨跌幅', '0%'),
-            'stage': r.get('阶段', ''),
-            'concepts': r.get('概念', '未分类')
-        })
-
-    # 策略名称映射
-    strategy_names = {
-        'ma5': 'MA5均线支撑策略',
-        'volume_breakout': '放量突破策略'
-    }
-    strategy_display_name = strategy_names.get(strategy_name, strategy_name)
-
-    # 生成JSON数据
-    data_json = json.dumps({
-        'results': formatted_results,
-        'strategyName': strategy_name,
-        'strategyDisplayName': strategy_display_name,
-        'totalScanned': total_scanned,
-        'totalHit': len(formatted_results)
-    }, ensure_ascii=False)
-
-    # 获取最新日期（从stock_data中读取）
-    latest_date_suffix = ""
-    try:
-        stock_data_dir = os.path.join(os.path.dirname(__file__), '..', 'stock_data')
-        if os.path.exists(stock_data_dir):
-            # 获取第一个CSV文件
-            csv_files = [f for f in os.listdir(stock_data_dir) if f.endswith('.csv')]
-            if csv_files:
-                sample_file = os.path.join(stock_data_dir, csv_files[0])
-                df = pd.read_csv(sample_file)
-                if not df.empty and 'date' in df.columns:
-                    latest_date = df['date'].iloc[-1]  # 获取最新日期
-                    # 提取月日 (格式: 2026-02-03 -> 0203)
-                    if '-' in str(latest_date):
-                        date_parts = str(latest_date).split('-')
-                        if len(date_parts) >= 3:
-                            latest_date_suffix = f"_{date_parts[1]}{date_parts[2]}"
-    except Exception:
-        pass  # 如果获取日期失败，不添加后缀
-    
-    # 生成文件名（带日期后缀）
-    html_file = f"scanner_report_{strategy_name}{latest_date_suffix}.html"
-
-    # 读取模板文件
-    template_path = os.path.join(os.path.dirname(__file__), '..', 'report_template.html')
-    if not os.path.exists(template_path):
-        # 如果模板不存在，使用当前目录
-        template_path = 'report_template.html'
-    
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template = f.read()
-    
-    # 替换数据占位符
-    html_content = template.replace('{{DATA_PLACEHOLDER}}', data_json)
-
-    with open(html_file, "w", encoding="utf-8") as f:
-        f.write(html_content)
+        return None
 
-    # 跨平台自动打开报告
-    abs_path = os.path.abspath(html_file)
-    if platform.system() == "Darwin":
-        os.system(f'open "{abs_path}"')
-    else:
-        webbrowser.open(f"file://{abs_path}")
-    
-    print(f"✅ 报告已生成: {html_file}")
+    files = report.write_report(results, total_scanned, strategy_name, data_date, formats)
+    for path in files.values():
+        print(f"✅ 报告已生成: {path}")
+    main_file = report.report_page(files) or next(iter(files.values()), None)
+    if open_browser and report.report_page(files):
+        report.open_in_browser(report.report_page(files))
+    return main_file
@@ -0,0 +1,154 @@
+"""
+特征工程模块
+为单只股票一次性计算所有策略共用的特征（均线、量均线、K线颜色、涨跌幅、吸筹窗口红绿量、
+低点下移标记等），按数据版本缓存。
+策略只读地使用特征表，不再各自 copy、类型转换和重复计算。
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils import bar_store, kernels, profiling
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 吸筹窗口：(起, 止) 表示 df.iloc[-起:-止]，如 (60, 20) 即 60~20 日前
+ACCUMULATION_WINDOWS = [(60, 20), (60, 30)]
+
+MAX_CACHED_FRAMES = 6000
+
+_feature_cache = OrderedDict()    # (full_code, lookback) -> (signature, 快照截断日期或 None, DataFrame)
+_cache_lock = threading.Lock()
+_cache_stats = {'hit': 0, 'miss': 0}
+
+# ================= 1. 特征计算 =================
+
+def window_sum(series, start, end):
+    """
+    每一行上，series 在 [-start, -end) 区间（相对该行之后一行）的和，
+    即最后一行的值等于 series.iloc[-start:-end].sum()（NaN 按 0 计）
+    """
+    return series.fillna(0).rolling(start - end).sum().shift(end)
+
+def build_features(df):
+    """
+    计算特征表（新 DataFrame，原 df 不变）
+    价格列统一为 float64；所有策略共用的派生列：
+        MA5 / MA20 / MA30 / MA60 / MA20_vol / pct_chg
+        is_red (收盘>开盘) / is_green (收盘<=开盘) / is_bearish (收盘<开盘，阴线)
+        red_volume / green_volume：当日按颜色归属的成交量
+        lower_low：最低价低于前一日最低价
+        shrink_drop：低点下移且缩量
+        lower_low_after_up：低点下移且前一日收阳
+        acc_red_vol_{起}_{止} / acc_green_vol_{起}_{止} / acc_red_cnt_{起}_{止} / acc_green_cnt_{起}_{止}
+    """
+    base = df.copy()
+    for col in PRICE_COLUMNS:
+        if base[col].dtype != 'float64':
+            base[col] = pd.to_numeric(base[col], errors='coerce').astype('float64')
+
+    close = base['close']
+    open_ = base['open']
+    low = base['low']
+    volume = base['volume']
+
+    # 先把所有列算进字典，最后一次性拼接（逐列赋值的开销比计算本身还大）
+    cols = {}
+
+    # 均线与涨跌幅
+    # 逐窗口计算（kernels.window_mean），只加载尾部K线时与完整历史的结果相同
+    for window in (5, 20, 30, 60):
+        cols[f'MA{window}'] = pd.Series(kernels.window_mean(close.to_numpy(), window), index=base.index)
+    cols['MA20_vol'] = pd.Series(kernels.window_mean(volume.to_numpy(), 20), index=base.index)
+    cols['pct_chg'] = close.pct_change() * 100
+
+    # K线颜色
+    is_red = close > open_
+    is_green = close <= open_
+    is_bearish = close < open_
+    cols['is_red'] = is_red
+    cols['is_green'] = is_green
+    cols['is_bearish'] = is_bearish
+    cols['red_volume'] = volume.where(is_red, 0.0)
+    cols['green_volume'] = volume.where(is_green, 0.0)
+
+    # 低点下移类标记
+    lower_low = low < low.shift(1)
+    cols['lower_low'] = lower_low
+    cols['shrink_drop'] = lower_low & (volume < volume.shift(1))
+    cols['lower_low_after_up'] = lower_low & (close.shift(1) > open_.shift(1))
+
+    # 吸筹窗口红绿量与天数
+    for start, end in ACCUMULATION_WINDOWS:
+        suffix = f"{start}_{end}"
+        cols[f'acc_red_vol_{suffix}'] = window_sum(cols['red_volume'], start, end)
+        cols[f'acc_green_vol_{suffix}'] = window_sum(cols['green_volume'], start, end)
+        cols[f'acc_red_cnt_{suffix}'] = window_sum(is_red.astype('float64'), start, end)
+        cols[f'acc_green_cnt_{suffix}'] = window_sum(is_green.astype('float64'), start, end)
+
+    features = pd.concat([base, pd.DataFrame(cols, index=base.index)], axis=1)
+    features.attrs['features'] = True
+    return features
+
+def ensure_features(df):
+    """已经是特征表时原样返回，否则计算一次"""
+    if df.attrs.get('features'):
+        return df
+    return build_features(df)
+
+# ================= 2. 按数据版本缓存 =================
+
+def _covers(cached, as_of):
+    """缓存的特征表能否用于快照 as_of：未截断且没有 as_of 之后的K线，或按同一快照截断"""
+    _, cut, features = cached
+    if cut is not None:
+        return cut == as_of
+    return as_of is None or features.empty or features['date'].iat[-1] <= as_of
+
+def load_features(full_code, lookback=None, as_of=None):
+    """
+    加载单只股票的特征表，数据文件未变化时直接返回缓存
+    lookback: 只基于最近 N 根K线计算（扫描使用），为空时基于全部历史
+    as_of: 快照日期，只基于该日及之前的K线计算
+    返回: DataFrame（只读），不存在时返回 None
+    """
+    signature = bar_store.data_version(full_code)
+    if signature is None:
+        return None
+
+    key = (full_code, lookback)
+    with _cache_lock:
+        cached = _feature_cache.get(key)
+        if cached and cached[0] == signature and _covers(cached, as_of):
+            _feature_cache.move_to_end(key)
+            _cache_stats['hit'] += 1
+            return cached[2]
+        _cache_stats['miss'] += 1
+
+    df = bar_store.load_tail(full_code, lookback) if lookback else bar_store.load_bars(full_code)
+    if df is None:
+        return None
+    cut = None
+    if as_of is not None and len(df) and df['date'].iat[-1] > as_of:
+        # 快照之后已经追加了新K线（只在增量更新期间出现）；截断的特征表只给同一快照使用
+        df = bar_store.load_tail(full_code, lookback, as_of) if lookback else bar_store.cut_as_of(df, as_of)
+        cut = as_of
+    with profiling.stage('build_features'):
+        features = build_features(df)
+
+    with _cache_lock:
+        _feature_cache[key] = (signature, cut, features)
+        _feature_cache.move_to_end(key)
+        while len(_feature_cache) > MAX_CACHED_FRAMES:
+            _feature_cache.popitem(last=False)
+    return features
+
+def clear_cache():
+    with _cache_lock:
+        _feature_cache.clear()
+
+def cache_stats():
+    """特征表缓存命中次数与当前缓存数"""
+    with _cache_lock:
+        return {**_cache_stats, 'cached': len(_feature_cache)}
@@ -0,0 +1,224 @@
+"""
+后台任务管理模块
+耗时任务（扫描、初始化、增量更新、概念同步）统一提交到独立的有界任务线程池，
+由任务登记表记录状态、输出和结果，支持查询与协作式取消；
+单股分析等轻量调用使用另一个线程池（run_blocking），不会被长任务占满。
+"""
+import io
+import sys
+import time
+import uuid
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 轻量调用（run_blocking）线程池大小
+MAX_WORKERS = 8
+# 长任务线程池大小：同名同参数的任务会复用，超出的任务排队等待
+MAX_JOB_WORKERS = 4
+# 保留的已结束任务数量
+MAX_FINISHED_JOBS = 100
+
+# ================= 1. 按线程捕获输出 =================
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """
+    按线程分流的 stdout：登记了缓冲区的线程写入各自缓冲区，其余线程的输出写到 stderr。
+    redirect_stdout 会替换全局 sys.stdout，多个任务并发时会互相串台；
+    MCP stdio 模式下 stdout 是 JSON-RPC 通道，轻量调用里的 print 不能写进去。
+    其他属性（buffer、encoding 等）仍转给原 stdout。
+    """
+
+    def __init__(self, original, fallback):
+        self._original = original
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def set_buffer(self, buffer):
+        self._local.buffer = buffer
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self._fallback.write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            self._fallback.flush()
+
+    @property
+    def encoding(self):
+        return self._original.encoding
+
+    def __getattr__(self, name):
+        return getattr(self._original, name)
+
+_stdout_router = None
+_router_lock = threading.Lock()
+
+def _get_stdout_router():
+    global _stdout_router
+    with _router_lock:
+        if _stdout_router is None or sys.stdout is not _stdout_router:
+            _stdout_router = _ThreadLocalStdout(sys.stdout, sys.stderr)
+            sys.stdout = _stdout_router
+    return _stdout_router
+
+# ================= 2. 任务与登记表 =================
+
+class Job:
+    """单个后台任务"""
+
+    def __init__(self, name, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.params = params
+        self.status = 'pending'     # pending / running / succeeded / failed / cancelled
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.output = io.StringIO()
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def to_dict(self, include_output=False):
+        def fmt(ts):
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts else None
+
+        end = self.finished_at or time.time()
+        info = {
+            'job_id': self.id,
+            'name': self.name,
+            'params': self.params,
+            'status': self.status,
+            'created_at': fmt(self.created_at),
+            'started_at': fmt(self.started_at),
+            'finished_at': fmt(self.finished_at),
+            'elapsed_seconds': round(end - self.started_at, 2) if self.started_at else None,
+            'error': self.error
+        }
+        if include_output:
+            info['output'] = self.output.getvalue()
+            info['result'] = self.result
+        return info
+
+class JobRegistry:
+    """
+    任务登记表
+    同名同参数的任务正在执行时直接复用，避免重复触发全市场扫描或数据下载。
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, params=None, cancellable=True):
+        """
+        提交后台任务
+        参数:
+            name: 任务类型，如 run_scanner
+            func: 同步函数；cancellable 为 True 时会以 cancel_event 关键字参数调用
+            params: 任务参数（用于展示与去重）
+        返回: Job
+        """
+        params = params or {}
+        with self._lock:
+            for job in self._jobs.values():
+                if job.name == name and job.params == params and not job.done:
+                    return job
+
+            job = Job(name, params)
+            self._jobs[job.id] = job
+            self._trim()
+
+        def run():
+            if job.cancel_event.is_set():
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                return None
+
+            router = _get_stdout_router()
+            router.set_buffer(job.output)
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                if cancellable:
+                    job.result = func(cancel_event=job.cancel_event)
+                else:
+                    job.result = func()
+                job.status = 'cancelled' if job.cancel_event.is_set() else 'succeeded'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                router.set_buffer(None)
+                job.finished_at = time.time()
+            return job.result
+
+        job.future = self.executor.submit(run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, active_only=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if active_only:
+            jobs = [j for j in jobs if not j.done]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的直接撤销，运行中的发出取消信号，由任务在下一个检查点退出
+        返回: Job，不存在时返回 None
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+        return job
+
+    async def wait(self, job, timeout):
+        """在事件循环中等待任务结束，不阻塞其他调用；超时返回 False，任务继续在后台运行"""
+        if job.done:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            pass
+        return job.done
+
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if j.done]
+        if len(finished) > MAX_FINISHED_JOBS:
+            finished.sort(key=lambda j: j.finished_at or 0)
+            for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+                del self._jobs[job.id]
+
+# ================= 3. 共享实例 =================
+
+WORKER_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="mcp-worker")
+JOB_POOL = ThreadPoolExecutor(max_workers=MAX_JOB_WORKERS, thread_name_prefix="mcp-job")
+JOBS = JobRegistry(JOB_POOL)
+
+async def run_blocking(func, *args):
+    """在轻量调用线程池中执行同步函数，释放事件循环（输出见 _ThreadLocalStdout，写到 stderr）"""
+    _get_stdout_router()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(WORKER_POOL, func, *args)
@@ -0,0 +1,255 @@
+"""
+顺序形态扫描内核
+连续阴线计数、三连阳后缩量大跌搜索、低点下移且前一日收阳的搜索天然是逐根K线的顺序逻辑，
+这里在连续的 float64 数组上对多只股票一次执行：
+    输入为 (股票数, K线数) 右对齐数组（同 utils.panel），lengths 为每只股票的有效K线数，
+    判定都针对每行的最后一根K线，下标沿用 df.iloc 的负数写法。
+安装了 numba 时逐股票循环被 JIT 编译；未安装时使用等价的 NumPy 实现（按窗口位置循环、跨股票向量化）。
+两种实现与原先逐行 df.iloc 的写法算术顺序相同，结果逐位一致。
+window_mean 为特征表、指标接口与规则 DSL 共用的均线计算，结果与数据从哪根K线开始无关。
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+BACKEND = 'numba' if HAS_NUMBA else 'numpy'
+
+def _as_panel(values):
+    """一维（单只股票）或二维输入统一为 C 连续的二维 float64 数组"""
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        values = values[None, :]
+    return np.ascontiguousarray(values)
+
+def _as_lengths(lengths, panel):
+    if lengths is None:
+        return np.full(panel.shape[0], panel.shape[1], dtype=np.int64)
+    return np.ascontiguousarray(np.atleast_1d(lengths), dtype=np.int64)
+
+# ================= 1. 逐股票循环（numba 编译） =================
+
+def _max_bearish_streak_loops(open_, close, lengths, days):
+    rows, width = close.shape
+    out = np.zeros(rows, dtype=np.int64)
+    for s in range(rows):
+        count = 0
+        best = 0
+        for j in range(width - min(days, lengths[s]), width):
+            if close[s, j] < open_[s, j]:
+                count += 1
+                if count > best:
+                    best = count
+            else:
+                count = 0
+        out[s] = best
+    return out
+
+def _lower_low_after_up_loops(open_, close, low, lengths, start, end):
+    rows, width = close.shape
+    out = np.zeros(rows, dtype=np.bool_)
+    for s in range(rows):
+        for i in range(start, end):
+            if i < -lengths[s] + 1:
+                continue
+            j = width + i
+            prev_change = (close[s, j - 1] - open_[s, j - 1]) / open_[s, j - 1] * 100
+            if low[s, j] < low[s, j - 1] and prev_change > 0:
+                out[s] = True
+                break
+    return out
+
+def _three_rising_crash_loops(open_, close, low, volume, lengths,
+                              rising_gain, shrink_ratio, drop_min, drop_max, recover_ratio):
+    rows, width = close.shape
+    has_rising = np.zeros(rows, dtype=np.bool_)
+    has_crash = np.zeros(rows, dtype=np.bool_)
+    recovered = np.zeros(rows, dtype=np.bool_)
+    key_signal = np.zeros(rows, dtype=np.bool_)
+    for s in range(rows):
+        length = lengths[s]
+        last_low = np.nan
+        for i in range(-20, -3):
+            if i < -length + 3:
+                continue
+            d1 = width + i
+            d2 = d1 + 1
+            d3 = d1 + 2
+            rising_count = 0
+            if close[s, d1] > open_[s, d1]:
+                rising_count += 1
+            if close[s, d2] > open_[s, d2]:
+                rising_count += 1
+            if close[s, d3] > open_[s, d3]:
+                rising_count += 1
+            total_gain = (close[s, d3] - open_[s, d1]) / open_[s, d1] * 100
+            if rising_count >= 2 and total_gain > rising_gain:
+                has_rising[s] = True
+                last_low = low[s, d3]
+
+                c = d1 + 3
+                is_falling = close[s, c] < open_[s, c]
+                break_low = low[s, c] < low[s, d3]
+                avg_vol_3d = (volume[s, d1] + volume[s, d2] + volume[s, d3]) / 3
+                is_shrinking = volume[s, c] < avg_vol_3d * shrink_ratio
+                drop_pct = (close[s, c] - open_[s, c]) / open_[s, c] * 100
+                is_big_drop = drop_min < drop_pct and drop_pct < drop_max
+
+                if is_falling and break_low and is_shrinking and is_big_drop:
+                    has_crash[s] = True
+                    if i + 6 < 0:
+                        for j in range(i + 4, min(i + 7, 0)):
+                            if close[s, width + j] > close[s, c] * recover_ratio:
+                                recovered[s] = True
+                                break
+                    break
+
+        if has_rising[s]:
+            for i in range(-5, 0):
+                if i < -length:
+                    continue
+                j = width + i
+                if low[s, j] < last_low and close[s, j] < open_[s, j]:
+                    key_signal[s] = True
+                    break
+    return has_rising, has_crash, recovered, key_signal
+
+# ================= 2. NumPy 实现（无 numba 时） =================
+
+def _max_bearish_streak_numpy(open_, close, lengths, days):
+    rows, width = close.shape
+    count = np.zeros(rows, dtype=np.int64)
+    best = np.zeros(rows, dtype=np.int64)
+    for j in range(width - min(days, width), width):
+        inside = j >= width - np.minimum(days, lengths)
+        count = np.where(inside & (close[:, j] < open_[:, j]), count + 1, 0)
+        best = np.maximum(best, count)
+    return best
+
+def _lower_low_after_up_numpy(open_, close, low, lengths, start, end):
+    out = np.zeros(close.shape[0], dtype=bool)
+    width = close.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(start, end):
+            j = width + i
+            if j - 1 < 0:
+                continue
+            prev_change = (close[:, j - 1] - open_[:, j - 1]) / open_[:, j - 1] * 100
+            out |= (i >= -lengths + 1) & (low[:, j] < low[:, j - 1]) & (prev_change > 0)
+    return out
+
+def _three_rising_crash_numpy(open_, close, low, volume, lengths,
+                              rising_gain, shrink_ratio, drop_min, drop_max, recover_ratio):
+    rows, width = close.shape
+    has_rising = np.zeros(rows, dtype=bool)
+    has_crash = np.zeros(rows, dtype=bool)
+    recovered = np.zeros(rows, dtype=bool)
+    last_low = np.full(rows, np.nan)
+    searching = np.ones(rows, dtype=bool)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(-20, -3):
+            d1 = width + i
+            if d1 < 0:
+                continue
+            d2, d3, c = d1 + 1, d1 + 2, d1 + 3
+            rising_count = ((close[:, d1] > open_[:, d1]).astype(np.int64)
+                            + (close[:, d2] > open_[:, d2]) + (close[:, d3] > open_[:, d3]))
+            total_gain = (close[:, d3] - open_[:, d1]) / open_[:, d1] * 100
+            # 只处理还没找到"三连阳 + 大跌"的股票：三连阳低点取最后一次匹配，
+            # 找到后面紧跟大跌的匹配后停止（对应原循环里大跌分支中的 break）
+            hit = searching & (i >= -lengths + 3) & (rising_count >= 2) & (total_gain > rising_gain)
+            if not hit.any():
+                continue
+            has_rising |= hit
+            last_low = np.where(hit, low[:, d3], last_low)
+
+            avg_vol_3d = (volume[:, d1] + volume[:, d2] + volume[:, d3]) / 3
+            drop_pct = (close[:, c] - open_[:, c]) / open_[:, c] * 100
+            crash = (hit & (close[:, c] < open_[:, c]) & (low[:, c] < low[:, d3])
+                     & (volume[:, c] < avg_vol_3d * shrink_ratio) & (drop_min < drop_pct) & (drop_pct < drop_max))
+            has_crash |= crash
+            searching &= ~crash
+            if i + 6 < 0:
+                for j in range(i + 4, min(i + 7, 0)):
+                    recovered |= crash & (close[:, width + j] > close[:, c] * recover_ratio)
+
+        key_signal = np.zeros(rows, dtype=bool)
+        for i in range(-5, 0):
+            j = width + i
+            if j < 0:
+                continue
+            key_signal |= (has_rising & (i >= -lengths)
+                           & (low[:, j] < last_low) & (close[:, j] < open_[:, j]))
+    return has_rising, has_crash, recovered, key_signal
+
+if HAS_NUMBA:
+    _max_bearish_streak_impl = njit(cache=True)(_max_bearish_streak_loops)
+    _lower_low_after_up_impl = njit(cache=True)(_lower_low_after_up_loops)
+    _three_rising_crash_impl = njit(cache=True)(_three_rising_crash_loops)
+else:
+    _max_bearish_streak_impl = _max_bearish_streak_numpy
+    _lower_low_after_up_impl = _lower_low_after_up_numpy
+    _three_rising_crash_impl = _three_rising_crash_numpy
+
+# ================= 3. 对外接口 =================
+
+def max_bearish_streak(open_, close, days, lengths=None):
+    """
+    最近 days 根K线内最长的连续阴线（收盘 < 开盘）天数
+    返回: (股票数,) int64 数组
+    """
+    close = _as_panel(close)
+    return _max_bearish_streak_impl(_as_panel(open_), close, _as_lengths(lengths, close), int(days))
+
+def lower_low_after_up(open_, close, low, start=-30, end=-1, lengths=None):
+    """
+    iloc[start:end] 内是否有某日最低价低于前一日最低价、且前一日收涨
+    返回: (股票数,) 布尔数组
+    """
+    close = _as_panel(close)
+    return _lower_low_after_up_impl(_as_panel(open_), close, _as_panel(low),
+                                    _as_lengths(lengths, close), int(start), int(end))
+
+def three_rising_crash(open_, close, low, volume, rising_gain=3.0, shrink_ratio=0.8,
+                       drop_min=-7.0, drop_max=-3.0, recover_ratio=1.02, lengths=None):
+    """
+    三连阳后缩量大跌搜索（breakout_pullback 的第 3、4 步）
+    在 iloc[-20:-3] 内按顺序检查"三天中至少两天收阳且累计涨幅 > rising_gain%"的起点，
+    遇到其后一天缩量大跌的起点即停止（再检查大跌后三天内是否收复），否则一直扫描到窗口末尾；
+    最后检查近5日是否收阴并跌破三连阳最后一天的低点（取停止时的起点，没有大跌时为最后一个起点）
+    返回: (has_three_rising, has_crash, crash_recovered, is_key_signal)，均为 (股票数,) 布尔数组
+    """
+    close = _as_panel(close)
+    return _three_rising_crash_impl(
+        _as_panel(open_), close, _as_panel(low), _as_panel(volume), _as_lengths(lengths, close),
+        float(rising_gain), float(shrink_ratio), float(drop_min), float(drop_max), float(recover_ratio)
+    )
+
+def window_mean(values, window):
+    """
+    最近 window 个值的均值（含当前，沿最后一维），不足 window 个或窗口内有 NaN 时为 NaN
+    每个窗口从最早的值开始单独做补偿求和（Neumaier），结果只取决于窗口内的值：
+    pandas rolling 的滚动累加会带上窗口之前数据的舍入误差，截取尾部计算时可能差最后一位
+    （如 8.824 与 8.824000000000002），使 MA5 "上行" 之类的判定随数据起点变化
+    返回: 与 values 同形状的 float64 数组
+    """
+    values = np.asarray(values, dtype='float64')
+    out = np.full(values.shape, np.nan)
+    if window < 1 or values.shape[-1] < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+    total = windows[..., 0].copy()
+    compensation = np.zeros_like(total)
+    for k in range(1, window):
+        value = windows[..., k]
+        new_total = total + value
+        compensation += np.where(np.abs(total) >= np.abs(value),
+                                 (total - new_total) + value,
+                                 (value - new_total) + total)
+        total = new_total
+    out[..., window - 1:] = (total + compensation) / window
+    return out
@@ -0,0 +1,192 @@
+"""
+数据清单模块
+initData / appendData / sync_concepts 写数据时同步维护 data_manifest.json：
+每只股票的最新K线日期与行数、股票总数、全市场最新日期、落后于最新日期的股票、概念缓存版本。
+健康检查与数据状态直接读取清单（按文件签名缓存，每次调用只 stat 一次），不再遍历数据目录。
+清单缺失或与数据目录不一致时可用 rebuild_manifest() 按数据文件重建。
+每个数据集（bars 日线 / names 股票名称 / concepts 概念）有单调递增的版本号，每次写入后加一。
+扫描开始时用 snapshot() 固定当时的最新K线日期，读取时截掉之后的K线：
+appendData 逐只写入期间开始的扫描仍然看到同一个交易日的完整数据，清单更新后的扫描才看到新K线。
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+from utils import bar_store, storage
+
+MANIFEST_FILE = "data_manifest.json"
+MANIFEST_VERSION = 1
+DATASETS = ('bars', 'names', 'concepts')
+
+_cache = {'key': None, 'data': None}
+_lock = threading.Lock()
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def empty_manifest():
+    return {
+        'version': MANIFEST_VERSION,
+        'updated_at': None,
+        'bars_updated_at': None,
+        'stock_count': 0,
+        'latest_bar_date': None,
+        'stale_codes': [],
+        'names': None,
+        'concepts': None,
+        'generations': {name: 0 for name in DATASETS},
+        'stocks': {}
+    }
+
+# ================= 1. 读写 =================
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+def load_manifest():
+    """
+    读取清单（文件未变化时返回缓存，调用方不要原地修改）
+    返回: dict，清单不存在或损坏时返回 None
+    """
+    key = _signature(MANIFEST_FILE)
+    if key is None:
+        return None
+    with _lock:
+        if _cache['key'] == key:
+            return _cache['data']
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != MANIFEST_VERSION:
+        return None
+    with _lock:
+        _cache['key'], _cache['data'] = key, data
+    return data
+
+def save_manifest(manifest, dataset=None):
+    """
+    重新计算汇总字段后原子写入清单
+    dataset: 本次写入的数据集，其版本号加一
+    """
+    stocks = manifest['stocks']
+    dates = [s['last_date'] for s in stocks.values() if s.get('last_date')]
+    latest = max(dates) if dates else None
+    manifest['stock_count'] = len(stocks)
+    manifest['latest_bar_date'] = latest
+    manifest['stale_codes'] = sorted(code for code, s in stocks.items() if not s.get('last_date') or s['last_date'] < latest)
+    manifest['updated_at'] = _now()
+    # 日线数据的写入时间单独记录：名称/概念缓存的写入不代表K线已更新
+    if dataset == 'bars':
+        manifest['bars_updated_at'] = manifest['updated_at']
+    if dataset:
+        generations = manifest['generations'] = {**manifest.get('generations', {})}
+        generations[dataset] = generations.get(dataset, 0) + 1
+
+    storage.write_json(MANIFEST_FILE, manifest)
+    with _lock:
+        _cache['key'], _cache['data'] = _signature(MANIFEST_FILE), manifest
+    return manifest
+
+def _editable():
+    """当前清单的可修改副本"""
+    current = load_manifest()
+    if current is None:
+        return empty_manifest()
+    return {**current, 'stocks': dict(current['stocks'])}
+
+# ================= 2. 维护 =================
+
+def record_stocks(updates, removed=None):
+    """
+    写数据后更新清单
+    参数:
+        updates: {完整代码: {'last_date': 最新K线日期, 'rows': 行数}}
+        removed: 已删除的完整代码列表
+    """
+    manifest = _editable()
+    for full_code, entry in updates.items():
+        manifest['stocks'][full_code] = {'last_date': entry.get('last_date'), 'rows': entry.get('rows')}
+    for full_code in removed or []:
+        manifest['stocks'].pop(full_code, None)
+    return save_manifest(manifest, 'bars')
+
+def record_concepts(last_update, stock_count, concept_count=None):
+    """概念缓存同步完成后记录其版本"""
+    manifest = _editable()
+    manifest['concepts'] = {'last_update': last_update, 'stock_count': stock_count, 'concept_count': concept_count}
+    return save_manifest(manifest, 'concepts')
+
+def record_names(count):
+    """股票名称缓存写入后记录其版本"""
+    manifest = _editable()
+    manifest['names'] = {'last_update': _now(), 'count': count}
+    return save_manifest(manifest, 'names')
+
+def last_date(full_code):
+    """清单中某只股票的最新K线日期，没有记录时返回 None"""
+    manifest = load_manifest()
+    if manifest is None:
+        return None
+    entry = manifest['stocks'].get(full_code)
+    return entry['last_date'] if entry else None
+
+def _count_rows(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    lines = data.count(b'\n') + (0 if data.endswith(b'\n') or not data else 1)
+    return max(lines - 1, 0)
+
+def rebuild_manifest(data_dir=None):
+    """按数据目录中的文件重建清单（保留已记录的名称/概念缓存版本与各数据集版本号）"""
+    data_dir = data_dir or bar_store.DATA_DIR
+    manifest = empty_manifest()
+    previous = load_manifest()
+    if previous:
+        for key in ('names', 'concepts', 'generations'):
+            if previous.get(key):
+                manifest[key] = previous[key]
+    if os.path.isdir(data_dir):
+        for name in sorted(os.listdir(data_dir)):
+            if not name.endswith('.csv'):
+                continue
+            path = os.path.join(data_dir, name)
+            manifest['stocks'][name[:-4]] = {'last_date': bar_store.read_last_date(path), 'rows': _count_rows(path)}
+    return save_manifest(manifest, 'bars')
+
+# ================= 3. 查询 =================
+
+def status():
+    """
+    数据状态摘要（O(1)：只读取缓存的清单汇总字段）
+    返回: dict，清单不存在时返回 None
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        return None
+    return {
+        'stock_count': manifest['stock_count'],
+        'latest_bar_date': manifest['latest_bar_date'],
+        'stale_count': len(manifest['stale_codes']),
+        'stale_codes': manifest['stale_codes'],
+        'concepts': manifest.get('concepts'),
+        'generations': manifest.get('generations', {}),
+        'updated_at': manifest['updated_at'],
+        'bars_updated_at': manifest.get('bars_updated_at')
+    }
+
+def snapshot():
+    """
+    扫描开始时固定的数据快照
+    返回: {'generation': 日线数据集版本号, 'as_of': 最新K线日期}；没有清单时 as_of 为 None（不截断）
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        return {'generation': None, 'as_of': None}
+    return {'generation': manifest.get('generations', {}).get('bars'), 'as_of': manifest['latest_bar_date']}
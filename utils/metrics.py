@@ -0,0 +1,337 @@
+"""
+运行指标模块
+为 API 服务与 MCP 服务收集运行指标，并以 Prometheus 文本格式导出（/metrics）：
+    - 请求耗时直方图（按路由模板 / MCP 工具）
+    - 扫描耗时直方图（按策略、引擎）
+    - 行情/特征缓存命中次数、活动任务数、进程内存
+    - 数据新鲜度：股票数、最新K线日期、落后于最新日期的文件数
+埋点只做一次加锁累加；缓存命中、任务数、内存等在抓取时才读取。
+数据新鲜度优先读取 initData / appendData 维护的数据清单（utils/manifest.py，O(1)）；
+没有清单时按 DATA_STATUS_TTL 缓存目录统计，只重新读取 mtime/size 变化过的文件的最后一行。
+get_data_status 与 /api/health 共用这里的结果，不再每次遍历数据目录。
+"""
+import os
+import sys
+import time
+import resource
+import threading
+from datetime import datetime
+
+from utils import bar_store, features, manifest
+
+# 请求耗时分桶（秒）
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 扫描耗时分桶（秒）
+SCAN_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# 数据状态的缓存时长（秒）
+DATA_STATUS_TTL = 30.0
+
+_START_TIME = time.time()
+
+# ================= 1. 指标类型 =================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """按标签分组的累计直方图"""
+
+    def __init__(self, name, help_text, labelnames, buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}           # 标签值 -> [各桶计数, 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """{标签值: {'count', 'sum'}}"""
+        with self._lock:
+            return {labels: {'count': s[2], 'sum': s[1]} for labels, s in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(s[0]), s[1], s[2]) for labels, s in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {count}")
+        return lines
+
+def _gauge(name, help_text, samples, kind='gauge'):
+    """samples: [(标签名元组, 标签值元组, 数值)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for names, values, value in samples:
+        lines.append(f"{name}{_labels_text(names, values)} {value}")
+    return lines
+
+REQUEST_LATENCY = Histogram('celue_http_request_duration_seconds', 'API 请求耗时',
+                            ('route', 'method', 'status'))
+TOOL_LATENCY = Histogram('celue_mcp_tool_duration_seconds', 'MCP 工具调用耗时', ('tool', 'status'))
+SCAN_DURATION = Histogram('celue_scan_duration_seconds', '全市场扫描耗时', ('strategy', 'engine'), SCAN_BUCKETS)
+
+# ================= 2. 埋点 =================
+
+def observe_request(route, method, status, seconds):
+    REQUEST_LATENCY.observe(seconds, route, method, str(status))
+
+def observe_tool(tool, status, seconds):
+    TOOL_LATENCY.observe(seconds, tool, status)
+
+def observe_scan(strategy, engine, seconds):
+    SCAN_DURATION.observe(seconds, strategy, engine)
+
+def instrument_flask(app):
+    """为 Flask 应用的所有路由记录请求耗时（标签使用路由模板，避免按股票代码膨胀）"""
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_record(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+        return response
+    return app
+
+# ================= 3. 数据新鲜度 =================
+
+class _DataStatus:
+    """数据目录状态，按 TTL 缓存；刷新时只重新读取变化过的文件"""
+
+    def __init__(self):
+        self._files = {}            # 文件名 -> ((mtime_ns, size), 最新K线日期)
+        self._data_dir = None
+        self._status = None
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, max_age=DATA_STATUS_TTL):
+        with self._lock:
+            # DATA_DIR 是相对路径，工作目录变化后按新目录重新统计
+            data_dir = os.path.abspath(bar_store.DATA_DIR)
+            if data_dir != self._data_dir:
+                self._data_dir, self._files, self._status = data_dir, {}, None
+            if self._status is None or time.time() - self._refreshed > max_age:
+                self._status = self._refresh(data_dir)
+                self._refreshed = time.time()
+            return dict(self._status)
+
+    def invalidate(self):
+        with self._lock:
+            self._status = None
+
+    def _refresh(self, data_dir):
+        files = {}
+        newest_mtime = None
+        if os.path.isdir(data_dir):
+            with os.scandir(data_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.csv'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    signature = (st.st_mtime_ns, st.st_size)
+                    cached = self._files.get(entry.name)
+                    if cached and cached[0] == signature:
+                        files[entry.name] = cached
+                    else:
+                        files[entry.name] = (signature, bar_store.read_last_date(entry.path))
+                    newest_mtime = max(newest_mtime or 0, st.st_mtime)
+        self._files = files
+
+        dates = [date for _, date in files.values() if date]
+        latest = max(dates) if dates else None
+        last_update = datetime.fromtimestamp(newest_mtime) if newest_mtime else None
+        return {
+            'data_dir': data_dir,
+            'stock_count': len(files),
+            'latest_bar_date': latest,
+            'stale_count': sum(1 for d in dates if d < latest) + (len(files) - len(dates)),
+            'last_update': last_update.strftime("%Y-%m-%d %H:%M") if last_update else None,
+            # 最新文件超过一天未更新时提示更新（与原 get_data_status 判定一致）
+            'needs_update': _needs_update(last_update),
+            'refreshed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'source': 'scan'
+        }
+
+_data_status = _DataStatus()
+
+def _needs_update(last_update):
+    """最近一次写数据超过一天时提示更新（与原 get_data_status 判定一致）"""
+    return last_update is None or (datetime.now() - last_update.replace(
+        hour=0, minute=0, second=0, microsecond=0)).days >= 1
+
+def _manifest_status():
+    """
+    由数据清单得到的数据状态，没有清单时返回 None
+    last_update / needs_update 取日线最后一次写入的时间（同步概念、名称不算），
+    清单还没有记录过日线写入时同样返回 None，改为统计数据目录
+    """
+    status = manifest.status()
+    if status is None or not status['bars_updated_at']:
+        return None
+    updated = datetime.strptime(status['bars_updated_at'], '%Y-%m-%d %H:%M:%S')
+    return {
+        'data_dir': os.path.abspath(bar_store.DATA_DIR),
+        'stock_count': status['stock_count'],
+        'latest_bar_date': status['latest_bar_date'],
+        'stale_count': status['stale_count'],
+        'stale_codes': status['stale_codes'],
+        'concepts': status['concepts'],
+        'generations': status['generations'],
+        'last_update': updated.strftime("%Y-%m-%d %H:%M"),
+        'needs_update': _needs_update(updated),
+        'refreshed_at': status['updated_at'],
+        'source': 'manifest'
+    }
+
+def data_status(max_age=DATA_STATUS_TTL):
+    """
+    数据状态：有数据清单时直接读取清单，否则为数据目录统计（最多 max_age 秒前的结果）
+    返回: dict，data_dir / stock_count / latest_bar_date / stale_count / last_update / needs_update / refreshed_at / source
+          （来自清单时另有 stale_codes / concepts / generations）
+    """
+    return _manifest_status() or _data_status.get(max_age)
+
+def invalidate_data_status():
+    """数据更新后调用，下次查询时重新统计"""
+    _data_status.invalidate()
+
+# ================= 4. 导出 =================
+
+def process_memory():
+    """进程内存（字节）：当前 RSS（仅 Linux）与峰值 RSS"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak *= 1 if sys.platform == 'darwin' else 1024
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    return {'rss': rss, 'peak_rss': peak}
+
+def _active_jobs():
+    from utils.jobs import JOBS
+    counts = {}
+    for job in JOBS.list(active_only=True):
+        counts[(job.name, job.status)] = counts.get((job.name, job.status), 0) + 1
+    return counts
+
+def render():
+    """全部指标的 Prometheus 文本格式"""
+    lines = []
+    for histogram in (REQUEST_LATENCY, TOOL_LATENCY, SCAN_DURATION):
+        lines.extend(histogram.render())
+
+    bars = bar_store.cache_stats()
+    feats = features.cache_stats()
+    cache_samples = [
+        (('cache', 'result'), ('bars', 'hit'), bars['bars_hit']),
+        (('cache', 'result'), ('bars', 'miss'), bars['bars_miss']),
+        (('cache', 'result'), ('tail', 'hit'), bars['tail_hit']),
+        (('cache', 'result'), ('tail', 'miss'), bars['tail_miss']),
+        (('cache', 'result'), ('features', 'hit'), feats['hit']),
+        (('cache', 'result'), ('features', 'miss'), feats['miss']),
+    ]
+    lines.extend(_gauge('celue_cache_requests_total', '缓存查询次数', cache_samples, kind='counter'))
+    lines.extend(_gauge('celue_cache_entries', '当前缓存的股票数', [
+        (('cache',), ('bars',), bars['bars_cached']),
+        (('cache',), ('tail',), bars['tail_cached']),
+        (('cache',), ('features',), feats['cached']),
+    ]))
+
+    jobs = _active_jobs()
+    lines.extend(_gauge('celue_active_jobs', '未结束的后台任务数',
+                        [(('name', 'status'), key, n) for key, n in sorted(jobs.items())]))
+
+    status = data_status()
+    latest = status['latest_bar_date']
+    latest_ts = time.mktime(time.strptime(latest, '%Y-%m-%d')) if latest else 0
+    lines.extend(_gauge('celue_data_stocks', '数据目录中的股票数', [((), (), status['stock_count'])]))
+    lines.extend(_gauge('celue_data_latest_bar_timestamp_seconds', '最新K线日期（Unix 时间）', [((), (), int(latest_ts))]))
+    lines.extend(_gauge('celue_data_stale_files', '最新K线落后于全市场最新日期的文件数', [((), (), status['stale_count'])]))
+
+    memory = process_memory()
+    memory_samples = [(('kind',), ('peak_rss',), memory['peak_rss'])]
+    if memory['rss'] is not None:
+        memory_samples.insert(0, (('kind',), ('rss',), memory['rss']))
+    lines.extend(_gauge('celue_process_memory_bytes', '进程内存', memory_samples))
+    lines.extend(_gauge('celue_process_uptime_seconds', '进程运行时长', [((), (), round(time.time() - _START_TIME, 1))]))
+    return "\n".join(lines) + "\n"
+
+def summary():
+    """指标的 JSON 摘要（MCP get_metrics 工具使用）"""
+    def histogram_summary(histogram):
+        return [
+            {**dict(zip(histogram.labelnames, labels)), 'count': s['count'],
+             'avg_seconds': round(s['sum'] / s['count'], 4) if s['count'] else None}
+            for labels, s in sorted(histogram.snapshot().items())
+        ]
+    return {
+        'requests': histogram_summary(REQUEST_LATENCY),
+        'tools': histogram_summary(TOOL_LATENCY),
+        'scans': histogram_summary(SCAN_DURATION),
+        'cache': {'bars': bar_store.cache_stats(), 'features': features.cache_stats()},
+        'active_jobs': [{'name': k[0], 'status': k[1], 'count': n} for k, n in sorted(_active_jobs().items())],
+        'data': data_status(),
+        'memory': process_memory()
+    }
+
+def serve(port, host='127.0.0.1'):
+    """
+    在后台线程启动只提供 /metrics 的 HTTP 服务（MCP 服务没有 HTTP 端口时使用）
+    返回: ThreadingHTTPServer
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+    return server
@@ -0,0 +1,98 @@
+"""
+全市场面板数据模块
+把多只股票的日线拼成 (股票数 × K线数) 的二维数组，供规则 DSL 做批量向量化计算。
+每只股票按自身的K线序号右对齐：最后一列是该股票的最新一根K线，前面不足的部分用 NaN 填充，
+与单只股票 df.iloc[-N] 的语义一致（停牌缺失的交易日不占位）。
+"""
+import os
+
+import numpy as np
+
+from utils import bar_store, profiling
+
+PANEL_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class MarketPanel:
+    """
+    属性:
+        codes: 完整代码列表（行）
+        dates: (S, T) 日期字符串数组，填充位置为空字符串
+        columns: {列名: (S, T) float64 数组}
+        bar_count: (S, T) 截至该位置的有效K线根数（填充位置为 0）
+    """
+
+    def __init__(self, codes, dates, columns, bar_count):
+        self.codes = list(codes)
+        self.dates = dates
+        self.columns = columns
+        self.bar_count = bar_count
+
+    @property
+    def shape(self):
+        return self.bar_count.shape
+
+    def column(self, name):
+        if name not in self.columns:
+            raise KeyError(f"面板中没有列: {name}")
+        return self.columns[name]
+
+    def last_dates(self):
+        """每只股票最新一根K线的日期"""
+        return self.dates[:, -1].tolist() if self.dates.size else []
+
+    @classmethod
+    def from_frames(cls, frames, lookback=None):
+        """
+        由 {完整代码: DataFrame} 构建面板
+        lookback: 每只股票只保留最近 N 根K线，为空时保留全部
+        """
+        codes = list(frames.keys())
+        lengths = [len(df) if lookback is None else min(len(df), lookback) for df in frames.values()]
+        width = max(lengths, default=0)
+
+        columns = {name: np.full((len(codes), width), np.nan) for name in PANEL_COLUMNS}
+        dates = np.full((len(codes), width), '', dtype=object)
+        bar_count = np.zeros((len(codes), width), dtype=np.int64)
+
+        for row, (df, length) in enumerate(zip(frames.values(), lengths)):
+            if length == 0:
+                continue
+            tail = df.iloc[-length:]
+            for name in PANEL_COLUMNS:
+                columns[name][row, width - length:] = tail[name].to_numpy(dtype='float64')
+            dates[row, width - length:] = tail['date'].astype(str).to_numpy()
+            # 截断后的面板里 bar_count 仍按完整历史计数，保证 "至少 N 根K线" 的判定不受截断影响
+            offset = len(df) - length
+            bar_count[row, width - length:] = np.arange(offset + 1, offset + length + 1)
+
+        return cls(codes, dates, columns, bar_count)
+
+def list_stock_codes():
+    """数据目录下的全部股票完整代码"""
+    if not os.path.exists(bar_store.DATA_DIR):
+        return []
+    return sorted(f[:-4] for f in os.listdir(bar_store.DATA_DIR) if f.endswith('.csv'))
+
+def load_panel(codes=None, lookback=None, as_of=None):
+    """
+    从数据目录加载面板
+    参数:
+        codes: 完整代码列表，为空时加载全部股票
+        lookback: 只读取每只股票最近 N 根K线（扫描只需策略声明的回看长度）
+        as_of: 快照日期，只读取该日及之前的K线
+    返回: (MarketPanel, 缺失的代码列表)
+    """
+    codes = list_stock_codes() if codes is None else codes
+    frames = {}
+    missing = []
+    for full_code in codes:
+        if lookback:
+            df = bar_store.load_tail(full_code, lookback, as_of)
+        else:
+            df = bar_store.cut_as_of(bar_store.load_bars(full_code), as_of)
+        if df is None:
+            missing.append(full_code)
+        else:
+            frames[full_code] = df
+    with profiling.stage('build_panel'):
+        return MarketPanel.from_frames(frames, lookback), missing
@@ -0,0 +1,174 @@
+"""
+参数扫描模块
+对策略阈值（策略模块的 PARAMS）做网格搜索或随机搜索，统计每组参数在回测中的信号数、成功率和平均最高涨幅。
+面板、不依赖参数的中间结果（均线、窗口量能等）和各持有期的前瞻收益在每个进程内只计算一次，
+多组参数之间共享；参数组合按进程并行。
+"""
+import os
+import csv
+import time
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from utils.panel import load_panel
+from utils.backtest import (
+    HORIZONS, TARGET_RETURN, default_check_dates, check_date_mask, forward_max_returns
+)
+from strategies.registry import get_strategy
+
+# ================= 1. 参数组合 =================
+
+def grid_combinations(space):
+    """
+    网格搜索：space 为 {参数名: [取值]}，返回所有组合
+    """
+    names = list(space.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+def random_combinations(space, count, seed=None):
+    """
+    随机搜索：space 中取值为列表时随机挑选，为 (下限, 上限) 元组时均匀采样
+    """
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(count):
+        combo = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                combo[name] = round(rng.uniform(*values), 4)
+            else:
+                combo[name] = rng.choice(list(values))
+        combos.append(combo)
+    return combos
+
+def parse_space(items):
+    """
+    解析命令行参数空间："acc_ratio=1.3,1.5,1.7" 为取值列表，"acc_ratio=1.2:1.8" 为区间
+    """
+    space = {}
+    for item in items or []:
+        if '=' not in item:
+            raise ValueError(f"参数格式应为 名称=取值: {item}")
+        name, spec = item.split('=', 1)
+        if ':' in spec:
+            low, high = spec.split(':', 1)
+            space[name.strip()] = (float(low), float(high))
+        else:
+            space[name.strip()] = [float(v) for v in spec.split(',') if v.strip()]
+    return space
+
+# ================= 2. 单组参数评估 =================
+
+class SweepContext:
+    """一个进程内的共享数据：面板、检查日位置、前瞻收益、规则中间结果缓存"""
+
+    def __init__(self, strategy_name, codes=None, year=2025, horizons=HORIZONS):
+        self.strategy = get_strategy(strategy_name)
+        if self.strategy is None:
+            raise ValueError(f"找不到策略: {strategy_name}")
+        if self.strategy.get('rules') is None:
+            raise ValueError(f"策略 {strategy_name} 没有 RULES，无法参数扫描")
+
+        self.panel, _ = load_panel(codes)
+        self.check_mask = check_date_mask(self.panel, default_check_dates(year), year)
+        self.returns = {days: forward_max_returns(self.panel, days) for days in horizons}
+        self.shared_cache = {}
+
+    def evaluate(self, params, signal, exact=False, target_return=TARGET_RETURN):
+        """
+        评估一组参数
+        返回: dict，参数 + 每个持有期的 signals_Nd / success_rate_Nd / avg_max_return_Nd
+        """
+        rules = self.strategy['rules']
+        grid = rules.evaluate(self.panel, params, self.shared_cache)
+        labels = rules.labels()
+        wanted = [i for i, label in enumerate(labels) if (label == signal if exact else signal in label)]
+        mask = np.isin(grid, wanted) & self.check_mask
+
+        row = dict(params)
+        for days, returns in self.returns.items():
+            picked = returns[mask]
+            total = int(picked.size)
+            row[f'signals_{days}d'] = total
+            row[f'success_rate_{days}d'] = round(float((picked >= target_return * 100).mean() * 100), 2) if total else 0.0
+            row[f'avg_max_return_{days}d'] = round(float(picked.mean()), 2) if total else 0.0
+        return row
+
+# 每个工作进程只构建一次
+_worker_context = None
+
+def _init_worker(strategy_name, codes, year):
+    global _worker_context
+    _worker_context = SweepContext(strategy_name, codes, year)
+
+def _evaluate_chunk(combos, signal, exact):
+    return [_worker_context.evaluate(params, signal, exact) for params in combos]
+
+# ================= 3. 扫描入口 =================
+
+def run_sweep(strategy_name, combos, signal="🚀 启动期", exact=False, output=None,
+              workers=None, year=2025, codes=None, chunk_size=8):
+    """
+    评估所有参数组合并写出结果表（按 10 日成功率降序）
+    参数:
+        combos: 参数组合列表（grid_combinations / random_combinations 的结果）
+        output: 结果 CSV 路径；运行中每完成一批就追加写入，中断后已完成的部分仍然保留
+        workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    返回: 结果行列表
+    """
+    strategy = get_strategy(strategy_name)
+    if strategy is None:
+        raise ValueError(f"找不到策略: {strategy_name}")
+    unknown = sorted({name for combo in combos for name in combo} - set(strategy['params']))
+    if unknown:
+        raise ValueError(f"策略 {strategy_name} 没有参数: {', '.join(unknown)}（可用: {', '.join(strategy['params'])}）")
+
+    workers = workers or os.cpu_count() or 1
+    # 未指定的参数使用默认值，结果表中每组参数都是完整的
+    combos = [{**strategy['params'], **combo} for combo in combos]
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+
+    rows = []
+    writer = None
+    out_file = open(output, 'w', newline='', encoding='utf-8-sig') if output else None
+    t_start = time.perf_counter()
+    try:
+        def collect(batch):
+            nonlocal writer
+            rows.extend(batch)
+            if out_file:
+                if writer is None:
+                    writer = csv.DictWriter(out_file, fieldnames=list(batch[0].keys()))
+                    writer.writeheader()
+                writer.writerows(batch)
+                out_file.flush()
+
+        if workers == 1:
+            _init_worker(strategy_name, codes, year)
+            for chunk in tqdm(chunks, desc="参数扫描"):
+                collect(_evaluate_chunk(chunk, signal, exact))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)) or 1, initializer=_init_worker,
+                                     initargs=(strategy_name, codes, year)) as executor:
+                futures = [executor.submit(_evaluate_chunk, chunk, signal, exact) for chunk in chunks]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="参数扫描"):
+                    collect(future.result())
+    finally:
+        if out_file:
+            out_file.close()
+
+    first = f"success_rate_{HORIZONS[0]}d"
+    rows.sort(key=lambda r: (r[first], r[f"avg_max_return_{HORIZONS[0]}d"]), reverse=True)
+    # 全部完成后按成功率排序重写
+    if output and rows:
+        with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    print(f"✅ 完成 {len(rows)} 组参数，用时 {time.perf_counter() - t_start:.1f}s")
+    return rows
@@ -0,0 +1,296 @@
+"""
+组合回测模块
+在回测信号表（utils.backtest.find_signals）之上模拟真实交易，补足"N日内最高涨幅"统计忽略的止损、回撤和重复信号：
+    - 信号日的下一根K线开盘买入
+    - 退出规则：固定持有期、止盈、止损、移动止损（自持仓以来最高价回撤），跳空时按开盘价成交
+      同一根K线内止损与止盈都触发时按止损处理（保守）
+    - 同一只股票持仓期间的新信号默认跳过，不再重复计数
+    - 按资金比例开仓、限制同时持仓数，逐日盯市得到资金曲线与回撤
+逐笔模拟对 (信号数 × 持有期) 的价格窗口做向量化计算，几千个信号在一秒内完成；
+只有组合层（资金、持仓数）按交易日顺序推进。收益率、胜率、回撤等均以 % 表示。
+"""
+import numpy as np
+import pandas as pd
+
+from utils.panel import load_panel
+from utils.backtest import stage_grid, find_signals, default_check_dates
+from strategies.registry import get_strategy
+
+# 退出规则（比例，None 表示不启用）
+DEFAULT_RULES = {
+    'horizon': 10,         # 最长持有K线数（含买入当天）
+    'take_profit': None,   # 止盈，如 0.10 表示 +10%
+    'stop_loss': None,     # 止损，如 0.05 表示 -5%
+    'trailing': None,      # 移动止损，如 0.08 表示从持仓以来最高价回撤 8%
+    'fee': 0.0,            # 每笔交易的往返成本（佣金 + 印花税等）
+}
+# 仓位管理
+DEFAULT_SIZING = {
+    'initial_capital': 1_000_000.0,
+    'position_size': 0.1,  # 每笔开仓占当前权益的比例
+    'max_positions': 10,   # 同时持仓上限
+    'overlap': 'skip',     # skip: 同一股票持仓期间的新信号跳过；allow: 允许叠加
+}
+OVERLAP_MODES = ('skip', 'allow')
+RETURN_QUANTILES = (5, 25, 50, 75, 95)
+
+# ================= 1. 逐笔模拟 =================
+
+def _first_true(mask):
+    """每行第一个 True 的位置，没有时为列数"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+def simulate_trades(panel, signals, rules=None):
+    """
+    逐笔模拟信号的买入与退出（不考虑资金约束）
+    参数:
+        signals: find_signals 的结果 [(行, 列, 阶段名称)]
+        rules: 退出规则，见 DEFAULT_RULES
+    返回: DataFrame，每行一笔交易：
+        code / stage / signal_date / entry_date / entry_price / exit_date / exit_price /
+        exit_reason（take_profit / stop_loss / trailing / horizon / end）/ bars_held / return（%）
+        信号后没有可买入的K线时不产生交易
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    horizon = int(rules['horizon'])
+    if horizon < 1:
+        raise ValueError("持有期 horizon 至少为 1")
+    width = panel.shape[1]
+
+    rows = np.array([s[0] for s in signals], dtype=np.int64)
+    cols = np.array([s[1] for s in signals], dtype=np.int64)
+    stages = np.array([s[2] for s in signals], dtype=object)
+    keep = cols + 1 < width
+    rows, cols, stages = rows[keep], cols[keep], stages[keep]
+
+    # 买入后 horizon 根K线的价格窗口 (N, H)，超出面板的位置为 NaN
+    index = cols[:, None] + 1 + np.arange(horizon)[None, :]
+    in_panel = index < width
+    index = np.minimum(index, width - 1)
+
+    def window(name):
+        return np.where(in_panel, panel.column(name)[rows[:, None], index], np.nan)
+
+    open_, high, low, close = window('open'), window('high'), window('low'), window('close')
+    entry = open_[:, 0]
+    keep = np.isfinite(entry) & (entry > 0)
+    rows, cols, stages, index = rows[keep], cols[keep], stages[keep], index[keep]
+    open_, high, low, close, entry = open_[keep], high[keep], low[keep], close[keep], entry[keep]
+    available = np.isfinite(close)
+    count = len(rows)
+
+    # 止损线：固定止损与移动止损取较高者；移动止损按买入价与之前各K线最高价计算
+    fixed_stop = np.full((count, horizon), -np.inf)
+    if rules['stop_loss']:
+        fixed_stop[:] = (entry * (1 - rules['stop_loss']))[:, None]
+    stop_level = fixed_stop
+    if rules['trailing']:
+        running_high = np.fmax.accumulate(np.where(available, high, -np.inf), axis=1)
+        prior_high = np.empty_like(running_high)
+        prior_high[:, 0] = entry
+        prior_high[:, 1:] = np.fmax(running_high[:, :-1], entry[:, None])
+        stop_level = np.fmax(fixed_stop, prior_high * (1 - rules['trailing']))
+    take_level = entry * (1 + rules['take_profit']) if rules['take_profit'] else np.full(count, np.inf)
+
+    first_stop = _first_true(available & (low <= stop_level))
+    first_take = _first_true(available & (high >= take_level[:, None]))
+    last_bar = available.sum(axis=1) - 1
+    horizon_bar = np.minimum(horizon - 1, last_bar)
+    exit_bar = np.minimum(np.minimum(first_stop, first_take), horizon_bar)
+
+    pick = (np.arange(count), exit_bar)
+    exit_open, exit_close, level = open_[pick], close[pick], stop_level[pick]
+    stopped = exit_bar == first_stop
+    took = ~stopped & (exit_bar == first_take)
+    exit_price = np.where(stopped, np.minimum(exit_open, level),
+                          np.where(took, np.maximum(exit_open, take_level), exit_close))
+    reason = np.where(stopped, np.where(level > fixed_stop[pick], 'trailing', 'stop_loss'),
+                      np.where(took, 'take_profit', np.where(exit_bar < horizon - 1, 'end', 'horizon')))
+
+    returns = (exit_price / entry - 1 - rules['fee']) * 100
+    codes = np.array(panel.codes, dtype=object)
+    return pd.DataFrame({
+        'code': codes[rows] if count else np.array([], dtype=object),
+        'stage': stages,
+        'signal_date': panel.dates[rows, cols],
+        'entry_date': panel.dates[rows, cols + 1],
+        'entry_price': entry,
+        'exit_date': panel.dates[rows, index[pick]],
+        'exit_price': exit_price,
+        'exit_reason': reason,
+        'bars_held': exit_bar + 1,
+        'return': returns,
+        '_row': rows,
+    })
+
+# ================= 2. 组合模拟 =================
+
+def _calendar_closes(panel, rows, calendar):
+    """指定股票在交易日历上的收盘价（停牌日沿用上一收盘价）"""
+    closes = np.full((len(rows), len(calendar)), np.nan)
+    dates = panel.dates[rows]
+    present = dates != ''
+    r, t = np.nonzero(present)
+    closes[r, np.searchsorted(calendar, dates[present])] = panel.column('close')[rows][r, t]
+    filled = np.where(np.isfinite(closes), np.arange(len(calendar))[None, :], 0)
+    np.maximum.accumulate(filled, axis=1, out=filled)
+    return closes[np.arange(len(rows))[:, None], filled]
+
+def simulate_portfolio(panel, trades, sizing=None):
+    """
+    按交易日推进组合：开盘买入当天的信号（权益比例开仓，受持仓上限与现金约束），
+    到退出日按退出价卖出，收盘盯市。
+    重复信号按当时的实际持仓判断：overlap 为 skip 时，该股票仍有持仓（含当天才卖出的）则跳过
+    参数:
+        trades: simulate_trades 的结果
+        sizing: 仓位管理，见 DEFAULT_SIZING
+    返回: (资金曲线 DataFrame[date, equity, cash, positions, drawdown（%）],
+           trades 副本，增加 taken（是否成交）与 skip_reason（overlap / capacity）列)
+    """
+    sizing = {**DEFAULT_SIZING, **(sizing or {})}
+    if sizing['overlap'] not in OVERLAP_MODES:
+        raise ValueError(f"未知的重叠处理方式: {sizing['overlap']}（可选: {', '.join(OVERLAP_MODES)}）")
+    trades = trades.copy()
+    taken = np.zeros(len(trades), dtype=bool)
+    skip_reason = np.full(len(trades), '', dtype=object)
+    calendar = np.unique(panel.dates[panel.dates != ''])
+    if len(trades) == 0 or len(calendar) == 0:
+        trades['taken'] = taken
+        trades['skip_reason'] = skip_reason
+        empty = pd.DataFrame(columns=['date', 'equity', 'cash', 'positions', 'drawdown'])
+        return empty, trades
+
+    entry_day = np.searchsorted(calendar, trades['entry_date'].to_numpy().astype(str))
+    exit_day = np.searchsorted(calendar, trades['exit_date'].to_numpy().astype(str))
+    rows = trades['_row'].to_numpy()
+    stock_rows, stock_index = np.unique(rows, return_inverse=True)
+    closes = _calendar_closes(panel, stock_rows, calendar)
+
+    by_day = {}
+    for i in np.argsort(entry_day, kind='stable'):
+        by_day.setdefault(int(entry_day[i]), []).append(i)
+
+    entry_price = trades['entry_price'].to_numpy()
+    growth = 1 + trades['return'].to_numpy() / 100
+    skip_overlap = sizing['overlap'] == 'skip'
+
+    cash = equity = float(sizing['initial_capital'])
+    held = {}  # 交易序号 -> 投入金额
+    curve = np.empty((len(calendar), 3))
+    for day in range(len(calendar)):
+        for i in by_day.get(day, ()):
+            if skip_overlap and any(rows[j] == rows[i] for j in held):
+                skip_reason[i] = 'overlap'
+                continue
+            amount = min(equity * sizing['position_size'], cash)
+            if len(held) >= sizing['max_positions'] or amount <= 0:
+                skip_reason[i] = 'capacity'
+                continue
+            held[i] = amount
+            taken[i] = True
+            cash -= amount
+        for i in [i for i in held if exit_day[i] == day]:
+            cash += held.pop(i) * growth[i]
+        value = sum(amount / entry_price[i] * closes[stock_index[i], day] for i, amount in held.items())
+        equity = cash + value
+        curve[day] = (equity, cash, len(held))
+
+    equity_curve = pd.DataFrame({
+        'date': calendar,
+        'equity': curve[:, 0],
+        'cash': curve[:, 1],
+        'positions': curve[:, 2].astype(int),
+    })
+    equity_curve['drawdown'] = (equity_curve['equity'] / equity_curve['equity'].cummax() - 1) * 100
+    trades['taken'] = taken
+    trades['skip_reason'] = skip_reason
+    return equity_curve, trades
+
+# ================= 3. 统计 =================
+
+def trade_stats(trades):
+    """成交交易的胜率、收益分布、退出原因"""
+    filled = trades[trades['taken']] if 'taken' in trades else trades
+    returns = filled['return'].to_numpy()
+    if len(returns) == 0:
+        return {'trades': 0, 'skipped': int(len(trades)), 'win_rate': 0.0, 'avg_return': 0.0}
+    gains, losses = returns[returns > 0].sum(), -returns[returns < 0].sum()
+    return {
+        'trades': int(len(returns)),
+        'skipped': int(len(trades) - len(returns)),
+        'win_rate': float((returns > 0).mean() * 100),
+        'avg_return': float(returns.mean()),
+        'median_return': float(np.median(returns)),
+        'profit_factor': float(gains / losses) if losses else float('inf'),
+        'avg_bars_held': float(filled['bars_held'].mean()),
+        'return_quantiles': {f"p{q}": float(v) for q, v in zip(RETURN_QUANTILES, np.percentile(returns, RETURN_QUANTILES))},
+        'exit_reasons': filled['exit_reason'].value_counts().to_dict(),
+    }
+
+def return_histogram(trades, bins=20):
+    """成交交易的收益分布直方图，返回 DataFrame[low, high, count]（%）"""
+    filled = trades[trades['taken']] if 'taken' in trades else trades
+    counts, edges = np.histogram(filled['return'].to_numpy(), bins=bins)
+    return pd.DataFrame({'low': edges[:-1], 'high': edges[1:], 'count': counts})
+
+def equity_stats(equity_curve, periods_per_year=252):
+    """资金曲线的总收益、年化收益、最大回撤"""
+    if equity_curve.empty:
+        return {'total_return': 0.0, 'annual_return': 0.0, 'max_drawdown': 0.0, 'max_drawdown_date': None}
+    values = equity_curve['equity'].to_numpy()
+    total = values[-1] / values[0] - 1 if values[0] else 0.0
+    trough = int(equity_curve['drawdown'].to_numpy().argmin())
+    return {
+        'total_return': float(total * 100),
+        'annual_return': float(((1 + total) ** (periods_per_year / max(len(values) - 1, 1)) - 1) * 100),
+        'max_drawdown': float(equity_curve['drawdown'].iat[trough]),
+        'max_drawdown_date': equity_curve['date'].iat[trough],
+    }
+
+# ================= 4. 回测入口 =================
+
+def run_portfolio_backtest(strategy_name, signal, exact=False, rules=None, sizing=None, year=2025, codes=None,
+                           output_prefix=None, check_dates=None):
+    """
+    组合回测：提取信号 → 逐笔模拟 → 组合模拟，打印汇总
+    参数:
+        signal / exact: 统计的信号（见 utils.backtest.find_signals）
+        rules / sizing: 退出规则与仓位管理，未指定的项使用 DEFAULT_RULES / DEFAULT_SIZING
+        check_dates: 检查日，默认每月 1/5/10/15/20/25 日
+        output_prefix: 指定时保存 {prefix}_trades.csv 与 {prefix}_equity.csv
+    返回: {'trades': DataFrame, 'equity': DataFrame, 'stats': {交易统计 + 资金曲线统计}}
+    """
+    strategy_config = get_strategy(strategy_name)
+    if strategy_config is None:
+        raise ValueError(f"找不到策略: {strategy_name}")
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    sizing = {**DEFAULT_SIZING, **(sizing or {})}
+
+    panel, _ = load_panel(codes)
+    grid, labels = stage_grid(panel, strategy_config)
+    signals = find_signals(panel, grid, labels, check_dates or default_check_dates(year), signal, exact, year)
+    equity, trades = simulate_portfolio(panel, simulate_trades(panel, signals, rules), sizing)
+    stats = {'signals': len(signals), **trade_stats(trades), **equity_stats(equity)}
+
+    print("=" * 80)
+    print(f"{strategy_name} 组合回测 - {year}年 | 信号：{signal}")
+    print(f"退出规则：持有 {rules['horizon']} 根K线 | 止盈 {rules['take_profit']} | 止损 {rules['stop_loss']} | "
+          f"移动止损 {rules['trailing']} | 成本 {rules['fee']}")
+    print(f"仓位：每笔 {sizing['position_size']:.0%} 权益 | 最多 {sizing['max_positions']} 只 | 重叠信号 {sizing['overlap']}")
+    print("=" * 80)
+    print(f"  信号数: {stats['signals']} | 成交: {stats['trades']} | 跳过: {stats['skipped']}")
+    if stats['trades']:
+        print(f"  胜率: {stats['win_rate']:.2f}% | 平均收益: {stats['avg_return']:.2f}% | "
+              f"中位收益: {stats['median_return']:.2f}% | 盈亏比: {stats['profit_factor']:.2f}")
+        quantiles = ' / '.join(f"{k} {v:.2f}%" for k, v in stats['return_quantiles'].items())
+        print(f"  收益分位: {quantiles}")
+        print(f"  退出原因: {stats['exit_reasons']}")
+    print(f"  总收益: {stats['total_return']:.2f}% | 年化: {stats['annual_return']:.2f}% | "
+          f"最大回撤: {stats['max_drawdown']:.2f}%（{stats['max_drawdown_date']}）")
+
+    public = trades.drop(columns=['_row'])
+    if output_prefix:
+        public.to_csv(f"{output_prefix}_trades.csv", index=False, encoding='utf-8-sig')
+        equity.to_csv(f"{output_prefix}_equity.csv", index=False, encoding='utf-8-sig')
+        print(f"详细结果已保存: {output_prefix}_trades.csv / {output_prefix}_equity.csv")
+    return {'trades': public, 'equity': equity, 'stats': stats}
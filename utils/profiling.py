@@ -0,0 +1,196 @@
+"""
+扫描流水线性能剖析模块
+在扫描的各阶段（列目录、读文件、CSV 解析、特征计算、策略判定、结果整理、报告生成）埋点计时：
+    with profiling.tracing('scan:ma5') as trace:   # 开启一次跟踪
+        ...
+        with profiling.stage('parse_csv'):         # 埋点；没有开启跟踪时是空操作，开销可忽略
+            ...
+跟踪结果可导出为 JSON（各阶段次数 / 累计耗时 / 最大耗时，以及单只股票的慢路径），
+可选同时用 cProfile 或 pyinstrument（需单独安装）采集调用栈。
+注意：
+    - 同一进程同一时间只有一个活动跟踪，已有跟踪时新的 tracing 不再记录埋点
+    - 多线程扫描时各阶段耗时是所有线程之和，可能超过墙钟时间
+    - cProfile / pyinstrument 只采集开启跟踪的线程（批量引擎在主线程，逐只引擎在线程池中）
+"""
+import io
+import json
+import time
+import logging
+import pstats
+import cProfile
+import threading
+import contextlib
+
+PROFILERS = ('cprofile', 'pyinstrument')
+# 单只股票处理超过该耗时记为慢路径（秒）
+SLOW_STOCK_SECONDS = 0.5
+MAX_SLOW_STOCKS = 50
+
+_active_trace = None
+_activate_lock = threading.Lock()
+_NULL_STAGE = contextlib.nullcontext()
+
+class Trace:
+    """一次跟踪的累计数据，线程安全"""
+
+    def __init__(self, name, profiler=None):
+        self.name = name
+        self.profiler = profiler
+        self.started_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.total_s = None
+        self.stages = {}            # 阶段 -> [次数, 累计秒, 最大秒]
+        self.slow_stocks = []
+        self.profile_text = None
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def add_slow_stock(self, full_code, seconds, detail=None):
+        with self._lock:
+            if len(self.slow_stocks) < MAX_SLOW_STOCKS:
+                self.slow_stocks.append({'code': full_code, 'seconds': round(seconds, 4), **(detail or {})})
+
+    def to_dict(self):
+        with self._lock:
+            stages = {
+                name: {
+                    'count': count,
+                    'total_s': round(total, 4),
+                    'avg_ms': round(total / count * 1000, 3),
+                    'max_ms': round(peak * 1000, 3)
+                }
+                for name, (count, total, peak) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])
+            }
+            return {
+                'name': self.name,
+                'started_at': self.started_at,
+                'total_s': self.total_s,
+                'stages': stages,
+                'slow_stocks': sorted(self.slow_stocks, key=lambda s: -s['seconds']),
+                'profiler': self.profiler,
+                'profile': self.profile_text
+            }
+
+class _StageTimer:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+# ================= 1. 埋点 =================
+
+def active_trace():
+    return _active_trace
+
+def stage(name):
+    """阶段计时上下文；没有活动跟踪时返回空上下文"""
+    trace = _active_trace
+    if trace is None:
+        return _NULL_STAGE
+    return _StageTimer(trace, name)
+
+def record_stock(full_code, seconds, **detail):
+    """记录单只股票的处理耗时，超过 SLOW_STOCK_SECONDS 时写日志并计入慢路径"""
+    if seconds < SLOW_STOCK_SECONDS:
+        return
+    logging.warning(f"慢路径: {full_code} 用时 {seconds:.3f}s {detail or ''}")
+    trace = _active_trace
+    if trace is not None:
+        trace.add_slow_stock(full_code, seconds, detail)
+
+# ================= 2. 跟踪 =================
+
+def _start_profiler(profiler):
+    if profiler == 'cprofile':
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("未安装 pyinstrument：pip install pyinstrument")
+        prof = Profiler()
+        prof.start()
+        return prof
+    raise ValueError(f"未知的剖析器: {profiler}（可选: {', '.join(PROFILERS)}）")
+
+def _stop_profiler(profiler, prof, limit=40, dump_path=None):
+    """停止剖析器，返回文本报告；dump_path 指定时保存原始数据（.prof 可用 snakeviz 查看）"""
+    if profiler == 'cprofile':
+        prof.disable()
+        if dump_path:
+            prof.dump_stats(dump_path)
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+    prof.stop()
+    if dump_path:
+        with open(dump_path, 'w', encoding='utf-8') as f:
+            f.write(prof.output_html())
+    return prof.output_text(unicode=True, color=False)
+
+@contextlib.contextmanager
+def tracing(name, profiler=None, dump_path=None):
+    """
+    开启一次跟踪
+    参数:
+        profiler: None 只记录阶段耗时；'cprofile' / 'pyinstrument' 同时采集调用栈
+        dump_path: 剖析器原始数据的保存路径（cProfile 为 .prof，pyinstrument 为 .html）
+    返回: Trace（退出后 total_s / profile_text 可用）
+    """
+    global _active_trace
+    trace = Trace(name, profiler)
+    with _activate_lock:
+        owner = _active_trace is None
+        if owner:
+            _active_trace = trace
+
+    prof = _start_profiler(profiler) if (owner and profiler) else None
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.total_s = round(time.perf_counter() - start, 4)
+        if prof is not None:
+            trace.profile_text = _stop_profiler(profiler, prof, dump_path=dump_path)
+        if owner:
+            with _activate_lock:
+                _active_trace = None
+
+def save_trace(trace, path):
+    """把跟踪结果保存为 JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace.to_dict(), f, ensure_ascii=False, indent=2)
+    return path
+
+def format_trace(trace):
+    """跟踪结果的文本摘要（命令行打印用）"""
+    data = trace.to_dict()
+    lines = [f"⏱️ {data['name']} 总耗时 {data['total_s']}s"]
+    for name, s in data['stages'].items():
+        lines.append(f"  {name:<20} {s['count']:>7} 次  累计 {s['total_s']:>9.3f}s  "
+                     f"平均 {s['avg_ms']:>9.3f}ms  最大 {s['max_ms']:>9.3f}ms")
+    if data['slow_stocks']:
+        lines.append(f"  慢路径（> {SLOW_STOCK_SECONDS}s）:")
+        for s in data['slow_stocks'][:10]:
+            lines.append(f"    {s['code']} {s['seconds']}s")
+    return "\n".join(lines)
@@ -0,0 +1,260 @@
+"""
+数据质量校验模块
+initData / appendData 写入前对本次抓取的全部数据做一次向量化校验，落盘的是清洗后的带类型数据：
+    - 日期非法或价格缺失的行剔除；价格/成交量统一为 float64
+    - 按日期排序（记录乱序行数），同一日期重复的行只保留最后一条（appendData 从 last_date 起抓取会重叠）
+    - 成交量为空或为 0 的K线记为停牌（只统计不修改，与原始数据一致）；价格缺失的停牌行与其他缺价行一样剔除，
+      validate(fill_suspended=True) 时改为沿用前收盘价、成交量补 0
+    - 对照交易日历统计缺失的交易日；最高价低于最低价、收盘价越界等记为价格异常（只标记不修改）
+每只股票的问题计数写入 data_quality.json（质量报告）。扫描读取的是已清洗的数据，不再需要逐列容错转换。
+历史数据可用 validate_data_dir() 一次性清洗。
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import bar_store, storage
+
+REPORT_FILE = "data_quality.json"
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+BAR_COLUMNS = bar_store.BAR_COLUMNS
+COUNT_FIELDS = ('duplicates', 'out_of_order', 'bad_rows', 'suspended', 'filled', 'missing_dates',
+                'off_calendar', 'price_anomalies')
+# 推断交易日历时，某日在其上市区间覆盖到的股票中至少有该比例存在K线才算交易日
+CALENDAR_MIN_SHARE = 0.5
+MAX_MISSING_SAMPLES = 5
+
+_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+_report_lock = threading.Lock()
+
+# ================= 1. 交易日历 =================
+
+def fetch_trade_calendar(start_date, end_date):
+    """
+    从 BaoStock 获取交易日历（调用方需已 bs.login()）
+    返回: 升序日期数组，获取失败时返回 None
+    """
+    import baostock as bs
+    try:
+        rs = bs.query_trade_dates(start_date=start_date, end_date=end_date)
+        rows = []
+        while rs.next():
+            rows.append(rs.get_row_data())
+    except Exception as e:
+        logging.warning(f"获取交易日历失败: {e}")
+        return None
+    dates = [date for date, is_trading in rows if is_trading == '1']
+    return np.array(dates, dtype=object) if dates else None
+
+def infer_calendar(frames, min_share=CALENDAR_MIN_SHARE):
+    """
+    由数据本身推断交易日历：某日在首末日期覆盖该日的股票中有 min_share 以上存在K线
+    参数:
+        frames: {完整代码: DataFrame} 或含 code / date 列的长表
+    返回: 升序日期数组
+    """
+    long = _to_long(frames) if isinstance(frames, dict) else frames
+    dates = long[['code', 'date']].dropna().drop_duplicates()
+    dates = dates[dates['date'].astype(str).str.match(_DATE_PATTERN)]
+    if dates.empty:
+        return np.array([], dtype=object)
+    counts = dates['date'].value_counts().sort_index()
+    span = dates.groupby('code')['date'].agg(['min', 'max'])
+    firsts = np.sort(span['min'].to_numpy())
+    lasts = np.sort(span['max'].to_numpy())
+    days = counts.index.to_numpy()
+    # 覆盖某日的股票数 = 首日 <= 该日的股票数 - 末日 < 该日的股票数
+    covering = np.searchsorted(firsts, days, side='right') - np.searchsorted(lasts, days, side='left')
+    return days[counts.to_numpy() >= np.maximum(covering, 1) * min_share]
+
+# ================= 2. 校验 =================
+
+def _to_long(frames):
+    parts = [df.assign(code=code) for code, df in frames.items() if df is not None and len(df)]
+    if not parts:
+        return pd.DataFrame(columns=['code', 'date', *BAR_COLUMNS])
+    return pd.concat(parts, ignore_index=True)
+
+def validate(frames, calendar=None, since=None, fill_suspended=False):
+    """
+    对一批股票数据做一次向量化校验与清洗
+    参数:
+        frames: {完整代码: DataFrame(date, open, high, low, close, volume)}，值可以是字符串
+        calendar: 交易日历（升序日期数组），为空时由本批数据推断
+        since: {完整代码: 已有数据的最后日期}，增量数据从该日之后开始统计缺失交易日
+        fill_suspended: 停牌日价格缺失时沿用前收盘价、成交量补 0（默认不修改，缺价行剔除）
+    返回: (清洗后的 {完整代码: DataFrame}, 质量报告 {完整代码: {问题计数...}})
+    """
+    long = _to_long(frames)
+    if long.empty:
+        return {}, {}
+    since = since or {}
+    codes = long['code']
+    raw_rows = codes.value_counts()
+
+    long['date'] = long['date'].astype(str).str.strip()
+    for col in BAR_COLUMNS:
+        long[col] = pd.to_numeric(long[col], errors='coerce').astype('float64')
+
+    # 乱序：按原始顺序，日期小于上一行
+    prev_date = long.groupby('code', sort=False)['date'].shift(1)
+    out_of_order = (long['date'] < prev_date) & prev_date.notna()
+
+    valid_date = long['date'].str.match(_DATE_PATTERN)
+    df = long[valid_date].sort_values(['code', 'date'], kind='mergesort')
+
+    # 停牌：成交量为空或为 0；缺价格的行剔除（fill_suspended 时停牌日先沿用前收盘价）
+    suspended = df['volume'].isna() | (df['volume'] <= 0)
+    fill = suspended & df[PRICE_COLUMNS].isna().any(axis=1) & fill_suspended
+    if fill.any():
+        carry = df['close'].groupby(df['code'], sort=False).ffill()
+        df.loc[fill, PRICE_COLUMNS] = np.repeat(carry[fill].to_numpy()[:, None], len(PRICE_COLUMNS), axis=1)
+    if fill_suspended:
+        df['volume'] = df['volume'].fillna(0.0)
+    keep = df[PRICE_COLUMNS].notna().all(axis=1)
+    df, suspended, fill = df[keep], suspended[keep], fill[keep]
+
+    duplicated = df.duplicated(['code', 'date'], keep='last')
+    duplicates = duplicated.groupby(df['code']).sum()
+    df, suspended, fill = df[~duplicated], suspended[~duplicated], fill[~duplicated]
+
+    anomalies = (df['high'] < df['low']) | (df['close'] > df['high']) | (df['close'] < df['low'])
+    by_code = df.groupby('code')
+    per_code = pd.DataFrame({
+        'rows': by_code.size(),
+        'duplicates': duplicates,
+        'out_of_order': out_of_order.groupby(codes).sum(),
+        'suspended': suspended.groupby(df['code']).sum(),
+        'filled': fill.groupby(df['code']).sum(),
+        'price_anomalies': anomalies.groupby(df['code']).sum(),
+        'first_date': by_code['date'].first(),
+        'last_date': by_code['date'].last(),
+    }).reindex(raw_rows.index)
+    per_code['bad_rows'] = raw_rows - per_code['rows'].fillna(0) - per_code['duplicates'].fillna(0)
+
+    calendar = infer_calendar(df) if calendar is None else np.asarray(calendar, dtype=object)
+    missing, samples, off_calendar = _calendar_gaps(df, per_code, calendar, since)
+    per_code['missing_dates'] = missing
+    per_code['off_calendar'] = off_calendar
+
+    checked_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report = {}
+    for code, row in per_code.iterrows():
+        entry = {field: int(row[field]) if row[field] == row[field] else 0 for field in ('rows', *COUNT_FIELDS)}
+        entry['first_date'] = row['first_date'] if isinstance(row['first_date'], str) else None
+        entry['last_date'] = row['last_date'] if isinstance(row['last_date'], str) else None
+        if code in samples:
+            entry['missing_samples'] = samples[code]
+        entry['checked_at'] = checked_at
+        report[code] = entry
+
+    clean = {
+        code: group[['date', *BAR_COLUMNS]].reset_index(drop=True)
+        for code, group in df.groupby('code', sort=False)
+    }
+    return clean, report
+
+def _calendar_gaps(df, per_code, calendar, since):
+    """每只股票 (since 或首日, 末日] 区间内缺失的交易日数、示例，以及不在日历上的K线数"""
+    index = per_code.index
+    zeros = pd.Series(0, index=index)
+    if len(calendar) == 0:
+        return zeros, {}, zeros
+
+    on_calendar = pd.Series(np.isin(df['date'].to_numpy(), calendar), index=df.index)
+    present = on_calendar.groupby(df['code']).sum().reindex(index, fill_value=0)
+    off_calendar = (~on_calendar).groupby(df['code']).sum().reindex(index, fill_value=0)
+
+    last = per_code['last_date'].fillna('')
+    first = per_code['first_date'].fillna('')
+    start = pd.Series([since.get(code) for code in index], index=index)
+    lo = np.where(start.notna(),
+                  np.searchsorted(calendar, start.fillna('').to_numpy(), side='right'),
+                  np.searchsorted(calendar, first.to_numpy(), side='left'))
+    hi = np.searchsorted(calendar, last.to_numpy(), side='right')
+    missing = pd.Series(np.maximum(hi - lo - present.to_numpy(), 0), index=index)
+    missing[per_code['rows'].isna()] = 0
+
+    samples = {}
+    gap_codes = missing[missing > 0].index
+    if len(gap_codes):
+        dates_by_code = df[df['code'].isin(gap_codes)].groupby('code')['date']
+        for code, dates in dates_by_code:
+            i = index.get_loc(code)
+            expected = calendar[lo[i]:hi[i]]
+            samples[code] = expected[~np.isin(expected, dates.to_numpy())][:MAX_MISSING_SAMPLES].tolist()
+    return missing, samples, off_calendar
+
+# ================= 3. 质量报告 =================
+
+def load_report():
+    """读取质量报告，不存在时返回空报告"""
+    if not os.path.exists(REPORT_FILE):
+        return {'updated_at': None, 'totals': {}, 'stocks': {}}
+    with open(REPORT_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_report(report, accumulate=False, reset=False):
+    """
+    把本次校验结果并入质量报告
+    参数:
+        accumulate: 问题计数与已有记录累加（增量更新），否则覆盖这些股票的记录（全量下载）
+        reset: 丢弃报告中其余股票的记录（整个数据目录重新校验）
+    """
+    with _report_lock:
+        current = {'updated_at': None, 'totals': {}, 'stocks': {}} if reset else load_report()
+        stocks = current['stocks']
+        for code, entry in report.items():
+            previous = stocks.get(code)
+            if previous and accumulate:
+                merged = {**previous, **entry}
+                for field in ('rows', *COUNT_FIELDS):
+                    merged[field] = previous.get(field, 0) + entry[field]
+                merged['first_date'] = previous.get('first_date') or entry['first_date']
+                entry = merged
+            stocks[code] = entry
+        current['totals'] = {field: sum(s.get(field, 0) for s in stocks.values()) for field in COUNT_FIELDS}
+        # 停牌是正常现象，不算数据问题
+        current['totals']['stocks_with_issues'] = sum(
+            1 for s in stocks.values() if any(s.get(field) for field in COUNT_FIELDS if field != 'suspended'))
+        current['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        storage.write_json(REPORT_FILE, current)
+    return current
+
+def format_summary(report):
+    """本次校验结果的一行摘要（命令行打印用）"""
+    totals = {field: sum(entry[field] for entry in report.values()) for field in COUNT_FIELDS}
+    return (f"重复 {totals['duplicates']} 行，乱序 {totals['out_of_order']} 行，剔除 {totals['bad_rows']} 行，"
+            f"停牌 {totals['suspended']} 根，缺失交易日 {totals['missing_dates']} 个，价格异常 {totals['price_anomalies']} 根")
+
+# ================= 4. 历史数据清洗 =================
+
+def validate_data_dir(data_dir=None, calendar=None):
+    """
+    校验并清洗数据目录中的全部CSV，只重写有问题的文件，同时重写质量报告、重建数据清单
+    返回: 质量报告 {完整代码: {...}}
+    """
+    from utils import manifest
+
+    data_dir = data_dir or bar_store.DATA_DIR
+    frames = {}
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('.csv'):
+            frames[name[:-4]] = pd.read_csv(os.path.join(data_dir, name), dtype=str)
+
+    clean, report = validate(frames, calendar)
+    rewritten = 0
+    for code, entry in report.items():
+        if entry['duplicates'] or entry['out_of_order'] or entry['bad_rows'] or entry['filled']:
+            path = os.path.join(data_dir, f"{code}.csv")
+            storage.write_csv(path, clean.get(code, pd.DataFrame(columns=['date', *BAR_COLUMNS])))
+            rewritten += 1
+    save_report(report, reset=True)
+    manifest.rebuild_manifest(data_dir)
+    print(f"🧹 已校验 {len(report)} 只股票，重写 {rewritten} 个文件：{format_summary(report)}")
+    return report
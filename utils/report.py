@@ -0,0 +1,293 @@
+"""
+扫描报告输出模块
+把扫描结果写成 HTML 报告，并可同时输出机器可读格式（CSV / JSON Lines / Parquet）：
+    - 模板按文件签名缓存，并预先在数据占位符处切开，多次生成只读一次模板
+    - HTML 与导出文件都是逐条结果边序列化边写入，不在内存中拼接整份 JSON / HTML；写入是原子的
+    - 数据日期取自扫描结果（数据日期字段 / 扫描快照），不再去数据目录读取CSV
+    - 传入日间对比（utils/archive.py）时一并写入 HTML，报告里展示与上一交易日相比的变化
+    - bundle 格式：应用代码是预编译、带内容哈希的静态包（npm run build:bundle 生成 report_assets/），
+      每份报告只写一个很小的外壳 HTML 和列式数据文件 *.data.js，浏览器跨天缓存应用代码
+    - 没有图形界面（Linux 无 DISPLAY，或设置了 CELUE_HEADLESS）时不打开浏览器；打开时在后台启动，不阻塞
+"""
+import os
+import csv
+import json
+import pathlib
+import platform
+import threading
+import subprocess
+import webbrowser
+
+import pandas as pd
+
+from strategies.registry import get_strategy
+from utils import storage, profiling
+
+REPORT_FORMATS = ('html', 'bundle', 'csv', 'jsonl', 'parquet')
+TEMPLATE_FILE = 'report_template.html'
+PLACEHOLDER = '{{DATA_PLACEHOLDER}}'
+ASSET_DIR = 'report_assets'
+BUNDLE_MANIFEST = 'manifest.json'
+# CSV / JSON Lines / Parquet 的列
+EXPORT_COLUMNS = ['code', 'name', 'fullCode', 'price', 'change', 'stage', 'concepts', 'dataDate']
+
+_template_cache = {'key': None, 'parts': None}
+_bundle_cache = {'key': None, 'bundle': None}
+_template_lock = threading.Lock()
+
+# ================= 1. 结果整理 =================
+
+def format_results(results):
+    """
+    将扫描结果（中文字段）转换为前端/接口使用的英文字段，按阶段、代码排序
+    """
+    formatted_results = []
+    for r in sorted(results, key=lambda x: (x.get('阶段', ''), x.get('代码', ''))):
+        formatted_results.append({
+            'code': r.get('代码', ''),
+            'name': r.get('名称', ''),
+            'fullCode': r.get('完整代码', ''),
+            'price': float(r.get('现价', 0)),
+            'change': r.get('涨跌幅', '0%'),
+            'stage': r.get('阶段', ''),
+            'concepts': r.get('概念', '未分类')
+        })
+    return formatted_results
+
+def results_data_date(results):
+    """扫描结果中最新的数据日期"""
+    return max((str(r.get('数据日期')) for r in results if r.get('数据日期')), default=None)
+
+def date_suffix(data_date):
+    """数据日期转文件名后缀：2026-02-03 -> _0203，无日期时为空"""
+    parts = str(data_date or '').split('-')
+    return f"_{parts[1]}{parts[2]}" if len(parts) >= 3 else ""
+
+def check_formats(formats, assets=None):
+    """
+    校验输出格式（扫描开始前调用，避免扫完才发现格式不可用）
+    assets: 静态包目录（bundle 格式），为空时使用项目根目录的 report_assets/
+    返回: 格式列表；未知格式或缺少 Parquet 引擎时抛出 ValueError
+    """
+    formats = [f.strip() for f in (formats.split(',') if isinstance(formats, str) else formats) if f.strip()]
+    unknown = [f for f in formats if f not in REPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"未知的报告格式: {', '.join(unknown)}（可选: {', '.join(REPORT_FORMATS)}）")
+    if 'bundle' in formats:
+        if 'html' in formats:
+            raise ValueError("html 与 bundle 都输出 .html 报告，只能选择其一")
+        if not os.path.exists(os.path.join(assets or asset_dir(), BUNDLE_MANIFEST)):
+            raise ValueError("输出 bundle 需要先构建静态包：cd frontend && npm run build:bundle")
+    if 'parquet' in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            try:
+                import fastparquet  # noqa: F401
+            except ImportError:
+                raise ValueError("输出 Parquet 需要安装 pyarrow：pip install pyarrow")
+    return formats
+
+# ================= 2. 模板 =================
+
+def template_path():
+    """报告模板路径：优先项目根目录，其次当前目录"""
+    path = os.path.join(os.path.dirname(__file__), '..', TEMPLATE_FILE)
+    return path if os.path.exists(path) else TEMPLATE_FILE
+
+def load_template(path=None):
+    """
+    读取报告模板并在数据占位符处切开，模板文件未变化时直接返回缓存
+    返回: (占位符之前, 占位符之后)
+    """
+    path = path or template_path()
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _template_lock:
+        if _template_cache['key'] == key:
+            return _template_cache['parts']
+    with profiling.stage('read_template'):
+        with open(path, 'r', encoding='utf-8') as f:
+            head, sep, tail = f.read().partition(PLACEHOLDER)
+    if not sep:
+        raise ValueError(f"报告模板中没有数据占位符 {PLACEHOLDER}: {path}")
+    with _template_lock:
+        _template_cache['key'], _template_cache['parts'] = key, (head, tail)
+    return head, tail
+
+def asset_dir():
+    """静态包目录：优先项目根目录，其次当前目录"""
+    path = os.path.join(os.path.dirname(__file__), '..', ASSET_DIR)
+    return path if os.path.exists(path) else ASSET_DIR
+
+def load_bundle(directory=None):
+    """
+    读取静态包清单与报告外壳，清单未变化时直接返回缓存
+    返回: (静态包目录, 应用文件名, 外壳 HTML)
+    """
+    directory = directory or asset_dir()
+    manifest_path = os.path.join(directory, BUNDLE_MANIFEST)
+    st = os.stat(manifest_path)
+    key = (os.path.abspath(manifest_path), st.st_mtime_ns, st.st_size)
+    with _template_lock:
+        if _bundle_cache['key'] == key:
+            return _bundle_cache['bundle']
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        bundle_manifest = json.load(f)
+    with open(os.path.join(directory, bundle_manifest['shell']), 'r', encoding='utf-8') as f:
+        shell = f.read()
+    bundle = (directory, bundle_manifest['app'], shell)
+    with _template_lock:
+        _bundle_cache['key'], _bundle_cache['bundle'] = key, bundle
+    return bundle
+
+# ================= 3. 写出 =================
+
+def _script_safe(text):
+    # JSON 嵌在 <script> 中，避免股票名称/概念里的 "</" 提前结束脚本
+    return text.replace('</', '<\\/')
+
+def write_html(path, formatted, meta, template=None):
+    """把 meta 与结果逐条写入模板的数据占位符处"""
+    head, tail = load_template(template)
+    meta_json = json.dumps({**meta, 'totalHit': len(formatted)}, ensure_ascii=False)
+    with storage.atomic_write(path) as f:
+        f.write(head)
+        f.write(_script_safe(meta_json[:-1]))
+        f.write(', "results": [')
+        for i, row in enumerate(formatted):
+            if i:
+                f.write(',')
+            f.write(_script_safe(json.dumps(row, ensure_ascii=False)))
+        f.write(']}')
+        f.write(tail)
+    return path
+
+def write_bundle(path, formatted, meta, directory=None):
+    """
+    bundle 格式：写列式数据文件（与报告同名的 .data.js）和引用静态包的外壳 HTML
+    返回: 外壳 HTML 路径
+    """
+    directory, app_file, shell = load_bundle(directory)
+    data_path = f"{os.path.splitext(path)[0]}.data.js"
+    columns = ['code', 'name', 'fullCode', 'price', 'change', 'stage', 'concepts']
+    meta_json = json.dumps({**meta, 'totalHit': len(formatted)}, ensure_ascii=False)
+    with storage.atomic_write(data_path) as f:
+        f.write('window.scannerData = ')
+        f.write(_script_safe(meta_json[:-1]))
+        f.write(', "columns": {')
+        for i, col in enumerate(columns):
+            if i:
+                f.write(', ')
+            f.write(f'"{col}": ')
+            f.write(_script_safe(json.dumps([row[col] for row in formatted], ensure_ascii=False)))
+        f.write('}};\n')
+
+    report_dir = os.path.dirname(os.path.abspath(path))
+    app_src = os.path.relpath(os.path.join(os.path.abspath(directory), app_file), report_dir).replace(os.sep, '/')
+    html = shell.replace('{{DATA_SRC}}', os.path.basename(data_path)).replace('{{APP_SRC}}', app_src)
+    with storage.atomic_write(path) as f:
+        f.write(html)
+    return path
+
+def _export_rows(formatted, data_date):
+    for row in formatted:
+        yield {**row, 'dataDate': data_date}
+
+def write_csv(path, formatted, data_date):
+    """CSV 导出（概念用 | 连接，带 BOM 方便 Excel 打开）"""
+    with storage.atomic_write(path, encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in _export_rows(formatted, data_date):
+            concepts = row['concepts']
+            row['concepts'] = '|'.join(concepts) if isinstance(concepts, list) else concepts
+            writer.writerow([row[col] for col in EXPORT_COLUMNS])
+    return path
+
+def write_jsonl(path, formatted, data_date):
+    """JSON Lines 导出：每行一只股票"""
+    with storage.atomic_write(path) as f:
+        for row in _export_rows(formatted, data_date):
+            f.write(json.dumps({col: row[col] for col in EXPORT_COLUMNS}, ensure_ascii=False))
+            f.write('\n')
+    return path
+
+def write_parquet(path, formatted, data_date):
+    """Parquet 导出（需要 pyarrow 或 fastparquet）"""
+    df = pd.DataFrame(list(_export_rows(formatted, data_date)), columns=EXPORT_COLUMNS)
+    df['concepts'] = df['concepts'].map(lambda c: '|'.join(c) if isinstance(c, list) else c)
+    with storage.atomic_write(path, mode='wb') as f:
+        df.to_parquet(f, index=False)
+    return path
+
+_WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+def write_report(results, total_scanned, strategy_name='ma5', data_date=None, formats=('html',),
+                 output_dir='.', template=None, diff=None, assets=None):
+    """
+    写出扫描报告
+    参数:
+        results: 扫描结果列表（中文字段）
+        data_date: 数据日期，用于文件名后缀；为空时取结果中最新的数据日期
+        formats: 输出格式，html / bundle / csv / jsonl / parquet 的任意组合（html 与 bundle 二选一）
+        output_dir: 输出目录
+        template: 报告模板路径，为空时使用项目根目录的 report_template.html
+        diff: 与上一次归档的对比（archive.diff），写入 HTML 报告
+        assets: 静态包目录（bundle 格式），为空时使用项目根目录的 report_assets/
+    返回: {格式: 文件路径}
+    """
+    formats = check_formats(formats, assets)
+    with profiling.stage('format_results'):
+        formatted = format_results(results)
+    data_date = data_date or results_data_date(results)
+    base = os.path.join(output_dir, f"scanner_report_{strategy_name}{date_suffix(data_date)}")
+
+    strategy_config = get_strategy(strategy_name)
+    meta = {
+        'strategyName': strategy_name,
+        'strategyDisplayName': strategy_config['description'] if strategy_config else strategy_name,
+        'totalScanned': total_scanned,
+        'dataDate': data_date,
+        'diff': diff
+    }
+    files = {}
+    with profiling.stage('write_report'):
+        for fmt in formats:
+            path = f"{base}.{fmt}"
+            if fmt == 'html':
+                files[fmt] = write_html(path, formatted, meta, template)
+            elif fmt == 'bundle':
+                files[fmt] = write_bundle(f"{base}.html", formatted, meta, assets)
+            else:
+                files[fmt] = _WRITERS[fmt](path, formatted, data_date)
+    return files
+
+# ================= 4. 打开报告 =================
+
+def report_page(files):
+    """write_report 输出中可在浏览器打开的页面（html 或 bundle），没有时返回 None"""
+    return files.get('html') or files.get('bundle')
+
+def can_open_browser():
+    """是否有可用的图形界面（设置 CELUE_HEADLESS=1 可强制关闭）"""
+    if os.environ.get('CELUE_HEADLESS'):
+        return False
+    if platform.system() in ('Darwin', 'Windows'):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+def open_in_browser(path):
+    """
+    在后台打开报告，不等待浏览器启动
+    返回: 是否尝试打开（无图形界面时返回 False）
+    """
+    if not can_open_browser():
+        return False
+    abs_path = os.path.abspath(path)
+    with profiling.stage('open_browser'):
+        if platform.system() == "Darwin":
+            subprocess.Popen(['open', abs_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            threading.Thread(target=webbrowser.open, args=(pathlib.Path(abs_path).as_uri(),), daemon=True).start()
+    return True
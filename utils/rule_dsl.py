@@ -0,0 +1,435 @@
+"""
+策略规则 DSL
+用 Python 表达式声明策略条件，在全市场面板（股票 × K线，见 utils.panel）上一次性批量计算，
+每个位置的结果都等价于"以该K线为最新一根"时的单股判定，因此同一套规则既能扫描最新信号，也能直接用于回测。
+
+窗口一律沿用 df.iloc 的写法（相对当前K线，左闭右开）：
+    sum_(x, -60, -20)   等价于 df.iloc[-60:-20][x].sum()
+    count(c, -5, 0)     等价于 df.iloc[-5:][c].sum()
+
+示例（"60~20日前红量 > 绿量 × 1.3" 且 "近5日至少3天量能高于20日均量"）：
+    close, open_, volume = col('close'), col('open'), col('volume')
+    is_red = close > open_
+    red_vol = sum_(where(is_red, volume, 0), -60, -20)
+    green_vol = sum_(where(~is_red, volume, 0), -60, -20)
+    rules = StageRules(
+        [('🚀 启动期', count(volume > volume.rolling_mean(20), -5, 0) >= 3)],
+        require=red_vol > green_vol * param('acc_ratio', 1.3)
+    )
+    stages = rules.latest(panel)
+
+param(name, 默认值) 声明可调参数；不依赖参数的子表达式在多组参数之间共享缓存（参数扫描用）。
+"""
+import operator
+
+import numpy as np
+
+from utils import kernels
+
+# ================= 1. 表达式节点 =================
+
+def _wrap(value):
+    return value if isinstance(value, Expr) else Const(value)
+
+class Expr:
+    """表达式基类，子类实现 _compute(ctx) 返回 (S, T) 数组或标量"""
+
+    def __init__(self, *children):
+        self.children = children
+        self.uses_params = any(c.uses_params for c in children)
+
+    def evaluate(self, ctx):
+        return ctx.eval(self)
+
+    # ---- 运算符 ----
+    def __add__(self, other): return BinOp(np.add, self, _wrap(other))
+    def __radd__(self, other): return BinOp(np.add, _wrap(other), self)
+    def __sub__(self, other): return BinOp(np.subtract, self, _wrap(other))
+    def __rsub__(self, other): return BinOp(np.subtract, _wrap(other), self)
+    def __mul__(self, other): return BinOp(np.multiply, self, _wrap(other))
+    def __rmul__(self, other): return BinOp(np.multiply, _wrap(other), self)
+    def __truediv__(self, other): return BinOp(np.true_divide, self, _wrap(other))
+    def __rtruediv__(self, other): return BinOp(np.true_divide, _wrap(other), self)
+    def __neg__(self): return BinOp(np.subtract, Const(0.0), self)
+
+    def __gt__(self, other): return Compare(operator.gt, self, _wrap(other))
+    def __ge__(self, other): return Compare(operator.ge, self, _wrap(other))
+    def __lt__(self, other): return Compare(operator.lt, self, _wrap(other))
+    def __le__(self, other): return Compare(operator.le, self, _wrap(other))
+
+    def __and__(self, other): return Logical(np.logical_and, self, _wrap(other))
+    def __rand__(self, other): return Logical(np.logical_and, _wrap(other), self)
+    def __or__(self, other): return Logical(np.logical_or, self, _wrap(other))
+    def __ror__(self, other): return Logical(np.logical_or, _wrap(other), self)
+    def __invert__(self): return Not(self)
+
+    # 不重载 ==，表达式对象本身要作为缓存键使用
+    __hash__ = object.__hash__
+
+    # ---- 时间序列操作 ----
+    def shift(self, n):
+        """n 根K线之前的值（n 为负数时表示之后的值，只应在窗口内部使用）"""
+        return Shift(self, n)
+
+    def rolling_mean(self, n):
+        """最近 n 根K线的均值（含当前），不足 n 根为 NaN"""
+        return Rolling(self, n)
+
+class Const(Expr):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def _compute(self, ctx):
+        return self.value
+
+class Param(Expr):
+    def __init__(self, name, default):
+        super().__init__()
+        self.name = name
+        self.default = default
+        self.uses_params = True
+
+    def _compute(self, ctx):
+        return ctx.params.get(self.name, self.default)
+
+class Col(Expr):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def _compute(self, ctx):
+        return ctx.panel.column(self.name)
+
+class Bars(Expr):
+    """截至当前位置的K线根数（对应单股判定里的 len(df)）"""
+
+    def _compute(self, ctx):
+        return ctx.panel.bar_count
+
+def _as_float(x):
+    x = np.asarray(x)
+    return x.astype('float64') if x.dtype == bool else x
+
+class BinOp(Expr):
+    def __init__(self, func, a, b):
+        super().__init__(a, b)
+        self.func = func
+
+    def _compute(self, ctx):
+        a, b = (_as_float(ctx.eval(c)) for c in self.children)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.func(a, b)
+
+class Compare(Expr):
+    def __init__(self, func, a, b):
+        super().__init__(a, b)
+        self.func = func
+
+    def _compute(self, ctx):
+        a, b = (ctx.eval(c) for c in self.children)
+        # 与 pandas 一致：NaN 参与的比较一律为 False
+        with np.errstate(invalid='ignore'):
+            return np.asarray(self.func(a, b), dtype=bool)
+
+class Logical(Expr):
+    def __init__(self, func, a, b):
+        super().__init__(a, b)
+        self.func = func
+
+    def _compute(self, ctx):
+        a, b = (ctx.eval(c) for c in self.children)
+        return self.func(a, b)
+
+class Not(Expr):
+    def _compute(self, ctx):
+        return np.logical_not(ctx.eval(self.children[0]))
+
+class Isnan(Expr):
+    def _compute(self, ctx):
+        return np.isnan(_as_float(ctx.eval(self.children[0])))
+
+class Where(Expr):
+    def _compute(self, ctx):
+        cond, a, b = (ctx.eval(c) for c in self.children)
+        return np.where(cond, a, b)
+
+def _shift(x, n):
+    """沿K线方向平移，移出边界的位置填 NaN（布尔数组填 False）"""
+    x = np.asarray(x)
+    if x.ndim == 0 or n == 0:
+        return x
+    fill = False if x.dtype == bool else np.nan
+    out = np.empty(x.shape, dtype=x.dtype if x.dtype == bool else 'float64')
+    if n > 0:
+        out[:, :n] = fill
+        out[:, n:] = x[:, :-n]
+    else:
+        out[:, n:] = fill
+        out[:, :n] = x[:, -n:]
+    return out
+
+class Shift(Expr):
+    def __init__(self, a, n):
+        super().__init__(a)
+        self.n = int(n)
+
+    def _compute(self, ctx):
+        return _shift(ctx.eval(self.children[0]), self.n)
+
+class Rolling(Expr):
+    def __init__(self, a, n):
+        super().__init__(a)
+        self.n = int(n)
+
+    def _compute(self, ctx):
+        # 与特征表的均线同一实现（逐窗口补偿求和），扫描的两种引擎结果逐位一致
+        return kernels.window_mean(_as_float(ctx.eval(self.children[0])), self.n)
+
+# ---- 窗口聚合 ----
+
+def _window_offsets(start, end):
+    """iloc[start:end] 中每根K线相对当前K线的平移量（正数表示之前）"""
+    if not start < end <= 0:
+        raise ValueError(f"窗口必须满足 start < end <= 0: [{start}, {end})")
+    return [-(k + 1) for k in range(start, end)]
+
+class Window(Expr):
+    def __init__(self, kind, a, start, end):
+        super().__init__(a)
+        self.kind = kind
+        self.shifts = _window_offsets(start, end)
+
+    def _compute(self, ctx):
+        x = ctx.eval(self.children[0])
+        values = (_shift(x, k) for k in self.shifts)
+        kind = self.kind
+
+        if kind in ('any', 'all', 'count'):
+            values = (np.asarray(v, dtype=bool) for v in values)
+            if kind == 'count':
+                return sum(v.astype('int64') for v in values)
+            reduce = np.logical_or if kind == 'any' else np.logical_and
+        elif kind == 'max':
+            reduce = np.fmax
+        elif kind == 'min':
+            reduce = np.fmin
+        else:
+            # sum / mean：NaN 按缺失处理（与 pandas 的 sum/mean 一致）
+            total = 0.0
+            valid = 0
+            for v in values:
+                v = _as_float(v)
+                total = total + np.nan_to_num(v, nan=0.0)
+                valid = valid + ~np.isnan(v)
+            if kind == 'sum':
+                return total
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(valid > 0, total / np.maximum(valid, 1), np.nan)
+
+        result = next(values)
+        for v in values:
+            result = reduce(result, v)
+        return result
+
+class StreakMax(Expr):
+    """窗口内条件连续成立的最长天数"""
+
+    def __init__(self, cond, start, end):
+        super().__init__(cond)
+        self.shifts = _window_offsets(start, end)
+
+    def _compute(self, ctx):
+        cond = ctx.eval(self.children[0])
+        run = best = np.zeros(np.shape(cond), dtype='int64')
+        for k in self.shifts:
+            run = np.where(_shift(cond, k), run + 1, 0)
+            best = np.maximum(best, run)
+        return best
+
+class FirstTrue(Expr):
+    """窗口内第一次满足条件的位置（iloc 负下标），没有时为 NaN"""
+
+    def __init__(self, cond, start, end):
+        super().__init__(cond)
+        self.start, self.end = start, end
+        _window_offsets(start, end)
+
+    def _compute(self, ctx):
+        cond = ctx.eval(self.children[0])
+        result = np.full(np.shape(cond), np.nan)
+        for i in range(self.start, self.end):
+            hit = np.isnan(result) & np.asarray(_shift(cond, -(i + 1)), dtype=bool)
+            result[hit] = i
+        return result
+
+class LastTrue(Expr):
+    """窗口内最后一次满足条件的位置（iloc 负下标），没有时为 NaN"""
+
+    def __init__(self, cond, start, end):
+        super().__init__(cond)
+        self.start, self.end = start, end
+        _window_offsets(start, end)
+
+    def _compute(self, ctx):
+        cond = ctx.eval(self.children[0])
+        result = np.full(np.shape(cond), np.nan)
+        for i in range(self.start, self.end):
+            result[np.asarray(_shift(cond, -(i + 1)), dtype=bool)] = i
+        return result
+
+class At(Expr):
+    """取 iloc[index + offset] 位置的值；index 为 NaN 或位置超出当前K线时为 NaN/False"""
+
+    def __init__(self, a, index, offset=0):
+        super().__init__(a, index)
+        self.offset = int(offset)
+
+    def _compute(self, ctx):
+        x, index = (ctx.eval(c) for c in self.children)
+        x = np.asarray(x)
+        rows, width = index.shape
+        current = np.arange(width)[None, :]
+        # iloc[-1] 即当前位置，iloc[i] 对应 current + i + 1
+        target = current + np.nan_to_num(index, nan=0).astype('int64') + self.offset + 1
+        valid = ~np.isnan(index) & (target >= 0) & (target <= current)
+        picked = np.take_along_axis(x, np.clip(target, 0, width - 1), axis=1)
+        if x.dtype == bool:
+            return picked & valid
+        return np.where(valid, picked, np.nan)
+
+# ================= 2. 构造函数 =================
+
+def col(name):
+    """面板基础列：open / high / low / close / volume"""
+    return Col(name)
+
+def param(name, default):
+    """可调参数，计算时从 params 取值，未提供时使用默认值"""
+    return Param(name, default)
+
+def const(value):
+    return Const(value)
+
+def bars():
+    return Bars()
+
+def where(cond, a, b):
+    return Where(_wrap(cond), _wrap(a), _wrap(b))
+
+def sum_(x, start, end):
+    return Window('sum', _wrap(x), start, end)
+
+def mean_(x, start, end):
+    return Window('mean', _wrap(x), start, end)
+
+def max_(x, start, end):
+    return Window('max', _wrap(x), start, end)
+
+def min_(x, start, end):
+    return Window('min', _wrap(x), start, end)
+
+def count(cond, start, end):
+    return Window('count', _wrap(cond), start, end)
+
+def any_(cond, start, end):
+    return Window('any', _wrap(cond), start, end)
+
+def all_(cond, start, end):
+    return Window('all', _wrap(cond), start, end)
+
+def streak_max(cond, start, end):
+    return StreakMax(_wrap(cond), start, end)
+
+def first_true(cond, start, end):
+    """等价于 for i in range(start, end): if cond(iloc[i]): return i"""
+    return FirstTrue(_wrap(cond), start, end)
+
+def last_true(cond, start, end):
+    """等价于在 range(start, end) 内顺序查找、保留最后一个满足 cond(iloc[i]) 的 i"""
+    return LastTrue(_wrap(cond), start, end)
+
+def at(x, index, offset=0):
+    """取 iloc[index + offset] 处的值，index 通常来自 first_true"""
+    return At(_wrap(x), _wrap(index), offset)
+
+def found(index):
+    """first_true / last_true 是否找到"""
+    return Not(Isnan(_wrap(index)))
+
+# ================= 3. 计算 =================
+
+class EvalContext:
+    """
+    一次计算的上下文
+    shared_cache: 不依赖参数的中间结果缓存，可在同一面板的多组参数之间复用
+    """
+
+    def __init__(self, panel, params=None, shared_cache=None):
+        self.panel = panel
+        self.params = params or {}
+        self.shared_cache = {} if shared_cache is None else shared_cache
+        self._param_cache = {}
+
+    def eval(self, expr):
+        cache = self._param_cache if expr.uses_params else self.shared_cache
+        if expr not in cache:
+            cache[expr] = expr._compute(self)
+        return cache[expr]
+
+class StageRules:
+    """
+    阶段规则：require 全部满足后，按顺序取第一个成立的阶段
+    参数:
+        stages: [(阶段名称, 条件表达式)]，条件可以是 True 表示兜底
+        require: 前置条件（对应单股判定里的提前 return None）
+    """
+
+    def __init__(self, stages, require=None):
+        self.stages = [(label, _wrap(cond)) for label, cond in stages]
+        self.require = _wrap(require) if require is not None else None
+
+    def labels(self):
+        return [label for label, _ in self.stages]
+
+    def params(self):
+        """规则中声明的可调参数 {名称: 默认值}"""
+        found = {}
+        pending = [cond for _, cond in self.stages] + ([self.require] if self.require is not None else [])
+        seen = set()
+        while pending:
+            expr = pending.pop()
+            if expr in seen:
+                continue
+            seen.add(expr)
+            if isinstance(expr, Param):
+                found.setdefault(expr.name, expr.default)
+            pending.extend(expr.children)
+        return dict(sorted(found.items()))
+
+    def evaluate(self, panel, params=None, shared_cache=None):
+        """
+        返回 (S, T) 阶段编号数组，-1 表示不满足
+        编号对应 labels() 的下标
+        """
+        ctx = EvalContext(panel, params, shared_cache)
+        shape = panel.shape
+        result = np.full(shape, -1, dtype='int16')
+        undecided = np.broadcast_to(ctx.eval(self.require), shape).copy() if self.require is not None \
+            else np.ones(shape, dtype=bool)
+        undecided &= panel.bar_count > 0
+
+        for index, (_, cond) in enumerate(self.stages):
+            hit = undecided & np.broadcast_to(np.asarray(ctx.eval(cond), dtype=bool), shape)
+            result[hit] = index
+            undecided &= ~hit
+        return result
+
+    def latest(self, panel, params=None, shared_cache=None):
+        """每只股票最新一根K线的阶段名称列表（不满足为 None）"""
+        if panel.shape[1] == 0:
+            return [None] * len(panel.codes)
+        # 只需最后一列，但窗口依赖历史，仍按整个面板计算
+        codes = self.evaluate(panel, params, shared_cache)[:, -1]
+        labels = self.labels()
+        return [labels[c] if c >= 0 else None for c in codes.tolist()]
@@ -0,0 +1,205 @@
+"""
+策略快照图片渲染模块
+把命中股票（代码 + 名称）渲染成适合在聊天软件里直接发送的图片：
+    - 字体按字号缓存，只加载一次；优先使用中文字体，名称才能正常显示
+      查找顺序：环境变量 CELUE_FONT → 项目 fonts/ 目录 → 系统常见中文字体；都没有时退回 Pillow 内置字体且不画名称
+    - 字形宽度预先测量并按字号缓存，排版时不再对每个格子调用 textbbox
+    - 命中较多时自动分页，每页高度不超过 MAX_PAGE_HEIGHT（聊天软件会压缩或拒收过长的图片）
+    - 多个策略、多页在线程池中并行渲染与编码，输出 PNG 或 WebP，写入是原子的
+"""
+import os
+import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import storage
+
+IMAGE_FORMATS = ('png', 'webp')
+FONT_ENV = 'CELUE_FONT'
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
+# 系统常见中文字体（macOS / Linux / Windows）
+SYSTEM_FONTS = [
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+]
+
+# 版式（宽度按聊天软件的常见显示宽度）
+# 前端 frontend/src/utils/snapshot.js 的 SNAPSHOT_LAYOUT / SNAPSHOT_COLORS 与这里一致，两边生成同样的图片
+WIDTH = 1080
+COLUMNS = 4
+PADDING = 40
+CELL_HEIGHT = 56
+HEADER_HEIGHT = 100
+FOOTER_HEIGHT = 50
+MAX_PAGE_HEIGHT = 4000
+TITLE_SIZE, NAME_SIZE, CODE_SIZE, INFO_SIZE = 36, 18, 18, 16
+COLORS = {
+    'background': '#fafafa',
+    'header': '#1e40af',
+    'title': '#ffffff',
+    'box': '#ffffff',
+    'border': '#d1d5db',
+    'name': '#374151',
+    'code': '#1e40af',
+    'code_only': '#1f2937',
+    'footer': '#6b7280',
+}
+
+# ================= 1. 字体 =================
+
+@functools.lru_cache(maxsize=None)
+def font_path():
+    """中文字体路径，找不到返回 None"""
+    candidates = [os.environ.get(FONT_ENV)]
+    if os.path.isdir(FONT_DIR):
+        candidates += [os.path.join(FONT_DIR, f) for f in sorted(os.listdir(FONT_DIR))
+                       if f.lower().endswith(('.ttf', '.ttc', '.otf'))]
+    candidates += SYSTEM_FONTS
+    return next((path for path in candidates if path and os.path.exists(path)), None)
+
+@functools.lru_cache(maxsize=None)
+def load_font(size):
+    """按字号加载并缓存字体"""
+    path = font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 的内置字体不支持字号
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=None)
+def _glyph_widths(size):
+    # 代码只有数字、字母和点，预先测好；名称中的汉字首次出现时补测
+    font = load_font(size)
+    chars = '0123456789.shzbj…SHZBJ '
+    return {ch: font.getlength(ch) for ch in chars}
+
+def text_width(text, size):
+    """按缓存的字形宽度估算文本宽度（不含字距调整，等宽的代码与中文名称误差可以忽略）"""
+    widths = _glyph_widths(size)
+    total = 0.0
+    for ch in text:
+        width = widths.get(ch)
+        if width is None:
+            width = widths[ch] = load_font(size).getlength(ch)
+        total += width
+    return total
+
+def _fit(text, size, max_width):
+    """超出宽度时截断并加省略号"""
+    if text_width(text, size) <= max_width:
+        return text
+    while text and text_width(text + '…', size) > max_width:
+        text = text[:-1]
+    return text + '…'
+
+# ================= 2. 排版与绘制 =================
+
+def _normalize(stocks):
+    """支持代码列表或 {code, name} 列表"""
+    return [s if isinstance(s, dict) else {'code': str(s), 'name': ''} for s in stocks]
+
+def rows_per_page(max_height=MAX_PAGE_HEIGHT):
+    return max((max_height - HEADER_HEIGHT - FOOTER_HEIGHT - PADDING * 2) // CELL_HEIGHT, 1)
+
+def paginate(stocks, max_height=MAX_PAGE_HEIGHT):
+    """按每页最大高度切分，返回 [股票列表]"""
+    per_page = rows_per_page(max_height) * COLUMNS
+    return [stocks[i:i + per_page] for i in range(0, len(stocks), per_page)] or [[]]
+
+def render_page(stocks, title, footer):
+    """绘制一页快照，返回 PIL.Image"""
+    with_names = font_path() is not None
+    rows = (len(stocks) + COLUMNS - 1) // COLUMNS
+    height = HEADER_HEIGHT + rows * CELL_HEIGHT + FOOTER_HEIGHT + PADDING * 2
+    img = Image.new('RGB', (WIDTH, height), COLORS['background'])
+    draw = ImageDraw.Draw(img)
+
+    draw.rectangle([0, 0, WIDTH, HEADER_HEIGHT], fill=COLORS['header'])
+    draw.text((WIDTH // 2, HEADER_HEIGHT // 2), title, font=load_font(TITLE_SIZE), fill=COLORS['title'], anchor='mm')
+
+    cell_width = (WIDTH - PADDING * 2) // COLUMNS
+    name_font, code_font = load_font(NAME_SIZE), load_font(CODE_SIZE)
+    for i, stock in enumerate(stocks):
+        x = PADDING + (i % COLUMNS) * cell_width + 8
+        y = HEADER_HEIGHT + PADDING + (i // COLUMNS) * CELL_HEIGHT + 6
+        box_width, box_height = cell_width - 16, CELL_HEIGHT - 12
+        draw.rectangle([x, y, x + box_width, y + box_height], fill=COLORS['box'], outline=COLORS['border'], width=1)
+        center_y = y + box_height // 2
+        code = stock['code']
+        if with_names and stock.get('name'):
+            code_width = text_width(code, CODE_SIZE)
+            name = _fit(stock['name'], NAME_SIZE, box_width - code_width - 36)
+            draw.text((x + 12, center_y), name, font=name_font, fill=COLORS['name'], anchor='lm')
+            draw.text((x + box_width - 12, center_y), code, font=code_font, fill=COLORS['code'], anchor='rm')
+        else:
+            draw.text((x + box_width // 2, center_y), code, font=code_font, fill=COLORS['code_only'], anchor='mm')
+
+    draw.text((WIDTH // 2, height - FOOTER_HEIGHT // 2), footer, font=load_font(INFO_SIZE), fill=COLORS['footer'], anchor='mm')
+    return img
+
+# ================= 3. 输出 =================
+
+def save_image(img, path, fmt='png'):
+    """原子写入 PNG / WebP"""
+    with storage.atomic_write(path, mode='wb') as f:
+        if fmt == 'webp':
+            img.save(f, format='WEBP', quality=90, method=4)
+        else:
+            img.save(f, format='PNG')
+    return path
+
+def _page_jobs(stocks, strategy_name, fmt, output_dir, max_height):
+    stocks = _normalize(stocks)
+    pages = paginate(stocks, max_height)
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+    heading = f"策略: {strategy_name}" if font_path() else strategy_name
+    jobs = []
+    for i, page in enumerate(pages, 1):
+        suffix = f"_p{i}" if len(pages) > 1 else ""
+        footer = f"共 {len(stocks)} 只股票 | 生成时间: {now}" if font_path() else f"{len(stocks)} stocks | {now}"
+        if len(pages) > 1:
+            footer += f" | {i}/{len(pages)}"
+        path = os.path.join(output_dir, f"strategy_snapshot_{strategy_name}{suffix}.{fmt}")
+        jobs.append((page, heading, footer, path))
+    return jobs
+
+def _render_job(job, fmt):
+    page, heading, footer, path = job
+    return save_image(render_page(page, heading, footer), path, fmt)
+
+def render_snapshots(snapshots, fmt='png', output_dir='.', max_height=MAX_PAGE_HEIGHT, max_workers=None):
+    """
+    并行渲染多个策略的快照
+    参数:
+        snapshots: {策略名称: 股票列表}，股票为代码或 {code, name}
+        fmt: png / webp
+        max_height: 单页最大高度，超出时分页（文件名带 _p1、_p2 …）
+    返回: {策略名称: [图片路径]}
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"未知的图片格式: {fmt}（可选: {', '.join(IMAGE_FORMATS)}）")
+    jobs = {name: _page_jobs(stocks, name, fmt, output_dir, max_height) for name, stocks in snapshots.items()}
+    flat = [(name, job) for name, items in jobs.items() for job in items]
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(flat), os.cpu_count() or 4) or 1) as executor:
+        paths = list(executor.map(lambda item: _render_job(item[1], fmt), flat))
+    result = {name: [] for name in snapshots}
+    for (name, _), path in zip(flat, paths):
+        result[name].append(path)
+    return result
+
+def render_snapshot(stocks, strategy_name='ma5', fmt='png', output_dir='.', max_height=MAX_PAGE_HEIGHT):
+    """渲染单个策略的快照，返回图片路径列表（分页时多张）"""
+    return render_snapshots({strategy_name: stocks}, fmt, output_dir, max_height)[strategy_name]
@@ -0,0 +1,72 @@
+"""
+原子写入模块
+数据文件（stock_data/*.csv）与各类 JSON 缓存统一先写同目录下的临时文件、fsync 后再 os.replace 替换：
+    - 读方要么看到旧文件、要么看到完整的新文件，不会读到写了一半的内容
+    - 写入过程中崩溃只会留下临时文件，原文件不受影响
+    - 已打开旧文件的读方继续读旧内容（POSIX 上替换不影响已打开的文件）
+追加写入（appendData）也是复制原内容加新行后整体替换，单个日线文件只有几十 KB，代价可以忽略。
+各数据集的版本号与扫描的快照隔离见 utils/manifest.py。
+"""
+import os
+import json
+import tempfile
+import contextlib
+
+# mkstemp 创建的临时文件是 0600，替换前改回原文件的权限；新建文件用常规权限
+# （不读取 umask：os.umask 只能先改后恢复，会影响同进程其他线程新建的文件）
+DEFAULT_FILE_MODE = 0o644
+
+def _file_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o777
+    except OSError:
+        return DEFAULT_FILE_MODE
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', newline=None, fsync=True):
+    """
+    原子写入上下文：with atomic_write(path) as f: f.write(...)
+    正常退出时替换目标文件，异常时删除临时文件、原文件保持不变
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        binary = 'b' in mode
+        with os.fdopen(fd, mode, encoding=None if binary else encoding, newline=None if binary else newline) as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def write_json(path, data, indent=None):
+    """原子写入 JSON"""
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+
+def write_csv(path, df, fsync=True, **kwargs):
+    """原子写入 DataFrame 为 CSV（默认不写索引）"""
+    kwargs.setdefault('index', False)
+    with atomic_write(path, newline='', fsync=fsync) as f:
+        df.to_csv(f, **kwargs)
+
+def append_csv(path, df, fsync=True):
+    """
+    原子追加：复制原文件内容、追加新行（原文件不存在时带表头）后整体替换
+    原文件末尾缺换行符时先补上，避免新行接在最后一行后面
+    """
+    existing = b''
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            existing = f.read()
+    if existing and not existing.endswith(b'\n'):
+        existing += b'\n'
+    rows = df.to_csv(index=False, header=not existing).encode('utf-8')
+    with atomic_write(path, mode='wb', fsync=fsync) as f:
+        f.write(existing)
+        f.write(rows)
@@ -0,0 +1,244 @@
+"""
+合成行情生成模块
+不依赖 BaoStock 生成与 stock_data 格式一致的日线数据，供测试与性能基准使用：
+    generate_market: 固定随机种子的随机游走行情（红盘放量、绿盘缩量，使吸筹类信号足够常见）
+    scenario_bars:   为每个策略的每个阶段手工构造的K线序列，判定结果即该阶段
+    generate_realistic_market: 含停牌、缺失K线、次新股和 ST 名称的市场，供端到端基准使用
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+START_DATE = '2025-01-02'
+
+# ================= 1. 随机行情 =================
+
+def trading_dates(days, start=START_DATE):
+    """从 start 开始的 days 个工作日（YYYY-MM-DD）"""
+    return pd.bdate_range(start, periods=days).strftime('%Y-%m-%d').tolist()
+
+def stock_code(index):
+    """第 index 只合成股票的完整代码，沪深交替"""
+    return f"sh.60{index:04d}" if index % 2 else f"sz.00{index:04d}"
+
+def generate_bars(rng, days, start=START_DATE, price=10.0):
+    """
+    单只股票的随机日线
+    收益率为带轻微漂移的正态分布，成交量与K线颜色相关（阳线放量、阴线缩量）
+    """
+    returns = rng.normal(0.001, 0.025, days)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.01, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+    volume = rng.integers(100_000, 10_000_000, days) * np.where(close > open_, 1.3, 0.8)
+    return pd.DataFrame({
+        'date': trading_dates(days, start),
+        'open': open_.round(2),
+        'high': high.round(2),
+        'low': low.round(2),
+        'close': close.round(2),
+        'volume': volume.round().astype('int64')
+    })
+
+def generate_market(count, days=160, seed=0, start=START_DATE):
+    """
+    生成 count 只股票的随机行情
+    返回: {完整代码: DataFrame}
+    """
+    rng = np.random.default_rng(seed)
+    return {stock_code(i): generate_bars(rng, days, start) for i in range(count)}
+
+def write_market(frames, data_dir):
+    """把行情写成 data_dir/{完整代码}.csv（与 initData.py 的格式一致）"""
+    os.makedirs(data_dir, exist_ok=True)
+    for full_code, df in frames.items():
+        df.to_csv(os.path.join(data_dir, f"{full_code}.csv"), index=False)
+
+# ================= 2. 阶段场景 =================
+
+class BarBuilder:
+    """
+    逐根追加K线的构造器
+    默认最低价不低于前一日，避免意外触发"低点下移"类条件；需要时通过 low 显式指定
+    """
+
+    def __init__(self, price=10.0):
+        self.rows = []
+        self.price = price
+
+    def bar(self, change, volume, gap=0.0, low=None):
+        """追加一根K线：开盘 = 前收 × (1 + gap)，收盘 = 前收 × (1 + change)"""
+        open_ = round(self.price * (1 + gap), 2)
+        close = round(self.price * (1 + change), 2)
+        if low is None:
+            prev_low = self.rows[-1]['low'] if self.rows else 0.0
+            low = min(max(round(min(open_, close) * 0.998, 2), prev_low), open_, close)
+        high = round(max(open_, close) * 1.005, 2)
+        self.rows.append({'open': open_, 'high': high, 'low': round(low, 2), 'close': close, 'volume': int(volume)})
+        self.price = close
+        return self
+
+    def accumulate(self, n, red_volume=3_000_000, green_volume=1_000_000):
+        """吸筹段：红绿交替，阳线放量上涨、阴线缩量小跌"""
+        for k in range(n):
+            if k % 2 == 0:
+                self.bar(0.01, red_volume)
+            else:
+                self.bar(-0.004, green_volume, gap=0.006)
+        return self
+
+    def distribute(self, n, red_volume=1_000_000, green_volume=3_000_000):
+        """派发段：与吸筹相反，阳线缩量、阴线放量"""
+        return self.accumulate(n, red_volume, green_volume)
+
+    def drift(self, n, volume=1_000_000, change=0.002):
+        """平稳段：小阳线缓慢上行"""
+        for _ in range(n):
+            self.bar(change, volume)
+        return self
+
+    @property
+    def last_low(self):
+        return self.rows[-1]['low']
+
+    def frame(self):
+        df = pd.DataFrame(self.rows)
+        df.insert(0, 'date', trading_dates(len(df)))
+        return df
+
+def _ma5_scenario(stage):
+    bb = BarBuilder().accumulate(40).drift(11)
+    bb.bar(-0.01, 700_000, low=bb.last_low * 0.99)              # 缩量挖坑 (-20)
+    bb.drift(8)
+    if stage == "🧪 蓄势中":
+        return bb.drift(10).frame()
+    bb.drift(2).bar(0.05, 2_000_000).drift(1).bar(0.05, 2_000_000).drift(4, 1_200_000, 0.005)
+    if stage == "🚀 启动期":
+        bb.bar(0.0, 800_000, low=bb.price * 0.985)              # 缩量回踩 MA5
+    else:
+        bb.bar(0.005, 1_500_000)                                # 放量，不是回踩
+    return bb.frame()
+
+def _volume_breakout_scenario(stage):
+    bb = BarBuilder().accumulate(50).drift(5)
+    if stage == "🚀 启动期（重点）":
+        bb.bar(-0.005, 900_000, low=bb.last_low * 0.99)         # 前一日收阳、当日低点下移 (-15)
+    else:
+        bb.drift(1)
+    bb.drift(6).bar(0.05, 2_000_000).drift(6, 1_200_000, 0.005)
+    if stage == "🧪 蓄势中":
+        bb.bar(0.005, 1_500_000)
+    else:
+        bb.bar(0.0, 800_000, low=bb.price * 0.985)
+    return bb.frame()
+
+def _breakout_pullback_scenario(stage):
+    bb = BarBuilder().accumulate(50)
+    day3_low = None
+    if stage == "🏖️ 整理区":
+        bb.drift(15)
+    else:
+        bb.drift(3, 1_000_000, 0.015)                           # 三连阳 (-20 ~ -18)
+        day3_low = bb.last_low
+        crash_volume = 2_000_000 if stage == "🧪 蓄势中" else 500_000
+        bb.bar(-0.045, crash_volume, low=bb.price * 0.95)       # 缩量大跌 (-17)
+        if stage in ("🚀 启动期（重中之重）", "🚀 启动期（重点）"):
+            bb.bar(0.03, 1_000_000).drift(2)                    # 三天内收复
+        else:
+            bb.drift(3)
+        bb.drift(8)
+    if stage == "🚀 启动期（重中之重）":
+        bb.drift(4, 1_500_000).bar(-0.02, 1_500_000, low=day3_low * 0.98)  # 近5日收阴并跌破三连阳低点
+    else:
+        bb.drift(5, 1_500_000)
+    return bb.frame()
+
+# 每个策略可构造的阶段；scenario_bars(策略, None) 为不满足任何阶段的派发行情
+SCENARIOS = {
+    'ma5': (_ma5_scenario, ["🚀 启动期", "🧪 蓄势中", "🏖️ 整理区"]),
+    'volume_breakout': (_volume_breakout_scenario, ["🚀 启动期（重点）", "🚀 启动期", "🧪 蓄势中"]),
+    'breakout_pullback': (_breakout_pullback_scenario,
+                          ["🚀 启动期（重中之重）", "🚀 启动期（重点）", "🚀 启动期", "🧪 蓄势中", "🏖️ 整理区"]),
+}
+
+def scenario_stages(strategy):
+    """策略可构造的阶段列表"""
+    return list(SCENARIOS[strategy][1])
+
+def scenario_bars(strategy, stage):
+    """
+    构造判定结果为指定阶段的K线（70根）
+    stage 为 None 时返回不满足该策略的派发行情（阳线缩量、阴线放量，没有吸筹）
+    """
+    if stage is None:
+        return BarBuilder().distribute(70).frame()
+    builder, stages = SCENARIOS[strategy]
+    if stage not in stages:
+        raise ValueError(f"策略 {strategy} 没有可构造的阶段: {stage}")
+    return builder(stage)
+
+# ================= 3. 基准市场 =================
+
+CONCEPTS = ['人工智能', '半导体', '新能源车', '光伏', '储能', '医药', '军工', '消费电子', '机器人', '数据中心']
+
+def _suspend(df, rng, max_days=20):
+    """停牌：一段连续交易日价格不变、成交量为 0（BaoStock 停牌日的返回形式）"""
+    length = int(rng.integers(1, max_days + 1))
+    begin = int(rng.integers(1, max(2, len(df) - length)))
+    end = min(begin + length, len(df))
+    prev_close = df['close'].iat[begin - 1]
+    df.loc[df.index[begin:end], ['open', 'high', 'low', 'close']] = prev_close
+    df.loc[df.index[begin:end], 'volume'] = 0
+    return df
+
+def generate_realistic_market(count, days=250, seed=0, start=START_DATE, suspend_ratio=0.05,
+                              gap_ratio=0.05, new_listing_ratio=0.05, st_ratio=0.03):
+    """
+    带真实数据缺陷的合成市场，用于端到端性能基准
+    参数:
+        suspend_ratio: 含一段停牌的股票比例
+        gap_ratio: 缺失若干天K线（数据源漏数据）的股票比例
+        new_listing_ratio: 次新股比例（上市晚，只有最近 20 ~ days 根K线）
+        st_ratio: 名称带 ST / *ST 的股票比例
+    返回: (行情 {完整代码: DataFrame}, 名称 {纯代码: 名称}, 概念 {纯代码: [概念]})
+    """
+    rng = np.random.default_rng(seed)
+    frames, names, concepts = {}, {}, {}
+    for i in range(count):
+        full_code = stock_code(i)
+        pure_code = full_code.split('.')[1]
+        df = generate_bars(rng, days, start, price=float(rng.uniform(3, 80)))
+
+        if rng.random() < suspend_ratio:
+            df = _suspend(df, rng)
+        if rng.random() < gap_ratio:
+            missing = rng.choice(len(df), size=int(rng.integers(1, 6)), replace=False)
+            df = df.drop(df.index[missing])
+        if rng.random() < new_listing_ratio:
+            df = df.iloc[-int(rng.integers(20, days + 1)):]
+        frames[full_code] = df.reset_index(drop=True)
+
+        name = f"合成{i:04d}"
+        if rng.random() < st_ratio:
+            name = ('*ST' if rng.random() < 0.5 else 'ST') + name
+        names[pure_code] = name
+        concepts[pure_code] = [str(c) for c in rng.choice(CONCEPTS, size=int(rng.integers(1, 4)), replace=False)]
+    return frames, names, concepts
+
+def write_workspace(root, frames, names=None, concepts=None):
+    """
+    写出完整的扫描工作目录：root/stock_data、stock_name_cache.json、concept_cache.json
+    （缓存文件格式与 utils/data_tools 读取的一致）
+    """
+    write_market(frames, os.path.join(root, 'stock_data'))
+    if names is not None:
+        with open(os.path.join(root, 'stock_name_cache.json'), 'w', encoding='utf-8') as f:
+            json.dump(names, f, ensure_ascii=False)
+    if concepts is not None:
+        with open(os.path.join(root, 'concept_cache.json'), 'w', encoding='utf-8') as f:
+            json.dump({'last_update': START_DATE, 'total_concepts': len(CONCEPTS), 'data': concepts},
+                      f, ensure_ascii=False)
+    return root
@@ -0,0 +1,262 @@
+"""
+自选股监控模块
+保存自选股列表及其策略，每次增量更新后只重新评估收到新K线的股票，
+记录每只股票的阶段历史，并在阶段变化时生成转换记录（如 🧪 蓄势中 → 🚀 启动期）。
+"""
+import os
+import json
+import datetime
+import threading
+
+from utils import storage
+from utils.bar_store import resolve_code
+from strategies.registry import STRATEGY_MAP
+
+WATCHLIST_FILE = "watchlists.json"
+HISTORY_FILE = "watchlist_history.json"
+
+# 每只股票每个策略保留的阶段历史条数
+MAX_STAGE_HISTORY = 250
+# 保留的阶段转换记录条数
+MAX_TRANSITIONS = 5000
+
+_lock = threading.RLock()
+
+# ================= 1. 存储 =================
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+def _save_json(path, data):
+    storage.write_json(path, data, indent=2)
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _load_history():
+    history = _load_json(HISTORY_FILE, {})
+    history.setdefault('stages', {})
+    history.setdefault('transitions', [])
+    return history
+
+# ================= 2. 自选股列表管理 =================
+
+def list_watchlists():
+    """返回所有自选股列表 {名称: {codes, strategies, created_at, updated_at}}"""
+    with _lock:
+        return _load_json(WATCHLIST_FILE, {})
+
+def get_watchlist(name):
+    return list_watchlists().get(name)
+
+def _check_strategies(strategies):
+    """
+    规范化策略列表：单个字符串按逗号拆分，去重并保持顺序
+    有未注册的策略名称时抛出 ValueError
+    """
+    if isinstance(strategies, str):
+        strategies = strategies.split(',')
+    strategies = list(dict.fromkeys(str(s).strip() for s in strategies if str(s).strip()))
+    unknown = [s for s in strategies if s not in STRATEGY_MAP]
+    if unknown:
+        raise ValueError(f"找不到策略: {', '.join(unknown)}")
+    return strategies
+
+def save_watchlist(name, codes, strategies=None):
+    """
+    创建或覆盖自选股列表
+    参数:
+        name: 列表名称
+        codes: 股票代码列表（任意格式，统一保存为 sh.600519 形式）
+        strategies: 需要监控的策略列表（或逗号分隔的字符串），默认沿用原列表的策略，新列表为 ["ma5"]
+    返回: (列表信息, 无法识别的代码列表)；策略名称未注册时抛出 ValueError
+    """
+    strategies = _check_strategies(strategies) if strategies else None
+
+    full_codes = []
+    invalid = []
+    for code in codes:
+        resolved = resolve_code(code)
+        if resolved:
+            full_codes.append(resolved[1])
+        else:
+            invalid.append(code)
+
+    with _lock:
+        watchlists = _load_json(WATCHLIST_FILE, {})
+        existing = watchlists.get(name, {})
+        watchlists[name] = {
+            'codes': list(dict.fromkeys(full_codes)),
+            'strategies': strategies or existing.get('strategies') or ['ma5'],
+            'created_at': existing.get('created_at', _now()),
+            'updated_at': _now()
+        }
+        _save_json(WATCHLIST_FILE, watchlists)
+        return watchlists[name], invalid
+
+def delete_watchlist(name):
+    """删除自选股列表，返回是否存在"""
+    with _lock:
+        watchlists = _load_json(WATCHLIST_FILE, {})
+        if name not in watchlists:
+            return False
+        del watchlists[name]
+        _save_json(WATCHLIST_FILE, watchlists)
+        return True
+
+# ================= 3. 增量评估 =================
+
+def refresh_watchlists(updated_codes=None, names=None):
+    """
+    重新评估自选股并记录阶段变化
+    参数:
+        updated_codes: 本次收到新K线的股票（完整代码），None 表示评估全部自选股
+        names: 只评估指定的自选股列表，None 表示全部
+    返回: dict，evaluated（评估股票数）/ transitions（本次新增的阶段转换）/ errors
+    """
+    # 延迟导入：index 会加载全部策略与报告模块
+    from index import analyze_stocks
+
+    watchlists = list_watchlists()
+    if names is not None:
+        watchlists = {k: v for k, v in watchlists.items() if k in names}
+
+    updated = None
+    if updated_codes is not None:
+        updated = {resolve_code(c)[1] for c in updated_codes if resolve_code(c)}
+
+    # 同一只股票可能出现在多个列表中，合并其策略后只评估一次；
+    # 已保存但未注册的策略名称（如策略被删除或改名）只记入 errors，不影响同组其他策略
+    code_strategies = {}
+    code_lists = {}
+    errors = []
+    for name, info in watchlists.items():
+        strategies = info.get('strategies', ['ma5'])
+        unknown = [s for s in strategies if s not in STRATEGY_MAP]
+        if unknown:
+            errors.append({'watchlist': name, 'error': f"找不到策略: {', '.join(unknown)}"})
+        strategies = [s for s in strategies if s in STRATEGY_MAP]
+        if not strategies:
+            continue
+        for code in info.get('codes', []):
+            if updated is not None and code not in updated:
+                continue
+            code_strategies.setdefault(code, set()).update(strategies)
+            code_lists.setdefault(code, []).append(name)
+
+    groups = {}
+    for code, strategies in code_strategies.items():
+        groups.setdefault(tuple(sorted(strategies)), []).append(code)
+
+    new_transitions = []
+    with _lock:
+        history = _load_history()
+        for strategies, codes in groups.items():
+            batch = analyze_stocks(codes, list(strategies))
+            if 'error' in batch:
+                errors.append({'codes': codes, 'error': batch['error']})
+                continue
+            errors.extend(batch['errors'])
+
+            for result in batch['results']:
+                full_code = result['完整代码']
+                for strategy, stage in result['阶段'].items():
+                    transition = _record_stage(history, full_code, strategy, result['数据日期'], stage)
+                    if transition:
+                        transition.update({
+                            'code': result['代码'],
+                            'fullCode': full_code,
+                            'name': result['名称'],
+                            'watchlists': code_lists.get(full_code, [])
+                        })
+                        new_transitions.append(transition)
+
+        history['transitions'].extend(new_transitions)
+        history['transitions'] = history['transitions'][-MAX_TRANSITIONS:]
+        _save_json(HISTORY_FILE, history)
+
+    return {
+        'evaluated': len(code_strategies),
+        'transitions': new_transitions,
+        'errors': errors
+    }
+
+def _record_stage(history, full_code, strategy, date, stage):
+    """
+    追加一条阶段记录，阶段与上一条不同时返回转换记录
+    首次记录的股票只建立基线，不产生转换
+    """
+    entries = history['stages'].setdefault(full_code, {}).setdefault(strategy, [])
+    last = entries[-1] if entries else None
+
+    if last and last['date'] == date:
+        if last['stage'] == stage:
+            return None
+        # 同一交易日数据被修正，覆盖原记录
+        entries.pop()
+        last = entries[-1] if entries else last
+
+    entries.append({'date': date, 'stage': stage})
+    del entries[:-MAX_STAGE_HISTORY]
+
+    if last is None or last['stage'] == stage:
+        return None
+    return {
+        'date': date,
+        'strategy': strategy,
+        'from': last['stage'],
+        'to': stage,
+        'detected_at': _now()
+    }
+
+# ================= 4. 查询 =================
+
+def get_transitions(name=None, since=None, code=None, strategy=None, limit=100):
+    """
+    查询阶段转换记录（最新在前）
+    参数:
+        name: 只返回属于该自选股列表的股票
+        since: 只返回该日期（含）之后的转换，YYYY-MM-DD
+        code: 只返回指定股票
+        strategy: 只返回指定策略
+    """
+    with _lock:
+        transitions = _load_history()['transitions']
+
+    codes = None
+    if name is not None:
+        info = get_watchlist(name)
+        codes = set(info['codes']) if info else set()
+    full_code = resolve_code(code)[1] if code and resolve_code(code) else code
+
+    selected = []
+    for t in reversed(transitions):
+        if codes is not None and t['fullCode'] not in codes:
+            continue
+        if since and t['date'] < since:
+            continue
+        if full_code and t['fullCode'] != full_code:
+            continue
+        if strategy and t['strategy'] != strategy:
+            continue
+        selected.append(t)
+        if limit and len(selected) >= limit:
+            break
+    return selected
+
+def get_stage_history(code, strategy=None):
+    """查询单只股票的阶段历史 {策略: [{date, stage}]}"""
+    resolved = resolve_code(code)
+    if not resolved:
+        return {}
+    with _lock:
+        stages = _load_history()['stages'].get(resolved[1], {})
+    if strategy:
+        return {strategy: stages.get(strategy, [])}
+    return stages